@@ -0,0 +1,103 @@
+"""Times TrackManager queries on a large database before and after the index migration.
+
+    python benchmarks/bench_indexes.py --rows 1000000 --tracks 500
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from clawless.db import MIGRATIONS, SCHEMA, connect, init_db, migrate
+from clawless.tracks import MAX_ID, TrackManager
+
+
+def populate(path: Path, rows: int, tracks: int) -> None:
+    conn = connect(path)
+    # The schema as it was before the index migration.
+    conn.executescript(SCHEMA)
+    migrate(conn, target=1)
+    conn.executemany(
+        "INSERT INTO tracks (name, summary, last_active) VALUES (?, '', 0)",
+        [(f"track{index}",) for index in range(tracks + 1)],
+    )
+    # A cold track whose history sits at the very start of the table.
+    conn.executemany(
+        "INSERT INTO messages (track_id, role, content, ts) VALUES (?, 'user', 'old', 0)",
+        [(tracks + 1,)] * 20,
+    )
+    # Messages from all tracks interleave, as they do in a real chat history.
+    batch = []
+    for index in range(rows):
+        batch.append((index % tracks + 1, "user", f"message {index} " + "x" * 80, index))
+        if len(batch) == 10000:
+            conn.executemany("INSERT INTO messages (track_id, role, content, ts) VALUES (?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO messages (track_id, role, content, ts) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def measure(path: Path, tracks: int, repeat: int, archive_id: int) -> dict[str, float]:
+    conn = connect(path)
+    manager = TrackManager(conn)
+    rng = random.Random(7)
+    ids = [rng.randint(1, tracks) for _ in range(repeat)]
+    queue = iter(ids * 2)
+    results = {
+        "recent_messages": timed(lambda: manager.recent_messages(next(queue), limit=20), repeat),
+        "recent_messages (cold)": timed(lambda: manager.recent_messages(tracks + 1, limit=20), repeat),
+        "unsummarized_messages": timed(
+            lambda: manager.unsummarized_messages(next(queue), before_id=MAX_ID, limit=50),
+            repeat,
+        ),
+        "archive": timed(lambda: manager.archive(archive_id), 1),
+    }
+    conn.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tracks", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite"
+        start = time.perf_counter()
+        populate(path, args.rows, args.tracks)
+        print(f"populated rows={args.rows} tracks={args.tracks} in {time.perf_counter() - start:.1f}s")
+
+        before = measure(path, args.tracks, args.repeat, archive_id=1)
+        conn = connect(path)
+        start = time.perf_counter()
+        init_db(conn)
+        print(f"migrated to version {len(MIGRATIONS)} in {time.perf_counter() - start:.1f}s")
+        conn.close()
+        after = measure(path, args.tracks, args.repeat, archive_id=2)
+
+    print(f"{'query':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, seconds in before.items():
+        print(
+            f"{name:<24}{seconds * 1000:>12.3f}{after[name] * 1000:>12.3f}"
+            f"{seconds / max(after[name], 1e-9):>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
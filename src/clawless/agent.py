@@ -1,31 +1,135 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
-from dataclasses import dataclass
-from typing import Any, Iterable
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Generator, Iterator, Optional
 
-from clawless.tools.base import ToolRegistry
+from clawless import tracing
+from clawless.tools.base import Tool, ToolRegistry, function_name, to_function_spec
+from clawless.tools.results import ToolResultStore
 
 TOOL_CALL_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+TOOL_LIMIT_NOTE = "Tool step limit reached. Answer with the information you already have; do not call tools."
 
 
 @dataclass
 class Message:
     role: str
     content: str
+    tool_calls: Optional[list[dict[str, Any]]] = None
+    tool_call_id: Optional[str] = None
+
+
+@dataclass
+class LLMUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+
+@dataclass
+class LLMResponse:
+    content: str
+    # Each call is {"id": ..., "tool": <registry name>, "args": {...}}.
+    tool_calls: list[dict[str, Any]] = field(default_factory=list)
+    usage: Optional[LLMUsage] = None
+
+
+@dataclass
+class TurnStats:
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+    def record(self, response: LLMResponse) -> None:
+        self.llm_calls += 1
+        if response.usage:
+            self.input_tokens += response.usage.input_tokens
+            self.output_tokens += response.usage.output_tokens
+            self.cached_tokens += response.usage.cached_tokens
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
 
 
 class LLMClient:
+    supports_native_tools = False
+
     def invoke(self, messages: list[Message]) -> str:
         raise NotImplementedError
 
+    async def ainvoke(self, messages: list[Message]) -> str:
+        return await asyncio.to_thread(self.invoke, messages)
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        yield self.invoke(messages)
+
+    def complete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        return LLMResponse(self.invoke(messages))
+
+    async def acomplete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        return LLMResponse(await self.ainvoke(messages))
+
+    def stream_complete(
+        self,
+        messages: list[Message],
+        tools: Optional[list[Tool]] = None,
+    ) -> Generator[str, None, LLMResponse]:
+        parts = []
+        for chunk in self.stream(messages):
+            parts.append(chunk)
+            yield chunk
+        return LLMResponse("".join(parts))
+
 
 class LangChainLLMClient(LLMClient):
-    def __init__(self, connection_string: str, api_key: str) -> None:
+    supports_native_tools = True
+
+    def __init__(self, connection_string: str, api_key: str, base_url: str = "") -> None:
         self.connection_string = connection_string
         self.api_key = api_key
-        self.model = self._init_model()
+        self.base_url = base_url
+        # OpenAI caches long prefixes automatically; Anthropic models behind
+        # OpenRouter only cache up to an explicit cache_control breakpoint.
+        self.cache_prefix = connection_string.lower().startswith("openrouter:anthropic/")
+        scheme = connection_string.split(":", 1)[0].lower() if ":" in connection_string else ""
+        if scheme not in {"openai", "openrouter"}:
+            raise ValueError(f"Unsupported LLM connection_string: {connection_string}")
+        # Importing langchain and building the chat model takes longer than the
+        # rest of startup, so it happens on first use or in warm().
+        self._model: Any = None
+        self._model_lock = threading.Lock()
+        self._bound: tuple[tuple[str, ...], Any, dict[str, str]] | None = None
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._init_model()
+        return self._model
+
+    @model.setter
+    def model(self, model: Any) -> None:
+        self._model = model
+
+    def warm(self) -> threading.Thread:
+        thread = threading.Thread(target=self._warm, name="clawless-llm-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm(self) -> None:
+        try:
+            self.model
+        except Exception:  # noqa: BLE001
+            # The same error is raised again on the first real call.
+            pass
 
     def _init_model(self):
         if ":" not in self.connection_string:
@@ -37,54 +141,383 @@ class LangChainLLMClient(LLMClient):
                 from langchain_openai import ChatOpenAI
             except ImportError as exc:  # noqa: BLE001
                 raise RuntimeError("langchain-openai is required for OpenAI/OpenRouter") from exc
-            base_url = None
-            if scheme == "openrouter":
+            base_url = self.base_url or None
+            if scheme == "openrouter" and not base_url:
                 base_url = "https://openrouter.ai/api/v1"
             return ChatOpenAI(model=model_name, api_key=self.api_key, base_url=base_url)
         raise ValueError(f"Unsupported LLM scheme: {scheme}")
 
     def invoke(self, messages: list[Message]) -> str:
+        return self.complete(messages).content
+
+    async def ainvoke(self, messages: list[Message]) -> str:
+        return (await self.acomplete(messages)).content
+
+    def stream(self, messages: list[Message]) -> Iterator[str]:
+        yield from self.stream_complete(messages)
+
+    def complete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        model, names = self._model_for(tools)
+        return self._to_response(model.invoke(self._format_messages(messages, self.cache_prefix)), names)
+
+    async def acomplete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        model, names = self._model_for(tools)
+        reply = await model.ainvoke(self._format_messages(messages, self.cache_prefix))
+        return self._to_response(reply, names)
+
+    def stream_complete(
+        self,
+        messages: list[Message],
+        tools: Optional[list[Tool]] = None,
+    ) -> Generator[str, None, LLMResponse]:
+        model, names = self._model_for(tools)
+        full = None
+        for chunk in model.stream(self._format_messages(messages, self.cache_prefix)):
+            full = chunk if full is None else full + chunk
+            text = self._text(getattr(chunk, "content", chunk))
+            if text:
+                yield text
+        if full is None:
+            return LLMResponse("")
+        return self._to_response(full, names)
+
+    def _model_for(self, tools: Optional[list[Tool]]) -> tuple[Any, dict[str, str]]:
+        if not tools:
+            return self.model, {}
+        key = tuple(tool.name for tool in tools)
+        bound = self._bound
+        if bound is None or bound[0] != key:
+            names = {function_name(tool.name): tool.name for tool in tools}
+            model = self.model.bind_tools([to_function_spec(tool) for tool in tools])
+            bound = (key, model, names)
+            self._bound = bound
+        return bound[1], bound[2]
+
+    @classmethod
+    def _to_response(cls, message: Any, names: dict[str, str]) -> LLMResponse:
+        calls = [
+            {
+                "id": call.get("id") or f"call_{index}",
+                "tool": names.get(call.get("name", ""), call.get("name", "")),
+                "args": call.get("args") or {},
+            }
+            for index, call in enumerate(getattr(message, "tool_calls", None) or [])
+        ]
+        return LLMResponse(
+            cls._text(getattr(message, "content", message)),
+            calls,
+            cls._usage(getattr(message, "usage_metadata", None)),
+        )
+
+    @staticmethod
+    def _usage(metadata: Any) -> Optional[LLMUsage]:
+        if not metadata:
+            return None
+        details = metadata.get("input_token_details") or {}
+        return LLMUsage(
+            input_tokens=int(metadata.get("input_tokens") or 0),
+            output_tokens=int(metadata.get("output_tokens") or 0),
+            cached_tokens=int(details.get("cache_read") or 0),
+        )
+
+    @staticmethod
+    def _text(content: Any) -> str:
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+            )
+        return str(content)
+
+    @staticmethod
+    def _format_messages(messages: list[Message], cache_prefix: bool = False) -> list[Any]:
         try:
-            from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+            from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
         except ImportError as exc:  # noqa: BLE001
             raise RuntimeError("langchain-core is required for message handling") from exc
         formatted = []
-        for msg in messages:
-            if msg.role == "system":
+        for index, msg in enumerate(messages):
+            if msg.role == "system" and index == 0 and cache_prefix:
+                block = {"type": "text", "text": msg.content, "cache_control": {"type": "ephemeral"}}
+                formatted.append(SystemMessage(content=[block]))
+            elif msg.role == "system":
                 formatted.append(SystemMessage(content=msg.content))
             elif msg.role == "assistant":
-                formatted.append(AIMessage(content=msg.content))
+                tool_calls = [
+                    {"id": call["id"], "name": function_name(call["tool"]), "args": call["args"]}
+                    for call in msg.tool_calls or []
+                ]
+                formatted.append(AIMessage(content=msg.content, tool_calls=tool_calls))
+            elif msg.role == "tool" and msg.tool_call_id:
+                formatted.append(ToolMessage(content=msg.content, tool_call_id=msg.tool_call_id))
+            elif msg.role == "tool":
+                formatted.append(SystemMessage(content=msg.content))
             else:
                 formatted.append(HumanMessage(content=msg.content))
-        response = self.model.invoke(formatted)
-        return getattr(response, "content", str(response))
+        return formatted
+
+
+def _trace_response(active: tracing.Span, response: Optional[LLMResponse]) -> None:
+    if response is None:
+        return
+    active.set(tool_calls=len(response.tool_calls or []), output_chars=len(response.content))
+    if response.usage is not None:
+        active.set(
+            input_tokens=response.usage.input_tokens,
+            output_tokens=response.usage.output_tokens,
+            cached_tokens=response.usage.cached_tokens,
+        )
 
 
 class Agent:
-    def __init__(self, llm: LLMClient, tools: ToolRegistry):
+    def __init__(
+        self,
+        llm: LLMClient,
+        tools: ToolRegistry,
+        max_steps: int = 4,
+        max_parallel_tools: int = 4,
+        tool_mode: str = "auto",
+        result_store: Optional[ToolResultStore] = None,
+        followup_llm: Optional[LLMClient] = None,
+    ):
         self.llm = llm
+        # Answers to tool results can go to a different (usually cheaper) model.
+        self.followup_llm = followup_llm or llm
         self.tools = tools
+        self.result_store = result_store
+        self.max_steps = max(1, max_steps)
+        if tool_mode not in {"auto", "native", "text"}:
+            raise ValueError(f"Unsupported tool_mode: {tool_mode}")
+        # "auto" uses provider function calling when the client supports it and
+        # falls back to the JSON-in-text protocol otherwise.
+        self.native_tools = tool_mode == "native" or (
+            tool_mode == "auto" and llm.supports_native_tools
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_parallel_tools),
+            thread_name_prefix="clawless-tool",
+        )
+        self._prefix: tuple[int, str] = (-1, "")
+
+    def run(self, track_summary: str, messages: list[Message], stats: TurnStats | None = None) -> str:
+        stats = stats if stats is not None else TurnStats()
+        request = self._build_request(track_summary, messages)
+        for step in range(self.max_steps):
+            response = self._complete(request, self._llm_for(step))
+            stats.record(response)
+            if not response.tool_calls:
+                return response.content
+            results = self._execute_tools(response.tool_calls)
+            request = self._build_followup(request, response, results)
+        response = self._complete(self._build_final_request(request), self.followup_llm, final=True)
+        stats.record(response)
+        return self._final_response(response)
+
+    async def arun(
+        self,
+        track_summary: str,
+        messages: list[Message],
+        stats: TurnStats | None = None,
+    ) -> str:
+        stats = stats if stats is not None else TurnStats()
+        request = self._build_request(track_summary, messages)
+        for step in range(self.max_steps):
+            response = await self._acomplete(request, self._llm_for(step))
+            stats.record(response)
+            if not response.tool_calls:
+                return response.content
+            results = await asyncio.gather(*(self._aexecute_tool(call) for call in response.tool_calls))
+            request = self._build_followup(request, response, list(results))
+        response = await self._acomplete(self._build_final_request(request), self.followup_llm, final=True)
+        stats.record(response)
+        return self._final_response(response)
+
+    def run_stream(
+        self,
+        track_summary: str,
+        messages: list[Message],
+        stats: TurnStats | None = None,
+    ) -> Iterator[str]:
+        stats = stats if stats is not None else TurnStats()
+        request = self._build_request(track_summary, messages)
+        for step in range(self.max_steps):
+            response, held = yield from self._stream_step(request, self._tool_specs(), self._llm_for(step))
+            stats.record(response)
+            if not response.tool_calls:
+                if held:
+                    yield held
+                return
+            results = self._execute_tools(response.tool_calls)
+            request = self._build_followup(request, response, results)
+        final_request = self._build_final_request(request)
+        response, held = yield from self._stream_step(final_request, None, self.followup_llm)
+        stats.record(response)
+        if held:
+            final = self._final_response(response)
+            yield held if final == response.content else final
+
+    def prompt_overhead(self, track_summary: str) -> str:
+        # Everything a request carries besides history, for token budgeting.
+        parts = [message.content for message in self._build_request(track_summary, [])]
+        if self.native_tools:
+            parts.append(json.dumps([to_function_spec(tool) for tool in self.tools.list_tools()]))
+        return "\n".join(parts)
+
+    def _tool_specs(self) -> Optional[list[Tool]]:
+        return self.tools.list_tools() if self.native_tools else None
+
+    def _llm_for(self, step: int) -> LLMClient:
+        return self.llm if step == 0 else self.followup_llm
+
+    def _complete(self, request: list[Message], llm: LLMClient, final: bool = False) -> LLMResponse:
+        with tracing.span("llm.complete", messages=len(request), final=final) as active:
+            response = llm.complete(request, None if final else self._tool_specs())
+            _trace_response(active, response)
+        return response if self.native_tools else self._with_text_calls(response)
+
+    async def _acomplete(self, request: list[Message], llm: LLMClient, final: bool = False) -> LLMResponse:
+        with tracing.span("llm.complete", messages=len(request), final=final) as active:
+            response = await llm.acomplete(request, None if final else self._tool_specs())
+            _trace_response(active, response)
+        return response if self.native_tools else self._with_text_calls(response)
 
-    def run(self, track_summary: str, messages: list[Message]) -> str:
-        system_prompt = self._build_system_prompt(track_summary)
-        tool_prompt = self._build_tool_prompt()
-        request = [Message("system", system_prompt), Message("system", tool_prompt)] + messages
-        response = self.llm.invoke(request)
-        tool_call = self._parse_tool_call(response)
-        if not tool_call:
-            return response
-        tool_name = tool_call.get("tool")
-        args = tool_call.get("args", {})
+    def _with_text_calls(self, response: LLMResponse) -> LLMResponse:
+        calls = self._parse_tool_calls(response.content)
+        for index, call in enumerate(calls):
+            call.setdefault("id", f"call_{index}")
+            call.setdefault("args", {})
+        return LLMResponse(response.content, calls, response.usage)
+
+    def _stream_step(
+        self,
+        request: list[Message],
+        tools: Optional[list[Tool]],
+        llm: LLMClient,
+    ) -> Generator[str, None, tuple[LLMResponse, str]]:
+        active = tracing.start_span("llm.stream", messages=len(request))
+        try:
+            response, held = yield from self._stream_text(request, tools, llm)
+        except BaseException as exc:
+            tracing.end_span(active, exc)
+            raise
+        _trace_response(active, response)
+        tracing.end_span(active)
+        return response, held
+
+    def _stream_text(
+        self,
+        request: list[Message],
+        tools: Optional[list[Tool]],
+        llm: LLMClient,
+    ) -> Generator[str, None, tuple[LLMResponse, str]]:
+        stream = llm.stream_complete(request, tools)
+        if self.native_tools:
+            # Native tool calls arrive outside the text, so nothing is held back.
+            response = yield from stream
+            return response, ""
+        # Text is passed through until the first "{"; from there it is held back
+        # so a tool call is never shown to the user.
+        shown: list[str] = []
+        held: list[str] = []
+        usage = None
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as stop:
+                usage = stop.value.usage if stop.value else None
+                break
+            if not held:
+                index = chunk.find("{")
+                if index < 0:
+                    shown.append(chunk)
+                    yield chunk
+                    continue
+                if index > 0:
+                    shown.append(chunk[:index])
+                    yield chunk[:index]
+                chunk = chunk[index:]
+            held.append(chunk)
+        text = "".join(shown + held)
+        return self._with_text_calls(LLMResponse(text, usage=usage)), "".join(held)
+
+    def _execute_tools(self, calls: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if len(calls) == 1:
+            return [self._execute_tool(calls[0])]
+        futures = [self._executor.submit(tracing.bind(self._execute_tool), call) for call in calls]
+        return [future.result() for future in futures]
+
+    def _execute_tool(self, call: dict[str, Any]) -> dict[str, Any]:
+        tool_name = call.get("tool")
         tool = self.tools.get(tool_name)
         if not tool:
-            return f"Tool not found: {tool_name}"
-        result = tool.handler(args)
-        followup = request + [
-            Message("assistant", response),
-            Message("system", f"Tool result: {json.dumps(result)}"),
+            return {"tool": tool_name, "error": f"Tool not found: {tool_name}"}
+        with tracing.span("tool", tool=tool_name) as active:
+            try:
+                return self._cap({"tool": tool_name, "result": tool.handler(call.get("args", {}))})
+            except Exception as exc:  # noqa: BLE001
+                active.set(error=str(exc))
+                return {"tool": tool_name, "error": str(exc)}
+
+    async def _aexecute_tool(self, call: dict[str, Any]) -> dict[str, Any]:
+        tool_name = call.get("tool")
+        tool = self.tools.get(tool_name)
+        if not tool or not tool.async_handler:
+            return await asyncio.to_thread(self._execute_tool, call)
+        with tracing.span("tool", tool=tool_name) as active:
+            try:
+                result = await tool.async_handler(call.get("args", {}))
+                return self._cap({"tool": tool_name, "result": result})
+            except Exception as exc:  # noqa: BLE001
+                active.set(error=str(exc))
+                return {"tool": tool_name, "error": str(exc)}
+
+    def _cap(self, outcome: dict[str, Any]) -> dict[str, Any]:
+        return self.result_store.cap(outcome) if self.result_store else outcome
+
+    def _build_request(self, track_summary: str, messages: list[Message]) -> list[Message]:
+        # The static prompt goes first and stays byte-identical across tracks and
+        # turns so providers with prefix caching can reuse it; per-track state
+        # follows it.
+        request = [Message("system", self._static_prompt())]
+        if track_summary:
+            request.append(Message("system", f"Track summary: {track_summary}"))
+        return request + messages
+
+    def _static_prompt(self) -> str:
+        version, prompt = self._prefix
+        if version != self.tools.version:
+            version = self.tools.version
+            prompt = self._build_system_prompt("")
+            if not self.native_tools:
+                prompt = f"{prompt}\n\n{self._build_tool_prompt()}"
+            self._prefix = (version, prompt)
+        return prompt
+
+    def _build_followup(
+        self,
+        request: list[Message],
+        response: LLMResponse,
+        results: list[dict[str, Any]],
+    ) -> list[Message]:
+        if self.native_tools:
+            return request + [Message("assistant", response.content, tool_calls=response.tool_calls)] + [
+                Message("tool", json.dumps(result), tool_call_id=call["id"])
+                for call, result in zip(response.tool_calls, results)
+            ]
+        return request + [
+            Message("assistant", response.content),
+            Message("tool", f"Tool results: {json.dumps(results)}"),
         ]
-        final_response = self.llm.invoke(followup)
-        return final_response
+
+    @staticmethod
+    def _build_final_request(request: list[Message]) -> list[Message]:
+        return request + [Message("system", TOOL_LIMIT_NOTE)]
+
+    def _final_response(self, response: LLMResponse) -> str:
+        if response.tool_calls or (not self.native_tools and self._parse_tool_calls(response.content)):
+            return "I stopped after reaching the tool step limit."
+        return response.content
 
     def _build_system_prompt(self, summary: str) -> str:
         parts = [
@@ -103,29 +536,31 @@ class Agent:
         return (
             "If you need to use a tool, respond with a single JSON object on its own line, "
             "formatted as {\"tool\": \"tool_name\", \"args\": { ... }}. "
+            "To call several independent tools at once, respond with "
+            "{\"tool_calls\": [{\"tool\": ..., \"args\": ...}, ...]}; they run in parallel "
+            "and all results come back together. "
             "Otherwise respond normally.\n"
             f"Available tools:\n{tool_desc}"
         )
 
     @staticmethod
-    def _parse_tool_call(response: str) -> dict[str, Any] | None:
+    def _parse_tool_calls(response: str) -> list[dict[str, Any]]:
         text = response.strip()
-        if text.startswith("{") and text.endswith("}"):
+        data = None
+        if (text.startswith("{") and text.endswith("}")) or (text.startswith("[") and text.endswith("]")):
             try:
                 data = json.loads(text)
             except json.JSONDecodeError:
                 data = None
-        else:
-            data = None
         if data is None:
             match = TOOL_CALL_PATTERN.search(response)
             if not match:
-                return None
-            snippet = match.group(0)
+                return []
             try:
-                data = json.loads(snippet)
+                data = json.loads(match.group(0))
             except json.JSONDecodeError:
-                return None
-        if not isinstance(data, dict) or "tool" not in data:
-            return None
-        return data
+                return []
+        if isinstance(data, dict) and isinstance(data.get("tool_calls"), list):
+            data = data["tool_calls"]
+        items = data if isinstance(data, list) else [data]
+        return [item for item in items if isinstance(item, dict) and "tool" in item]
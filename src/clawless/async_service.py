@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+
+from clawless import tracing
+from clawless.agent import Agent, Message, TurnStats
+from clawless.bot_service import (
+    IncomingMessage,
+    ServiceContext,
+    _handle_track_command,
+    build_context_builder,
+    build_history,
+    build_inbox,
+    build_result_store,
+    build_sender,
+    build_site_agents,
+    build_site_llms,
+    build_tools,
+    build_tracer,
+    build_webhook,
+    fail_turn,
+    log_cache_stats,
+    log_usage,
+    remember_heartbeat,
+    report_startup,
+    require_telegram,
+    resolve_track,
+    save_turn,
+    site_tier,
+    start_metrics,
+    start_scheduler,
+    turn_span,
+)
+from clawless.heartbeat import run_heartbeat
+from clawless.inbox import InboxItem
+from clawless.metrics import MetricsRegistry
+from clawless.router import route_message
+from clawless.runtime import AsyncTrackDispatcher, TurnDebouncer
+from clawless.startup import StartupTimer
+from clawless.telegram.adapter import AsyncTelegramAdapter
+from clawless.telegram.sender import StreamingReply
+from clawless.tracks import TrackManager
+
+
+async def serve_async(context: ServiceContext, timer: StartupTimer | None = None) -> None:
+    config = context.config
+    log_writer = context.log_writer
+    timer = timer or StartupTimer()
+    metrics = MetricsRegistry() if config.metrics.enabled else None
+    tracer = build_tracer(config, log_writer, lambda exc: log_writer.write(f"error tracing {exc}"), metrics)
+    with timer.phase("tools"):
+        tools = build_tools(context.sandbox, config, use_async=True, timer=timer)
+    with timer.phase("llm"):
+        llms = build_site_llms(config, context.config_path)
+        results = build_result_store(config, tools)
+        agent, job_agent, heartbeat_agent = build_site_agents(config, tools, context, llms, results)
+    tracks = TrackManager(
+        context.pool,
+        cache_seconds=config.runtime.track_cache_seconds,
+        history=build_history(config),
+    )
+
+    require_telegram(config, context.config_path)
+    with timer.phase("telegram"):
+        telegram = AsyncTelegramAdapter(config.telegram.token, config.telegram.owner_user_id)
+    loop = asyncio.get_running_loop()
+
+    def report_error(exc: Exception) -> None:
+        print(f"Error: {exc}")
+        log_writer.write(f"error {exc}")
+
+    # Outbound sends are queued on the sender's own thread so rate limiting and
+    # retries never hold up the event loop.
+    sender = build_sender(config, telegram, report_error)
+
+    def send(chat_id: int, text: str) -> None:
+        sender.send(chat_id, text)
+        log_writer.write(f"send chat_id={chat_id} text={text}")
+
+    dispatcher = AsyncTrackDispatcher(config.runtime.async_concurrency, on_error=report_error)
+
+    async def agent_call(
+        prompt: str,
+        track_name: str | None = None,
+        call_agent: Agent = job_agent,
+        persist: bool = True,
+    ) -> str:
+        track = await asyncio.to_thread(tracks.get_or_create, track_name or "default")
+        await asyncio.to_thread(tracks.mark_active, track.id)
+        response = await call_agent.arun(track.summary, [Message("user", prompt)])
+        log_cache_stats(log_writer, call_agent.llm)
+        if persist:
+            await asyncio.to_thread(persist_exchange, track.id, prompt, response)
+        return response
+
+    def persist_exchange(track_id: int, prompt: str, response: str) -> None:
+        with tracks.transaction():
+            tracks.append_message(track_id, "user", prompt)
+            tracks.append_message(track_id, "assistant", response)
+
+    inbox = build_inbox(config, context.pool)
+    telegram.offset = inbox.offset()
+    context_builder = build_context_builder(config)
+
+    async def chat_turn(track_id: int, batch: list[IncomingMessage]) -> None:
+        with turn_span(track_id, batch):
+            await run_chat_turn(track_id, batch)
+
+    async def run_chat_turn(track_id: int, batch: list[IncomingMessage]) -> None:
+        inbox_ids = [item.inbox_id for item in batch if item.inbox_id is not None]
+        try:
+            if len(batch) > 1:
+                log_writer.write(f"coalesced track_id={track_id} messages={len(batch)}")
+            # TrackManager and the inbox block on SQLite, so they run on threads.
+            track = await asyncio.to_thread(tracks.get_by_id, track_id)
+            summary = track.summary if track else ""
+            upto = track.summary_upto if track else 0
+            incoming = [Message("user", item.text) for item in batch]
+            messages = await asyncio.to_thread(
+                context_builder.load, tracks, track_id, agent.prompt_overhead(summary), upto, incoming
+            )
+            chat_id = batch[-1].chat_id
+            stats = TurnStats()
+            if config.runtime.streaming:
+                response = await asyncio.to_thread(stream_reply, chat_id, summary, messages, stats)
+            else:
+                response = await agent.arun(summary, messages, stats)
+            log_usage(log_writer, track_id, stats)
+            await asyncio.to_thread(save_turn, tracks, track_id, batch, response)
+            if not config.runtime.streaming:
+                send(chat_id, response)
+        except Exception as exc:  # noqa: BLE001
+            await asyncio.to_thread(fail_turn, inbox, send, batch, exc)
+            raise
+        await asyncio.to_thread(inbox.complete, inbox_ids)
+
+    def stream_reply(chat_id: int, summary: str, messages: list[Message], stats: TurnStats) -> str:
+        # Edits go through the threaded sender, so the whole stream runs off the loop.
+        reply = StreamingReply(sender, chat_id, config.runtime.stream_edit_interval_seconds)
+        response = reply.consume(agent.run_stream(summary, messages, stats))
+        log_writer.write(f"send chat_id={chat_id} text={response}")
+        return response
+
+    debouncer = TurnDebouncer(
+        config.runtime.debounce_seconds,
+        lambda track_id, batch: dispatcher.submit(track_id, lambda: chat_turn(track_id, batch)),
+        call_later=loop.call_later,
+    )
+
+    async def job_turn(prompt: str, track_name: str) -> None:
+        with tracing.span("job", root=True):
+            response = await agent_call(prompt, track_name)
+            chat_id = await asyncio.to_thread(tracks.get_last_chat_id)
+            if chat_id:
+                send(chat_id, response)
+
+    async def heartbeat_turn() -> None:
+        with tracing.span("heartbeat", root=True):
+            await run_heartbeat_turn()
+
+    async def run_heartbeat_turn() -> None:
+        # run_heartbeat is synchronous, so it runs on a thread and hops back
+        # onto the loop for the agent call.
+        def call_on_loop(call_agent: Agent, prompt: str) -> str:
+            coroutine = agent_call(prompt, "default", call_agent, persist=False)
+            return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+        escalate_fn = None
+        if config.heartbeat.escalate and site_tier(config, "heartbeat") != site_tier(config, "interactive"):
+            escalate_fn = partial(call_on_loop, agent)
+        result = await asyncio.to_thread(
+            run_heartbeat,
+            config.heartbeat,
+            config.paths.shared_root,
+            partial(call_on_loop, heartbeat_agent),
+            escalate_fn,
+        )
+        await asyncio.to_thread(remember_heartbeat, tracks, result)
+        if result.escalated:
+            log_writer.write("heartbeat escalated")
+        if result.suppressed:
+            log_writer.write("heartbeat suppressed")
+            return
+        log_writer.write(f"heartbeat message={result.message}")
+        chat_id = await asyncio.to_thread(tracks.get_last_chat_id)
+        if chat_id:
+            send(chat_id, result.message)
+
+    # APScheduler fires on its own threads; hand the work to the event loop.
+    def on_job(payload: dict) -> None:
+        prompt = str(payload.get("prompt", ""))
+        track_name = payload.get("track_name") or "default"
+        track_id = tracks.get_or_create(track_name).id
+        loop.call_soon_threadsafe(dispatcher.submit, track_id, lambda: job_turn(prompt, track_name))
+
+    def heartbeat_job() -> None:
+        track_id = tracks.get_or_create("default").id
+        loop.call_soon_threadsafe(dispatcher.submit, track_id, heartbeat_turn)
+
+    scheduler_task = loop.create_task(
+        asyncio.to_thread(
+            start_scheduler,
+            context,
+            on_job,
+            heartbeat_job,
+            llms["summary"],
+            agent.prompt_overhead,
+            timer,
+            report_error,
+        )
+    )
+
+    async def process_update(item: InboxItem) -> None:
+        update = item.update
+        with tracing.span("update", root=True, chat_id=update.chat_id, inbox_id=item.id) as active:
+            tracks.set_last_chat_id(update.chat_id, wait=False)
+            log_writer.write(f"recv chat_id={update.chat_id} text={update.text}")
+            with tracing.span("route"):
+                routed = route_message(update.text)
+            if routed.text.startswith("/track"):
+                send(update.chat_id, await asyncio.to_thread(_handle_track_command, routed.text, tracks))
+                await asyncio.to_thread(inbox.complete, [item.id])
+                return
+            track = await asyncio.to_thread(resolve_track, routed, tracks)
+            debouncer.add(track.id, IncomingMessage(routed.text, update.chat_id, item.id, active))
+
+    inbox_ready = asyncio.Event()
+
+    async def process_inbox() -> None:
+        while True:
+            inbox_ready.clear()
+            await asyncio.to_thread(inbox.renew)
+            items = await asyncio.to_thread(inbox.claim)
+            for item in items:
+                try:
+                    await process_update(item)
+                except Exception as exc:  # noqa: BLE001
+                    await asyncio.to_thread(inbox.fail, [item.id], str(exc))
+                    report_error(exc)
+            if not items:
+                try:
+                    await asyncio.wait_for(inbox_ready.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+    processor = loop.create_task(process_inbox())
+    metrics_server = start_metrics(config, metrics, dispatcher.pending, sender, inbox, llms["interactive"])
+    with timer.phase("webhook"):
+        webhook = await asyncio.to_thread(build_webhook, config, telegram, inbox, log_writer)
+
+    print("Clawless bot service started (async).")
+    report_startup(log_writer, timer)
+    try:
+        while True:
+            try:
+                with tracing.span("telegram.poll", root=True) as active:
+                    if webhook:
+                        updates = await asyncio.to_thread(webhook.poll)
+                    else:
+                        updates = await telegram.apoll()
+                    active.set(updates=len(updates))
+                # The webhook server stores updates itself before acknowledging them.
+                if not webhook:
+                    for update in updates:
+                        await asyncio.to_thread(inbox.enqueue, update)
+                if updates:
+                    inbox_ready.set()
+            except Exception as exc:  # noqa: BLE001
+                report_error(exc)
+                await asyncio.sleep(2)
+    finally:
+        processor.cancel()
+        scheduler = await scheduler_task
+        if scheduler:
+            scheduler.shutdown()
+        if tracer:
+            tracer.close()
+        if metrics_server:
+            metrics_server.stop()
+        sender.stop(timeout=5)
+        if webhook:
+            webhook.stop()
+        await telegram.aclose()
+        # Flushes writes still queued without waiting, e.g. the last chat id.
+        context.pool.close()
@@ -1,55 +1,453 @@
 from __future__ import annotations
 
-import json
+import argparse
+import asyncio
 import os
+import threading
 import time
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from typing import Callable
 
-from clawless.agent import Agent, LangChainLLMClient, LLMClient, Message
-from clawless.config import ConfigManager, coerce_config_roots, ensure_paths, normalize_mcp_servers
-from clawless.db import connect, init_db
-from clawless.heartbeat import run_heartbeat
-from clawless.logging_utils import create_log_writer
+from clawless import tracing
+from clawless.agent import Agent, LangChainLLMClient, LLMClient, Message, TurnStats
+from clawless.config import (
+    AppConfig,
+    ConfigManager,
+    LLMEndpointConfig,
+    coerce_config_roots,
+    ensure_paths,
+    normalize_mcp_servers,
+)
+from clawless.context import ContextBuilder
+from clawless.db import ConnectionPool, connect, init_db
+from clawless.heartbeat import HeartbeatResult, run_heartbeat
+from clawless.history import RecentHistory
+from clawless.inbox import Inbox, InboxItem, InboxWorker
+from clawless.llm_cache import CachingLLMClient
+from clawless.llm_router import LLMBusyError, RateLimitedLLMClient, RoutingLLMClient
+from clawless.logging_utils import LogWriter, create_log_writer
+from clawless.mcp.client import MCPServer
+from clawless.metrics import MetricsRegistry, MetricsServer, SpanMetrics
 from clawless.paths import PathRoots, PathSandbox
-from clawless.router import route_message
+from clawless.ratelimit import AdaptiveLimiter
+from clawless.router import RoutedMessage, route_message
+from clawless.runtime import TrackWorkerPool, TurnDebouncer
 from clawless.scheduler import SchedulerService
+from clawless.startup import ProviderLoader, StartupTimer
+from clawless.summarizer import TrackSummarizer
 from clawless.telegram.adapter import TelegramAdapter
-from clawless.tools.base import ToolRegistry
+from clawless.telegram.sender import StreamingReply, TelegramSender
+from clawless.telegram.webhook import WebhookServer
+from clawless.tools.base import Tool, ToolRegistry
 from clawless.tools.file_tools import FileTools
 from clawless.tools.mcp_tools import create_loader
+from clawless.tools.results import ToolResultStore
 from clawless.tools.skill_tools import SkillRunner
-from clawless.tracks import TrackManager
+from clawless.tracks import Track, TrackManager
 
 DEFAULT_CONFIG_ROOT = Path.home() / ".clawless"
 
 
-def build_tools(sandbox: PathSandbox, config) -> ToolRegistry:
+@dataclass
+class ServiceContext:
+    config: AppConfig
+    config_path: Path
+    log_writer: LogWriter
+    # Per-thread read connections; every write goes through its one writer.
+    pool: ConnectionPool
+    sandbox: PathSandbox
+    db_path: Path
+
+
+@dataclass
+class IncomingMessage:
+    text: str
+    chat_id: int
+    inbox_id: int | None = None
+    # The update's span; the turn that answers it joins the same trace.
+    trace: tracing.Span | None = None
+
+
+def build_tools(
+    sandbox: PathSandbox,
+    config,
+    use_async: bool = False,
+    timer: StartupTimer | None = None,
+) -> ToolRegistry:
     registry = ToolRegistry()
     FileTools(sandbox).register(registry)
     SkillRunner(sandbox).register(registry)
+    loader = ProviderLoader(
+        registry,
+        timer,
+        on_ready=lambda name, count, seconds: print(f"Loaded {name}: {count} tools in {seconds:.2f}s"),
+        on_error=lambda name, exc: print(f"Failed to load {name}: {exc}"),
+    )
     for server in normalize_mcp_servers(config.mcp_servers):
-        try:
-            loader = create_loader(server)
-            loader.register(registry)
-        except Exception as exc:  # noqa: BLE001
-            print(f"Failed to load MCP server {server.name}: {exc}")
+        loader.start(f"mcp:{server.name}", partial(load_mcp_tools, server, use_async))
+    pending = loader.wait(config.runtime.startup_wait_seconds)
+    if pending:
+        print(f"Still loading in the background: {', '.join(pending)}")
     return registry
 
 
-def build_agent(config, tools: ToolRegistry, config_path: Path) -> Agent:
+def load_mcp_tools(server: MCPServer, use_async: bool = False) -> list[Tool]:
+    return create_loader(server, use_async=use_async).load_tools()
+
+
+CALL_SITES = ("interactive", "heartbeat", "job", "summary", "tool_followup")
+# Limiter lanes: lower goes first, so chat is served ahead of background work.
+SITE_PRIORITIES = {"interactive": 0, "tool_followup": 0, "job": 1, "heartbeat": 2, "summary": 2}
+BUSY_REPLY = "The model provider is busy right now. Your message is queued and will be answered shortly."
+DROPPED_REPLY = "Sorry, I could not answer your message after several attempts and gave up on it. Please send it again."
+
+
+def build_llm(config, config_path: Path) -> LLMClient:
     if not config.llm.connection_string or not config.llm.api_key:
         raise RuntimeError(
             "LLM connection_string and api_key must be configured. "
             f"Config path: {config_path}"
         )
-    llm: LLMClient = LangChainLLMClient(
+    primary = LangChainLLMClient(
         connection_string=config.llm.connection_string,
         api_key=config.llm.api_key,
+        base_url=config.llm.base_url,
+    )
+    # The chat model is built on a background thread while the rest of
+    # startup carries on.
+    primary.warm()
+    if not config.llm.fallbacks:
+        return primary
+    endpoints: list[tuple[str, LLMClient]] = [(config.llm.connection_string, primary)]
+    for fallback in config.llm.fallbacks:
+        endpoints.append((fallback.connection_string, build_endpoint(config, fallback)))
+    return RoutingLLMClient(
+        endpoints,
+        hedge=config.llm.hedge,
+        hedge_min_seconds=config.llm.hedge_min_seconds,
+    )
+
+
+def build_endpoint(config, endpoint: LLMEndpointConfig) -> LLMClient:
+    client = LangChainLLMClient(
+        connection_string=endpoint.connection_string,
+        api_key=endpoint.api_key or config.llm.api_key,
+        base_url=endpoint.base_url,
+    )
+    client.warm()
+    return client
+
+
+def build_site_llms(config, config_path: Path) -> dict[str, LLMClient]:
+    # One client per tier, shared by every call site routed to it.
+    unknown = set(config.llm.routing) - set(CALL_SITES)
+    if unknown:
+        raise RuntimeError(
+            f"Unknown llm.routing call sites: {', '.join(sorted(unknown))}. "
+            f"Config path: {config_path}"
+        )
+    default = build_llm(config, config_path)
+    clients: dict[str, LLMClient] = {"default": default}
+    limiter = AdaptiveLimiter(
+        max_concurrency=config.llm.max_concurrency,
+        requests_per_minute=config.llm.requests_per_minute,
+        tokens_per_minute=config.llm.tokens_per_minute,
+    )
+    sites: dict[str, LLMClient] = {}
+    for site in CALL_SITES:
+        tier = site_tier(config, site)
+        if tier not in clients:
+            endpoint = config.llm.tiers.get(tier)
+            if endpoint is None:
+                raise RuntimeError(
+                    f"llm.routing.{site} names unknown tier {tier!r}. Config path: {config_path}"
+                )
+            # A tier falls back to the default model when its own endpoint fails.
+            clients[tier] = RoutingLLMClient([(tier, build_endpoint(config, endpoint)), ("default", default)])
+        sites[site] = RateLimitedLLMClient(
+            clients[tier],
+            limiter,
+            priority=SITE_PRIORITIES[site],
+            max_retries=config.llm.max_retries,
+            reply_tokens=config.agent.reply_tokens,
+        )
+    return sites
+
+
+def site_tier(config, site: str) -> str:
+    return config.llm.routing.get(site, "default")
+
+
+def site_model(config, site: str) -> str:
+    tier = site_tier(config, site)
+    if tier == "default":
+        return config.llm.connection_string
+    return config.llm.tiers[tier].connection_string
+
+
+def build_cached_llm(config, llm: LLMClient, pool: ConnectionPool, model: str) -> LLMClient:
+    if not config.llm.cache_enabled:
+        return llm
+    return CachingLLMClient(
+        llm,
+        model,
+        pool,
+        ttl_seconds=config.llm.cache_ttl_seconds,
+        max_entries=config.llm.cache_max_entries,
+    )
+
+
+def build_result_store(config, tools: ToolRegistry) -> ToolResultStore:
+    store = ToolResultStore(
+        max_chars=config.agent.tool_result_max_chars,
+        page_chars=config.agent.tool_result_page_chars,
+        directory=Path(config.paths.internal_root) / "tool_results",
+    )
+    store.register(tools)
+    return store
+
+
+def build_agent(
+    config,
+    tools: ToolRegistry,
+    config_path: Path,
+    llm: LLMClient | None = None,
+    result_store: ToolResultStore | None = None,
+    followup_llm: LLMClient | None = None,
+) -> Agent:
+    if llm is None:
+        llm = build_llm(config, config_path)
+    return Agent(
+        llm,
+        tools,
+        max_steps=config.agent.max_tool_steps,
+        max_parallel_tools=config.agent.max_parallel_tools,
+        tool_mode=config.agent.tool_mode,
+        result_store=result_store,
+        followup_llm=followup_llm,
+    )
+
+
+def build_site_agents(
+    config,
+    tools: ToolRegistry,
+    context: ServiceContext,
+    llms: dict[str, LLMClient],
+    results: ToolResultStore,
+) -> tuple[Agent, Agent, Agent]:
+    def site_agent(site: str, cached: bool = False) -> Agent:
+        llm = llms[site]
+        if cached:
+            llm = build_cached_llm(config, llm, context.pool, site_model(config, site))
+        return build_agent(config, tools, context.config_path, llm, results, llms["tool_followup"])
+
+    # Scheduled jobs and heartbeats repeat the same prompts, so only they go
+    # through the response cache; chat turns carry unique history.
+    return site_agent("interactive"), site_agent("job", cached=True), site_agent("heartbeat", cached=True)
+
+
+def build_history(config) -> RecentHistory | None:
+    if config.runtime.history_messages <= 0:
+        return None
+    return RecentHistory(config.runtime.history_messages, config.runtime.history_cache_mb * 1024 * 1024)
+
+
+def build_context_builder(config) -> ContextBuilder:
+    return ContextBuilder(
+        context_tokens=config.agent.context_tokens,
+        reply_tokens=config.agent.reply_tokens,
+    )
+
+
+def build_summarizer(config, llm: LLMClient, pool: ConnectionPool, overhead) -> TrackSummarizer | None:
+    if not config.summary.enabled:
+        return None
+    # Runs on the scheduler's threads, never on the turn workers. `overhead`
+    # is the chat agent's, so only messages a turn can no longer fit are folded.
+    return TrackSummarizer(
+        llm,
+        TrackManager(pool),
+        build_context_builder(config),
+        overhead,
+        batch_size=config.summary.batch_size,
+        idle_seconds=config.summary.idle_seconds,
+        max_words=config.summary.max_words,
+    )
+
+
+def schedule_summaries(
+    scheduler: SchedulerService,
+    summarizer: TrackSummarizer | None,
+    config,
+    log_writer: LogWriter,
+    on_error,
+) -> None:
+    if summarizer is None:
+        return
+
+    def summary_job() -> None:
+        try:
+            with tracing.span("summary", root=True) as active:
+                folded = summarizer.run_once()
+                active.set(folded=folded)
+        except Exception as exc:  # noqa: BLE001
+            on_error(exc)
+            return
+        if folded:
+            log_writer.write(f"summary folded={folded}")
+
+    scheduler.scheduler.add_job(
+        summary_job,
+        "interval",
+        minutes=config.summary.interval_minutes,
+        id="summary",
+        replace_existing=True,
+    )
+
+
+def start_scheduler(
+    context: ServiceContext,
+    on_job,
+    heartbeat_job,
+    summary_llm: LLMClient,
+    summary_overhead,
+    timer: StartupTimer,
+    on_error,
+) -> SchedulerService | None:
+    # Called off the startup path; nothing here is needed to answer a message.
+    config = context.config
+    try:
+        with timer.phase("scheduler"):
+            scheduler = SchedulerService(context.pool, on_job)
+            scheduler.start()
+            scheduler.schedule_jobs()
+            schedule_summaries(
+                scheduler,
+                build_summarizer(config, summary_llm, context.pool, summary_overhead),
+                config,
+                context.log_writer,
+                on_error,
+            )
+            if config.heartbeat.enabled:
+                scheduler.scheduler.add_job(
+                    heartbeat_job,
+                    "interval",
+                    minutes=config.heartbeat.interval_minutes,
+                    id="heartbeat",
+                    replace_existing=True,
+                )
+    except Exception as exc:  # noqa: BLE001
+        on_error(exc)
+        return None
+    context.log_writer.write(timer.report())
+    return scheduler
+
+
+def build_tracer(
+    config,
+    log_writer: LogWriter,
+    on_error=None,
+    metrics: MetricsRegistry | None = None,
+) -> tracing.Tracer | None:
+    # Metrics are fed from spans, so a tracer runs whenever either is enabled.
+    if not config.tracing.enabled and metrics is None:
+        return None
+    exporters: list[tracing.SpanExporter] = []
+    if config.tracing.enabled:
+        exporters.append(tracing.JSONLExporter(log_writer.path.with_suffix(".trace.jsonl")))
+        if config.tracing.otlp_endpoint:
+            exporters.append(tracing.OTLPExporter(config.tracing.otlp_endpoint, config.tracing.service_name))
+    listeners = [SpanMetrics(metrics)] if metrics is not None else None
+    tracer = tracing.Tracer(exporters, on_error=on_error, listeners=listeners)
+    tracing.set_tracer(tracer)
+    return tracer
+
+
+def start_metrics(
+    config,
+    metrics: MetricsRegistry | None,
+    queue_depth,
+    sender: TelegramSender,
+    inbox: Inbox,
+    llm: LLMClient,
+) -> MetricsServer | None:
+    if metrics is None:
+        return None
+    metrics.gauge("clawless_turn_queue_depth", "Turns waiting for a worker.", queue_depth)
+    metrics.gauge("clawless_telegram_send_queue_depth", "Messages waiting to be sent.", sender.pending)
+    metrics.gauge(
+        "clawless_inbox_items",
+        "Inbox rows by status.",
+        lambda: {(("status", status),): count for status, count in inbox.counts().items()},
     )
-    return Agent(llm, tools)
+    limiter = getattr(llm, "limiter", None)
+    if isinstance(limiter, AdaptiveLimiter):
+        metrics.gauge("clawless_llm_in_flight", "LLM calls in flight.", lambda: limiter.in_flight)
+        metrics.gauge("clawless_llm_concurrency_limit", "Adaptive LLM call limit.", lambda: limiter.limit)
+    server = MetricsServer(metrics, config.metrics.host, config.metrics.port)
+    server.start()
+    return server
+
+
+def report_startup(log_writer: LogWriter, timer: StartupTimer) -> None:
+    timer.ready()
+    report = timer.report()
+    print(report)
+    log_writer.write(report)
+
 
+def build_sender(config, telegram: TelegramAdapter, on_error) -> TelegramSender:
+    sender = TelegramSender(
+        telegram,
+        rate_per_second=config.telegram.send_rate_per_second,
+        chat_rate_per_second=config.telegram.chat_rate_per_second,
+        on_error=on_error,
+    )
+    sender.start()
+    return sender
+
+
+def build_inbox(config, pool: ConnectionPool) -> Inbox:
+    # Inbox writes share the pool's writer, so intake and turn writes are
+    # group-committed together instead of contending for the write lock.
+    inbox = Inbox(
+        pool,
+        lease_seconds=config.runtime.inbox_lease_seconds,
+        max_attempts=config.runtime.inbox_max_attempts,
+    )
+    inbox.recover()
+    inbox.purge_done()
+    return inbox
 
-def main() -> None:
+
+def build_webhook(
+    config,
+    telegram: TelegramAdapter,
+    inbox: Inbox,
+    log_writer: LogWriter,
+) -> WebhookServer | None:
+    if config.telegram.mode != "webhook":
+        # getUpdates fails with 409 while a webhook from an earlier run is still set.
+        telegram.delete_webhook()
+        return None
+    server = WebhookServer(
+        telegram,
+        host=config.telegram.webhook_host,
+        port=config.telegram.webhook_port,
+        path=config.telegram.webhook_path,
+        secret_token=config.telegram.webhook_secret,
+        inbox=inbox,
+        on_reject=lambda reason: log_writer.write(f"webhook rejected {reason}"),
+    )
+    server.start()
+    if config.telegram.webhook_url:
+        telegram.set_webhook(config.telegram.webhook_url, config.telegram.webhook_secret)
+    return server
+
+
+def bootstrap() -> ServiceContext:
     config_root = Path(os.environ.get("CLAWLESS_CONFIG_ROOT", str(DEFAULT_CONFIG_ROOT)))
     config_root = config_root.expanduser().resolve()
     manager = ConfigManager(config_root)
@@ -61,6 +459,7 @@ def main() -> None:
     db_path = Path(config.paths.internal_root) / "clawless.db"
     conn = connect(db_path)
     init_db(conn)
+    conn.close()
 
     sandbox = PathSandbox(
         PathRoots(
@@ -69,109 +468,283 @@ def main() -> None:
             shared_root=config.paths.shared_root,
         )
     )
-    tools = build_tools(sandbox, config)
-    agent = build_agent(config, tools, manager.config_path)
-    tracks = TrackManager(conn)
+    pool = ConnectionPool(db_path)
+    return ServiceContext(config, manager.config_path, log_writer, pool, sandbox, db_path)
+
 
+def require_telegram(config, config_path: Path) -> None:
     if not config.telegram.token or not config.telegram.owner_user_id:
         raise RuntimeError(
             "Telegram token and owner_user_id must be configured. "
-            f"Config path: {manager.config_path}"
+            f"Config path: {config_path}"
         )
-    telegram = TelegramAdapter(config.telegram.token, config.telegram.owner_user_id)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="clawless-bot")
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run the asyncio runtime (requires httpx).",
+    )
+    args = parser.parse_args(argv)
+    timer = StartupTimer()
+    with timer.phase("bootstrap"):
+        context = bootstrap()
+    if args.use_async:
+        from clawless.async_service import serve_async
+
+        asyncio.run(serve_async(context, timer))
+        return
+    serve(context, timer)
+
+
+def serve(context: ServiceContext, timer: StartupTimer | None = None) -> None:
+    config = context.config
+    log_writer = context.log_writer
+    timer = timer or StartupTimer()
+    metrics = MetricsRegistry() if config.metrics.enabled else None
+    build_tracer(config, log_writer, lambda exc: log_writer.write(f"error tracing {exc}"), metrics)
+    with timer.phase("tools"):
+        tools = build_tools(context.sandbox, config, timer=timer)
+    with timer.phase("llm"):
+        llms = build_site_llms(config, context.config_path)
+        results = build_result_store(config, tools)
+        agent, job_agent, heartbeat_agent = build_site_agents(config, tools, context, llms, results)
+    tracks = TrackManager(
+        context.pool,
+        cache_seconds=config.runtime.track_cache_seconds,
+        history=build_history(config),
+    )
+
+    require_telegram(config, context.config_path)
+    with timer.phase("telegram"):
+        telegram = TelegramAdapter(config.telegram.token, config.telegram.owner_user_id)
+
+    def report_error(exc: Exception) -> None:
+        print(f"Error: {exc}")
+        log_writer.write(f"error {exc}")
+
+    sender = build_sender(config, telegram, report_error)
 
     def send(chat_id: int, text: str) -> None:
-        telegram.send_message(chat_id, text)
+        sender.send(chat_id, text)
         log_writer.write(f"send chat_id={chat_id} text={text}")
 
-    def agent_call(prompt: str, track_name: str | None = None) -> str:
+    pool = TrackWorkerPool(config.runtime.workers, on_error=report_error)
+    pool.start()
+
+    def agent_call(
+        prompt: str,
+        track_name: str | None = None,
+        call_agent: Agent = job_agent,
+        persist: bool = True,
+    ) -> str:
         track = tracks.get_or_create(track_name or "default")
         tracks.mark_active(track.id)
         messages = [Message("user", prompt)]
-        response = agent.run(track.summary, messages)
-        tracks.append_message(track.id, "user", prompt)
-        tracks.append_message(track.id, "assistant", response)
+        response = call_agent.run(track.summary, messages)
+        log_cache_stats(log_writer, call_agent.llm)
+        if persist:
+            with tracks.transaction():
+                tracks.append_message(track.id, "user", prompt)
+                tracks.append_message(track.id, "assistant", response)
         return response
 
+    inbox = build_inbox(config, context.pool)
+    telegram.offset = inbox.offset()
+    context_builder = build_context_builder(config)
+
+    def chat_turn(track_id: int, batch: list[IncomingMessage]) -> None:
+        with turn_span(track_id, batch):
+            run_chat_turn(track_id, batch)
+
+    def run_chat_turn(track_id: int, batch: list[IncomingMessage]) -> None:
+        inbox_ids = [item.inbox_id for item in batch if item.inbox_id is not None]
+        try:
+            if len(batch) > 1:
+                log_writer.write(f"coalesced track_id={track_id} messages={len(batch)}")
+            track = tracks.get_by_id(track_id)
+            summary = track.summary if track else ""
+            upto = track.summary_upto if track else 0
+            incoming = [Message("user", item.text) for item in batch]
+            messages = context_builder.load(tracks, track_id, agent.prompt_overhead(summary), upto, incoming)
+            chat_id = batch[-1].chat_id
+            stats = TurnStats()
+            if config.runtime.streaming:
+                reply = StreamingReply(sender, chat_id, config.runtime.stream_edit_interval_seconds)
+                response = reply.consume(agent.run_stream(summary, messages, stats))
+                log_writer.write(f"send chat_id={chat_id} text={response}")
+            else:
+                response = agent.run(summary, messages, stats)
+                send(chat_id, response)
+            log_usage(log_writer, track_id, stats)
+            save_turn(tracks, track_id, batch, response)
+        except Exception as exc:  # noqa: BLE001
+            fail_turn(inbox, send, batch, exc)
+            raise
+        inbox.complete(inbox_ids)
+
+    debouncer = TurnDebouncer(
+        config.runtime.debounce_seconds,
+        lambda track_id, batch: pool.submit(track_id, partial(chat_turn, track_id, batch)),
+    )
+
     def on_job(payload: dict) -> None:
         prompt = str(payload.get("prompt", ""))
-        track_name = payload.get("track_name")
-        response = agent_call(prompt, track_name)
-        chat_id = _get_last_chat_id(conn)
-        if chat_id:
-            send(chat_id, response)
+        track_name = payload.get("track_name") or "default"
 
-    scheduler = SchedulerService(conn, on_job)
-    scheduler.start()
-    scheduler.schedule_jobs()
+        @tracing.traced("job")
+        def job_turn() -> None:
+            response = agent_call(prompt, track_name)
+            chat_id = tracks.get_last_chat_id()
+            if chat_id:
+                send(chat_id, response)
 
-    def heartbeat_job() -> None:
-        result = run_heartbeat(config.heartbeat, config.paths.shared_root, lambda p: agent_call(p, "default"))
+        pool.submit(tracks.get_or_create(track_name).id, job_turn)
+
+    @tracing.traced("heartbeat")
+    def heartbeat_turn() -> None:
+        escalate_fn = None
+        if config.heartbeat.escalate and site_tier(config, "heartbeat") != site_tier(config, "interactive"):
+            escalate_fn = partial(agent_call, track_name="default", call_agent=agent, persist=False)
+        result = run_heartbeat(
+            config.heartbeat,
+            config.paths.shared_root,
+            partial(agent_call, track_name="default", call_agent=heartbeat_agent, persist=False),
+            escalate_fn,
+        )
+        remember_heartbeat(tracks, result)
+        if result.escalated:
+            log_writer.write("heartbeat escalated")
         if result.suppressed:
             log_writer.write("heartbeat suppressed")
             return
         log_writer.write(f"heartbeat message={result.message}")
-        chat_id = _get_last_chat_id(conn)
+        chat_id = tracks.get_last_chat_id()
         if chat_id:
             send(chat_id, result.message)
 
-    if config.heartbeat.enabled:
-        scheduler.scheduler.add_job(
-            heartbeat_job,
-            "interval",
-            minutes=config.heartbeat.interval_minutes,
-            id="heartbeat",
-            replace_existing=True,
-        )
+    def heartbeat_job() -> None:
+        pool.submit(tracks.get_or_create("default").id, heartbeat_turn)
+
+    threading.Thread(
+        target=start_scheduler,
+        args=(context, on_job, heartbeat_job, llms["summary"], agent.prompt_overhead, timer, report_error),
+        name="clawless-scheduler-start",
+        daemon=True,
+    ).start()
+
+    def process_update(item: InboxItem) -> None:
+        update = item.update
+        with tracing.span("update", root=True, chat_id=update.chat_id, inbox_id=item.id) as active:
+            tracks.set_last_chat_id(update.chat_id, wait=False)
+            log_writer.write(f"recv chat_id={update.chat_id} text={update.text}")
+            with tracing.span("route"):
+                routed = route_message(update.text)
+            if routed.text.startswith("/track"):
+                response = _handle_track_command(routed.text, tracks)
+                send(update.chat_id, response)
+                inbox.complete([item.id])
+                return
+            track = resolve_track(routed, tracks)
+            debouncer.add(track.id, IncomingMessage(routed.text, update.chat_id, item.id, active))
+
+    inbox_worker = InboxWorker(inbox, process_update, on_error=report_error)
+    inbox_worker.start()
+    start_metrics(config, metrics, pool.pending, sender, inbox, llms["interactive"])
+
+    with timer.phase("webhook"):
+        webhook = build_webhook(config, telegram, inbox, log_writer)
+    source = webhook or telegram
 
     print("Clawless bot service started.")
+    report_startup(log_writer, timer)
     while True:
         try:
-            updates = telegram.poll()
-            for update in updates:
-                _set_last_chat_id(conn, update.chat_id)
-                log_writer.write(f"recv chat_id={update.chat_id} text={update.text}")
-                routed = route_message(update.text)
-                if routed.text.startswith("/track"):
-                    response = _handle_track_command(routed.text, tracks)
-                    send(update.chat_id, response)
-                    continue
-                track_name = routed.track_name
-                if not track_name:
-                    last = tracks.get_last_active()
-                    track_name = last.name if last else "default"
-                track = tracks.get_or_create(track_name)
-                tracks.mark_active(track.id)
-                tracks.append_message(track.id, "user", routed.text)
-                recent = tracks.recent_messages(track.id, limit=20)
-                messages = [Message(m["role"], m["content"]) for m in recent]
-                response = agent.run(track.summary, messages)
-                tracks.append_message(track.id, "assistant", response)
-                send(update.chat_id, response)
+            with tracing.span("telegram.poll", root=True) as active:
+                updates = source.poll()
+                active.set(updates=len(updates))
+            # The webhook server stores updates itself before acknowledging them.
+            if not webhook:
+                for update in updates:
+                    inbox.enqueue(update)
+            if updates:
+                inbox_worker.notify()
         except Exception as exc:  # noqa: BLE001
-            print(f"Error: {exc}")
-            log_writer.write(f"error {exc}")
+            report_error(exc)
             time.sleep(2)
 
 
-def _set_last_chat_id(conn, chat_id: int) -> None:
-    conn.execute(
-        "INSERT OR REPLACE INTO settings (key, value) VALUES ('last_chat_id', ?)",
-        (str(chat_id),),
+def fail_turn(
+    inbox: Inbox,
+    send: Callable[[int, str], None],
+    batch: list[IncomingMessage],
+    error: Exception,
+) -> None:
+    # Hands the turn's rows back to the inbox. The user hears about a busy
+    # provider only when a retry is actually scheduled, and hears that the
+    # message was dropped once it has used up its attempts.
+    inbox_ids = [item.inbox_id for item in batch if item.inbox_id is not None]
+    chat_id = batch[-1].chat_id
+    if inbox.fail(inbox_ids, str(error)):
+        send(chat_id, DROPPED_REPLY)
+    elif inbox_ids and isinstance(error, LLMBusyError):
+        send(chat_id, BUSY_REPLY)
+
+
+def turn_span(track_id: int, batch: list[IncomingMessage]):
+    return tracing.span("turn", parent=batch[-1].trace, root=True, track_id=track_id, messages=len(batch))
+
+
+def log_usage(log_writer: LogWriter, track_id: int, stats: TurnStats) -> None:
+    log_writer.write(
+        f"usage track_id={track_id} llm_calls={stats.llm_calls} "
+        f"input_tokens={stats.input_tokens} output_tokens={stats.output_tokens} "
+        f"cached_tokens={stats.cached_tokens} cache_hit_ratio={stats.cache_hit_ratio:.2f}"
     )
-    conn.commit()
 
 
-def _get_last_chat_id(conn) -> int | None:
-    row = conn.execute(
-        "SELECT value FROM settings WHERE key = 'last_chat_id'"
-    ).fetchone()
-    if not row:
-        return None
-    try:
-        return int(row["value"])
-    except (TypeError, ValueError):
-        return None
+def remember_heartbeat(tracks: TrackManager, result: HeartbeatResult) -> None:
+    # Only the final answer is kept, not the small model's first pass.
+    if not result.prompt:
+        return
+    track = tracks.get_or_create("default")
+    with tracks.transaction():
+        tracks.append_message(track.id, "user", result.prompt)
+        tracks.append_message(track.id, "assistant", result.message)
+
+
+def log_cache_stats(log_writer: LogWriter, llm: LLMClient) -> None:
+    if not isinstance(llm, CachingLLMClient):
+        return
+    stats = llm.stats
+    log_writer.write(
+        f"llm_cache hits={stats.hits} misses={stats.misses} shared={stats.shared} "
+        f"bypassed={stats.bypassed} saved_seconds={stats.saved_seconds:.1f}"
+    )
+
+
+def resolve_track(routed: RoutedMessage, tracks: TrackManager) -> Track:
+    track_name = routed.track_name
+    if not track_name:
+        last = tracks.get_last_active()
+        track_name = last.name if last else "default"
+    with tracks.transaction():
+        track = tracks.get_or_create(track_name)
+        tracks.mark_active(track.id)
+    return track
+
+
+def save_turn(tracks: TrackManager, track_id: int, batch: list[IncomingMessage], response: str) -> None:
+    # The user messages are stored together with the reply, so a turn the
+    # inbox retries does not store them twice.
+    with tracks.transaction():
+        for item in batch:
+            tracks.append_message(track_id, "user", item.text)
+        tracks.append_message(track_id, "assistant", response)
+        tracks.mark_active(track_id)
 
 
 def _handle_track_command(text: str, tracks: TrackManager) -> str:
@@ -21,12 +21,46 @@ def _as_path(value: str | Path) -> Path:
 class TelegramConfig:
     token: str = ""
     owner_user_id: int = 0
+    send_rate_per_second: float = 30.0
+    chat_rate_per_second: float = 1.0
+    mode: str = "polling"  # "polling" or "webhook"
+    webhook_url: str = ""
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8443
+    webhook_path: str = "/telegram"
+    webhook_secret: str = ""
+
+
+@dataclass
+class LLMEndpointConfig:
+    connection_string: str
+    api_key: str = ""
+    base_url: str = ""
 
 
 @dataclass
 class LLMConfig:
     connection_string: str = ""
     api_key: str = ""
+    base_url: str = ""  # overrides the provider URL, e.g. a local OpenAI-compatible server
+    # Tried in order when the primary endpoint fails or, with hedge, is slow.
+    fallbacks: list[LLMEndpointConfig] = field(default_factory=list)
+    hedge: bool = False
+    hedge_min_seconds: float = 1.0
+    # Named extra models, and which one each call site uses ("default" is the
+    # endpoint above). Call sites: interactive, heartbeat, job, summary,
+    # tool_followup.
+    tiers: dict[str, LLMEndpointConfig] = field(default_factory=dict)
+    routing: dict[str, str] = field(default_factory=dict)
+    # Shared limiter for all LLM calls; 0 disables a per-minute bucket.
+    max_concurrency: int = 8
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_retries: int = 3
+    # Response cache for scheduled job and heartbeat prompts.
+    cache_enabled: bool = False
+    cache_ttl_seconds: int = 3600
+    cache_max_entries: int = 256
 
 
 @dataclass
@@ -52,6 +86,58 @@ class HeartbeatConfig:
     active_hours: Optional[str] = None  # "HH:MM-HH:MM" in local time
     prompt: str = DEFAULT_HEARTBEAT_PROMPT
     checklist_path: str = "HEARTBEAT.md"
+    # Re-ask the interactive model when the heartbeat model reports something.
+    escalate: bool = True
+
+
+@dataclass
+class SummaryConfig:
+    enabled: bool = True
+    interval_minutes: int = 15
+    batch_size: int = 50
+    idle_seconds: int = 120
+    max_words: int = 300
+
+
+@dataclass
+class TracingConfig:
+    enabled: bool = True
+    # OTLP/HTTP JSON endpoint, e.g. http://localhost:4318/v1/traces.
+    otlp_endpoint: str = ""
+    service_name: str = "clawless-bot"
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9464
+
+
+@dataclass
+class AgentConfig:
+    max_tool_steps: int = 4
+    max_parallel_tools: int = 4
+    tool_mode: str = "auto"  # "auto", "native" or "text"
+    context_tokens: int = 8000
+    reply_tokens: int = 1024
+    tool_result_max_chars: int = 4000
+    tool_result_page_chars: int = 4000
+
+
+@dataclass
+class RuntimeConfig:
+    workers: int = 4
+    async_concurrency: int = 100
+    debounce_seconds: float = 1.0
+    inbox_lease_seconds: int = 600
+    inbox_max_attempts: int = 3
+    streaming: bool = False
+    stream_edit_interval_seconds: float = 1.0
+    startup_wait_seconds: float = 0.5
+    track_cache_seconds: float = 1.0
+    history_messages: int = 200
+    history_cache_mb: int = 32
 
 
 @dataclass
@@ -61,16 +147,56 @@ class AppConfig:
     paths: PathsConfig = field(default_factory=PathsConfig)
     mcp_servers: list[MCPServerConfig] = field(default_factory=list)
     heartbeat: HeartbeatConfig = field(default_factory=HeartbeatConfig)
+    runtime: RuntimeConfig = field(default_factory=RuntimeConfig)
+    agent: AgentConfig = field(default_factory=AgentConfig)
+    summary: SummaryConfig = field(default_factory=SummaryConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
 
     def to_dict(self) -> dict[str, Any]:
         return {
             "telegram": {
                 "token": self.telegram.token,
                 "owner_user_id": self.telegram.owner_user_id,
+                "send_rate_per_second": self.telegram.send_rate_per_second,
+                "chat_rate_per_second": self.telegram.chat_rate_per_second,
+                "mode": self.telegram.mode,
+                "webhook_url": self.telegram.webhook_url,
+                "webhook_host": self.telegram.webhook_host,
+                "webhook_port": self.telegram.webhook_port,
+                "webhook_path": self.telegram.webhook_path,
+                "webhook_secret": self.telegram.webhook_secret,
             },
             "llm": {
                 "connection_string": self.llm.connection_string,
                 "api_key": self.llm.api_key,
+                "base_url": self.llm.base_url,
+                "fallbacks": [
+                    {
+                        "connection_string": item.connection_string,
+                        "api_key": item.api_key,
+                        "base_url": item.base_url,
+                    }
+                    for item in self.llm.fallbacks
+                ],
+                "hedge": self.llm.hedge,
+                "hedge_min_seconds": self.llm.hedge_min_seconds,
+                "tiers": {
+                    name: {
+                        "connection_string": tier.connection_string,
+                        "api_key": tier.api_key,
+                        "base_url": tier.base_url,
+                    }
+                    for name, tier in self.llm.tiers.items()
+                },
+                "routing": dict(self.llm.routing),
+                "max_concurrency": self.llm.max_concurrency,
+                "requests_per_minute": self.llm.requests_per_minute,
+                "tokens_per_minute": self.llm.tokens_per_minute,
+                "max_retries": self.llm.max_retries,
+                "cache_enabled": self.llm.cache_enabled,
+                "cache_ttl_seconds": self.llm.cache_ttl_seconds,
+                "cache_max_entries": self.llm.cache_max_entries,
             },
             "paths": {
                 "config_root": str(self.paths.config_root),
@@ -93,6 +219,46 @@ class AppConfig:
                 "active_hours": self.heartbeat.active_hours,
                 "prompt": self.heartbeat.prompt,
                 "checklist_path": self.heartbeat.checklist_path,
+                "escalate": self.heartbeat.escalate,
+            },
+            "runtime": {
+                "workers": self.runtime.workers,
+                "async_concurrency": self.runtime.async_concurrency,
+                "debounce_seconds": self.runtime.debounce_seconds,
+                "inbox_lease_seconds": self.runtime.inbox_lease_seconds,
+                "inbox_max_attempts": self.runtime.inbox_max_attempts,
+                "streaming": self.runtime.streaming,
+                "stream_edit_interval_seconds": self.runtime.stream_edit_interval_seconds,
+                "startup_wait_seconds": self.runtime.startup_wait_seconds,
+                "track_cache_seconds": self.runtime.track_cache_seconds,
+                "history_messages": self.runtime.history_messages,
+                "history_cache_mb": self.runtime.history_cache_mb,
+            },
+            "agent": {
+                "max_tool_steps": self.agent.max_tool_steps,
+                "max_parallel_tools": self.agent.max_parallel_tools,
+                "tool_mode": self.agent.tool_mode,
+                "context_tokens": self.agent.context_tokens,
+                "reply_tokens": self.agent.reply_tokens,
+                "tool_result_max_chars": self.agent.tool_result_max_chars,
+                "tool_result_page_chars": self.agent.tool_result_page_chars,
+            },
+            "summary": {
+                "enabled": self.summary.enabled,
+                "interval_minutes": self.summary.interval_minutes,
+                "batch_size": self.summary.batch_size,
+                "idle_seconds": self.summary.idle_seconds,
+                "max_words": self.summary.max_words,
+            },
+            "tracing": {
+                "enabled": self.tracing.enabled,
+                "otlp_endpoint": self.tracing.otlp_endpoint,
+                "service_name": self.tracing.service_name,
+            },
+            "metrics": {
+                "enabled": self.metrics.enabled,
+                "host": self.metrics.host,
+                "port": self.metrics.port,
             },
         }
 
@@ -103,14 +269,56 @@ class AppConfig:
         paths = payload.get("paths", {})
         heartbeat = payload.get("heartbeat", {})
         mcp_servers = payload.get("mcp_servers", [])
+        runtime = payload.get("runtime", {})
+        agent = payload.get("agent", {})
+        summary = payload.get("summary", {})
+        tracing = payload.get("tracing", {})
+        metrics = payload.get("metrics", {})
         return cls(
             telegram=TelegramConfig(
                 token=str(telegram.get("token", "")),
                 owner_user_id=int(telegram.get("owner_user_id", 0) or 0),
+                send_rate_per_second=float(telegram.get("send_rate_per_second", 30.0)),
+                chat_rate_per_second=float(telegram.get("chat_rate_per_second", 1.0)),
+                mode=str(telegram.get("mode", "polling")),
+                webhook_url=str(telegram.get("webhook_url", "")),
+                webhook_host=str(telegram.get("webhook_host", "0.0.0.0")),
+                webhook_port=int(telegram.get("webhook_port", 8443)),
+                webhook_path=str(telegram.get("webhook_path", "/telegram")),
+                webhook_secret=str(telegram.get("webhook_secret", "")),
             ),
             llm=LLMConfig(
                 connection_string=str(llm.get("connection_string", "")),
                 api_key=str(llm.get("api_key", "")),
+                base_url=str(llm.get("base_url", "")),
+                fallbacks=[
+                    LLMEndpointConfig(
+                        connection_string=str(item.get("connection_string", "")),
+                        api_key=str(item.get("api_key", "")),
+                        base_url=str(item.get("base_url", "")),
+                    )
+                    for item in llm.get("fallbacks", [])
+                    if item and item.get("connection_string")
+                ],
+                hedge=bool(llm.get("hedge", False)),
+                hedge_min_seconds=float(llm.get("hedge_min_seconds", 1.0)),
+                tiers={
+                    str(name): LLMEndpointConfig(
+                        connection_string=str(item.get("connection_string", "")),
+                        api_key=str(item.get("api_key", "")),
+                        base_url=str(item.get("base_url", "")),
+                    )
+                    for name, item in (llm.get("tiers") or {}).items()
+                    if item and item.get("connection_string")
+                },
+                routing={str(k): str(v) for k, v in (llm.get("routing") or {}).items()},
+                max_concurrency=int(llm.get("max_concurrency", 8)),
+                requests_per_minute=int(llm.get("requests_per_minute", 0)),
+                tokens_per_minute=int(llm.get("tokens_per_minute", 0)),
+                max_retries=int(llm.get("max_retries", 3)),
+                cache_enabled=bool(llm.get("cache_enabled", False)),
+                cache_ttl_seconds=int(llm.get("cache_ttl_seconds", 3600)),
+                cache_max_entries=int(llm.get("cache_max_entries", 256)),
             ),
             paths=PathsConfig(
                 config_root=_as_path(paths.get("config_root", "./config")),
@@ -134,6 +342,46 @@ class AppConfig:
                 active_hours=heartbeat.get("active_hours", None),
                 prompt=str(heartbeat.get("prompt", DEFAULT_HEARTBEAT_PROMPT)),
                 checklist_path=str(heartbeat.get("checklist_path", "HEARTBEAT.md")),
+                escalate=bool(heartbeat.get("escalate", True)),
+            ),
+            runtime=RuntimeConfig(
+                workers=int(runtime.get("workers", 4)),
+                async_concurrency=int(runtime.get("async_concurrency", 100)),
+                debounce_seconds=float(runtime.get("debounce_seconds", 1.0)),
+                inbox_lease_seconds=int(runtime.get("inbox_lease_seconds", 600)),
+                inbox_max_attempts=int(runtime.get("inbox_max_attempts", 3)),
+                streaming=bool(runtime.get("streaming", False)),
+                stream_edit_interval_seconds=float(runtime.get("stream_edit_interval_seconds", 1.0)),
+                startup_wait_seconds=float(runtime.get("startup_wait_seconds", 0.5)),
+                track_cache_seconds=float(runtime.get("track_cache_seconds", 1.0)),
+                history_messages=int(runtime.get("history_messages", 200)),
+                history_cache_mb=int(runtime.get("history_cache_mb", 32)),
+            ),
+            agent=AgentConfig(
+                max_tool_steps=int(agent.get("max_tool_steps", 4)),
+                max_parallel_tools=int(agent.get("max_parallel_tools", 4)),
+                tool_mode=str(agent.get("tool_mode", "auto")),
+                context_tokens=int(agent.get("context_tokens", 8000)),
+                reply_tokens=int(agent.get("reply_tokens", 1024)),
+                tool_result_max_chars=int(agent.get("tool_result_max_chars", 4000)),
+                tool_result_page_chars=int(agent.get("tool_result_page_chars", 4000)),
+            ),
+            summary=SummaryConfig(
+                enabled=bool(summary.get("enabled", True)),
+                interval_minutes=int(summary.get("interval_minutes", 15)),
+                batch_size=int(summary.get("batch_size", 50)),
+                idle_seconds=int(summary.get("idle_seconds", 120)),
+                max_words=int(summary.get("max_words", 300)),
+            ),
+            tracing=TracingConfig(
+                enabled=bool(tracing.get("enabled", True)),
+                otlp_endpoint=str(tracing.get("otlp_endpoint", "")),
+                service_name=str(tracing.get("service_name", "clawless-bot")),
+            ),
+            metrics=MetricsConfig(
+                enabled=bool(metrics.get("enabled", False)),
+                host=str(metrics.get("host", "127.0.0.1")),
+                port=int(metrics.get("port", 9464)),
             ),
         )
 
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Optional
+
+from clawless.agent import Message
+
+# Per-message framing (role markers, separators) in chat formats.
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "\n[... {omitted} characters omitted ...]\n"
+_UNLOADED = object()
+
+
+class TokenCounter:
+    # Uses tiktoken when it is installed (it ships with langchain-openai) and a
+    # characters-per-token estimate otherwise. The encoding is loaded on first
+    # use; reading its BPE ranks takes a noticeable part of startup.
+    def __init__(self, encoding: str = "o200k_base"):
+        self.encoding_name = encoding
+        self._encoding = _UNLOADED
+        self.count = lru_cache(maxsize=4096)(self._count)
+
+    @property
+    def exact(self) -> bool:
+        return self._get_encoding() is not None
+
+    def _get_encoding(self):
+        if self._encoding is _UNLOADED:
+            self._encoding = self._load_encoding(self.encoding_name)
+        return self._encoding
+
+    @staticmethod
+    def _load_encoding(name: str):
+        try:
+            import tiktoken
+
+            return tiktoken.get_encoding(name)
+        except Exception:  # noqa: BLE001
+            return None
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def count_message(self, message: Message) -> int:
+        return MESSAGE_OVERHEAD_TOKENS + self.count(message.content)
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        counter: Optional[TokenCounter] = None,
+        context_tokens: int = 8000,
+        reply_tokens: int = 1024,
+        page_size: int = 50,
+    ):
+        self.counter = counter or TokenCounter()
+        self.context_tokens = context_tokens
+        self.reply_tokens = reply_tokens
+        self.page_size = max(1, page_size)
+
+    def history_budget(self, overhead: str) -> int:
+        # `overhead` is everything sent besides history: system prompt, track
+        # summary and tool prompt or schemas.
+        used = self.reply_tokens + self.counter.count(overhead) + MESSAGE_OVERHEAD_TOKENS
+        return max(0, self.context_tokens - used)
+
+    def fit(self, messages: list[Message], budget: int, keep_newest: bool = True) -> list[Message]:
+        # Walks newest to oldest and stops at the first message that does not
+        # fit. With keep_newest the newest message is always kept, truncated if
+        # necessary.
+        kept: list[Message] = []
+        remaining = budget
+        for message in reversed(messages):
+            cost = self.counter.count_message(message)
+            if cost > remaining:
+                if keep_newest and not kept:
+                    kept.append(self._truncate(message, remaining))
+                break
+            kept.append(message)
+            remaining -= cost
+        kept.reverse()
+        return kept
+
+    def load(
+        self,
+        tracks,
+        track_id: int,
+        overhead: str,
+        after_id: int = 0,
+        pending: Optional[list[Message]] = None,
+    ) -> list[Message]:
+        # Pages back through stored history until the budget is spent. Messages
+        # at or below `after_id` are already in the track summary. `pending`
+        # are newer messages not stored yet; they are fitted first.
+        budget = self.history_budget(overhead)
+        kept = self.fit(pending, budget) if pending else []
+        budget -= sum(self.counter.count_message(message) for message in kept)
+        if pending and len(kept) < len(pending):
+            return kept
+        stored = self._fit_stored(tracks, track_id, budget, after_id, keep_newest=not kept)
+        return [message for _, message in stored] + kept
+
+    def window_start(self, tracks, track_id: int, overhead: str, after_id: int = 0) -> Optional[int]:
+        # Id of the oldest stored message load() would still send, or None if
+        # the track has no history past `after_id`. Everything older has
+        # fallen out of the token budget.
+        stored = self._fit_stored(tracks, track_id, self.history_budget(overhead), after_id, keep_newest=True)
+        return stored[0][0] if stored else None
+
+    def _fit_stored(
+        self,
+        tracks,
+        track_id: int,
+        budget: int,
+        after_id: int,
+        keep_newest: bool,
+    ) -> list[tuple[int, Message]]:
+        kept: list[tuple[int, Message]] = []
+        before_id = None
+        while True:
+            rows = tracks.recent_history(
+                track_id,
+                limit=self.page_size,
+                before_id=before_id,
+                after_id=after_id,
+            )
+            if not rows:
+                return kept
+            page = [message for _, message in rows]
+            fitted = self.fit(page, budget, keep_newest=keep_newest and not kept)
+            # fit() keeps a suffix of the page, so ids line up from the end.
+            ids = [message_id for message_id, _ in rows[len(rows) - len(fitted) :]]
+            kept = list(zip(ids, fitted)) + kept
+            budget -= sum(self.counter.count_message(message) for message in fitted)
+            if len(fitted) < len(page) or len(rows) < self.page_size:
+                return kept
+            before_id = rows[0][0]
+
+    def _truncate(self, message: Message, budget: int) -> Message:
+        # Keeps the head and tail of an oversized message, sized by the
+        # characters-per-token estimate and trimmed until it fits.
+        text = message.content
+        target = max(0, budget - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN
+        while target > 0:
+            head = text[: target // 2]
+            tail = text[len(text) - target // 2 :]
+            candidate = head + TRUNCATION_MARKER.format(omitted=len(text) - len(head) - len(tail)) + tail
+            if self.counter.count_message(Message(message.role, candidate)) <= budget:
+                return Message(message.role, candidate)
+            target = target * 3 // 4
+        return Message(message.role, TRUNCATION_MARKER.format(omitted=len(text)).strip())
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import queue
 import sqlite3
+import threading
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from clawless import tracing
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS tracks (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL UNIQUE,
     summary TEXT NOT NULL DEFAULT '',
-    last_active INTEGER NOT NULL DEFAULT 0
+    last_active INTEGER NOT NULL DEFAULT 0,
+    summary_upto INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS messages (
@@ -48,16 +57,270 @@ CREATE TABLE IF NOT EXISTS tool_audit (
     status TEXT NOT NULL,
     ts INTEGER NOT NULL
 );
+
+CREATE TABLE IF NOT EXISTS inbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    update_id INTEGER NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NOT NULL DEFAULT '',
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    latency REAL NOT NULL DEFAULT 0,
+    last_used INTEGER NOT NULL
+);
 """
 
 
+# WAL lets readers run alongside the writer, and with synchronous=NORMAL a
+# commit no longer waits for an fsync (only checkpoints do).
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16384",
+)
+
+
 def connect(db_path: Path) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
 def init_db(conn: sqlite3.Connection) -> None:
     conn.executescript(SCHEMA)
-    conn.commit()
+    migrate(conn)
+
+
+def _add_summary_upto(conn: sqlite3.Connection) -> None:
+    # Databases created before summaries were tracked.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(tracks)")}
+    if "summary_upto" not in columns:
+        conn.execute("ALTER TABLE tracks ADD COLUMN summary_upto INTEGER NOT NULL DEFAULT 0")
+
+
+def _add_indexes(conn: sqlite3.Connection) -> None:
+    # messages(track_id, id) serves recent_messages, unsummarized_messages and
+    # archive as an ordered range scan; id is the rowid, so role and content
+    # are one rowid lookup away without copying them into the index.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_track ON messages (track_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_track ON memories (track_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_audit_tool ON tool_audit (tool_name, ts)")
+
+
+# Applied in order; PRAGMA user_version records how many have run. Steps must
+# be idempotent, since databases from before this list existed are at 0.
+MIGRATIONS: tuple[Callable[[sqlite3.Connection], None], ...] = (
+    _add_summary_upto,
+    _add_indexes,
+)
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> int:
+    # Each step commits together with its version bump. The version is read
+    # under the write lock, so two processes starting at once do not both
+    # apply a step. Returns the resulting version.
+    target = len(MIGRATIONS) if target is None else min(target, len(MIGRATIONS))
+    if conn.in_transaction:
+        conn.commit()
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= target:
+                conn.execute("COMMIT")
+                return version
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+Write = Callable[[sqlite3.Connection], Any]
+
+
+class DBWriter:
+    # Owns the one connection that writes. Writes queued from any thread are
+    # applied by a single thread, which commits everything that queued up
+    # while the previous commit ran as one transaction (group commit); each
+    # write runs in its own savepoint so one failure does not undo the rest.
+    # transaction() instead runs a block of writes on the caller's thread and
+    # commits them together. Each group commit is traced as a root "db.commit"
+    # span, each transaction() as "db.transaction", and the wait for a queued
+    # write as "db.write" under the caller's span.
+    def __init__(self, db_path: Path, max_batch: int = 256):
+        self.conn = connect(db_path)
+        # Transactions are managed explicitly below.
+        self.conn.isolation_level = None
+        self.max_batch = max(1, max_batch)
+        self.commits = 0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._queue: queue.Queue[tuple[Write, Future] | None] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="clawless-db-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, fn: Write, wait: bool = True) -> Any:
+        # Inside transaction() the write joins it; otherwise it is queued and,
+        # with `wait`, the call returns once it is committed.
+        if self.in_transaction():
+            return fn(self.conn)
+        future: Future = Future()
+        self._queue.put((fn, future))
+        if not wait:
+            return future
+        with tracing.span("db.write"):
+            return future.result()
+
+    def in_transaction(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        if self.in_transaction():
+            self._local.depth += 1
+            try:
+                yield self.conn
+            finally:
+                self._local.depth -= 1
+            return
+        with tracing.span("db.transaction"), self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._local.depth = 1
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self._commit()
+            finally:
+                self._local.depth = 0
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.conn.close()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._apply(batch)
+            if stop:
+                return
+
+    def _apply(self, batch: list[tuple[Write, Future]]) -> None:
+        outcomes: list[tuple[Future, Any, Optional[BaseException]]] = []
+        with tracing.span("db.commit", root=True, writes=len(batch)), self._lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                for fn, future in batch:
+                    self.conn.execute("SAVEPOINT write")
+                    try:
+                        result = fn(self.conn)
+                    except Exception as exc:  # noqa: BLE001
+                        self.conn.execute("ROLLBACK TO write")
+                        self.conn.execute("RELEASE write")
+                        outcomes.append((future, None, exc))
+                    else:
+                        self.conn.execute("RELEASE write")
+                        outcomes.append((future, result, None))
+                self._commit()
+            except Exception as exc:  # noqa: BLE001
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                for _, future in batch:
+                    future.set_exception(exc)
+                return
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _commit(self) -> None:
+        self.conn.execute("COMMIT")
+        self.commits += 1
+
+
+class _Reader:
+    # Holds one thread's connection in its thread-local. When the thread exits
+    # the holder is dropped and the connection closed with it.
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.close = weakref.finalize(self, conn.close)
+
+
+class ConnectionPool:
+    # Hands each thread its own read-only connection (WAL readers never wait
+    # on the writer or on each other) and sends every write through one
+    # DBWriter. Inside writer.transaction() reads go to the writer's
+    # connection so they see the block's uncommitted writes.
+    def __init__(self, db_path: Path, writer: Optional[DBWriter] = None):
+        self.db_path = db_path
+        self.writer = writer or DBWriter(db_path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Weak, so readers of threads that have exited are not kept open.
+        self._readers: weakref.WeakSet[_Reader] = weakref.WeakSet()
+
+    def reader(self) -> sqlite3.Connection:
+        if self.writer.in_transaction():
+            return self.writer.conn
+        holder = getattr(self._local, "reader", None)
+        if holder is None:
+            conn = connect(self.db_path)
+            # Autocommit, so a read never holds a snapshot open between calls.
+            conn.isolation_level = None
+            conn.execute("PRAGMA query_only = ON")
+            holder = self._local.reader = _Reader(conn)
+            with self._lock:
+                self._readers.add(holder)
+        return holder.conn
+
+    def write(self, fn: Write, wait: bool = True) -> Any:
+        return self.writer.write(fn, wait)
+
+    def transaction(self):
+        return self.writer.transaction()
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        self.writer.close(timeout)
+        with self._lock:
+            readers = list(self._readers)
+            self._readers.clear()
+        for holder in readers:
+            holder.close()
+
+
+def reader(db: sqlite3.Connection | ConnectionPool) -> sqlite3.Connection:
+    # For callers that accept either a plain connection or a pool.
+    return db.reader() if isinstance(db, ConnectionPool) else db
@@ -7,13 +7,23 @@ from pathlib import Path
 from clawless.config import HeartbeatConfig, active_hours_contains
 
 
+HEARTBEAT_OK = "HEARTBEAT_OK"
+
+
 @dataclass
 class HeartbeatResult:
     message: str
     suppressed: bool
+    prompt: str = ""
+    escalated: bool = False
 
 
-def run_heartbeat(config: HeartbeatConfig, shared_root: Path, agent_fn) -> HeartbeatResult:
+def run_heartbeat(
+    config: HeartbeatConfig,
+    shared_root: Path,
+    agent_fn,
+    escalate_fn=None,
+) -> HeartbeatResult:
     now = time.localtime()
     minutes = now.tm_hour * 60 + now.tm_min
     if not active_hours_contains(config.active_hours, minutes):
@@ -26,5 +36,10 @@ def run_heartbeat(config: HeartbeatConfig, shared_root: Path, agent_fn) -> Heart
     if checklist_text:
         prompt = f"{prompt}\n\nHEARTBEAT.md:\n{checklist_text}"
     response = agent_fn(prompt)
-    suppressed = response.strip() == "HEARTBEAT_OK"
-    return HeartbeatResult(response, suppressed)
+    if response.strip() != HEARTBEAT_OK and escalate_fn is not None:
+        # The first pass runs on a small model; anything it flags is answered
+        # again by the main model before the user sees it.
+        response = escalate_fn(prompt)
+        return HeartbeatResult(response, response.strip() == HEARTBEAT_OK, prompt, escalated=True)
+    suppressed = response.strip() == HEARTBEAT_OK
+    return HeartbeatResult(response, suppressed, prompt)
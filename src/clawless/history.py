@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+
+from clawless.agent import Message
+
+# Rough cost of one entry besides its text: the Message, the (id, Message)
+# tuple and the deque slot.
+ENTRY_OVERHEAD_BYTES = 200
+
+Entry = tuple[int, Message]
+
+
+def _size(entry: Entry) -> int:
+    return ENTRY_OVERHEAD_BYTES + sys.getsizeof(entry[1].content)
+
+
+class _Buffer:
+    def __init__(self, entries: list[Entry], complete: bool):
+        self.entries: deque[Entry] = deque(entries)
+        # True when the track has no messages older than the buffer.
+        self.complete = complete
+        self.bytes = sum(_size(entry) for entry in entries)
+
+
+class RecentHistory:
+    # One ring buffer of the newest `per_track` messages for each warm track.
+    # TrackManager fills a buffer from SQLite the first time a track is read
+    # and appends to it as messages are stored. Least recently used tracks
+    # are evicted once all buffers together pass `max_bytes`.
+    def __init__(self, per_track: int = 200, max_bytes: int = 32 * 1024 * 1024):
+        self.per_track = max(1, per_track)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._tracks: OrderedDict[int, _Buffer] = OrderedDict()
+        self._lock = threading.Lock()
+        self._appends = 0
+
+    def window(
+        self,
+        track_id: int,
+        limit: int,
+        before_id: Optional[int] = None,
+        after_id: int = 0,
+    ) -> Optional[list[Entry]]:
+        # The newest `limit` messages with after_id < id < before_id, oldest
+        # first, or None when the track is cold or the range reaches past the
+        # oldest buffered message.
+        with self._lock:
+            buffer = self._tracks.get(track_id)
+            if buffer is None:
+                self.misses += 1
+                return None
+            self._tracks.move_to_end(track_id)
+            found: list[Entry] = []
+            covered = buffer.complete
+            for entry in reversed(buffer.entries):
+                if before_id is not None and entry[0] >= before_id:
+                    continue
+                if entry[0] <= after_id:
+                    covered = True
+                    break
+                found.append(entry)
+                if len(found) == limit:
+                    covered = True
+                    break
+            # Every message of the track from the oldest buffered id on is here.
+            if buffer.entries and after_id >= buffer.entries[0][0] - 1:
+                covered = True
+            if not covered:
+                self.misses += 1
+                return None
+            self.hits += 1
+        found.reverse()
+        return found
+
+    def mark(self) -> int:
+        # Taken before reading a cold track from SQLite; see fill().
+        return self._appends
+
+    def fill(self, track_id: int, entries: list[Entry], mark: int) -> None:
+        # `entries` are the newest messages of the track, oldest first, read
+        # after mark(). Skipped if anything was appended since, as that
+        # message may be missing from what was read.
+        with self._lock:
+            if self._appends != mark or track_id in self._tracks:
+                return
+            entries = entries[-self.per_track :]
+            buffer = _Buffer(entries, complete=len(entries) < self.per_track)
+            self._tracks[track_id] = buffer
+            self.bytes += buffer.bytes
+            self._evict()
+
+    def append(self, track_id: int, message_id: int, message: Message) -> None:
+        with self._lock:
+            self._appends += 1
+            buffer = self._tracks.get(track_id)
+            if buffer is None:
+                return
+            if buffer.entries and message_id <= buffer.entries[-1][0]:
+                # Committed out of order with another writer; rebuild on next read.
+                self._remove(track_id)
+                return
+            entry = (message_id, message)
+            buffer.entries.append(entry)
+            size = _size(entry)
+            buffer.bytes += size
+            self.bytes += size
+            if len(buffer.entries) > self.per_track:
+                size = _size(buffer.entries.popleft())
+                buffer.bytes -= size
+                self.bytes -= size
+                buffer.complete = False
+            self._evict()
+
+    def drop(self, track_id: int) -> None:
+        with self._lock:
+            self._appends += 1
+            self._remove(track_id)
+
+    def tracks(self) -> int:
+        return len(self._tracks)
+
+    def _remove(self, track_id: int) -> None:
+        buffer = self._tracks.pop(track_id, None)
+        if buffer is not None:
+            self.bytes -= buffer.bytes
+
+    def _evict(self) -> None:
+        while self.bytes > self.max_bytes and self._tracks:
+            _, buffer = self._tracks.popitem(last=False)
+            self.bytes -= buffer.bytes
+            self.evictions += 1
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from clawless.db import ConnectionPool, reader
+from clawless.telegram.adapter import TelegramUpdate
+
+
+@dataclass
+class InboxItem:
+    id: int
+    update: TelegramUpdate
+    attempts: int
+
+
+class Inbox:
+    # `conn` is a plain connection or a ConnectionPool; with a pool every
+    # write goes through its DBWriter like the track writes do. Rows this
+    # process has claimed but not yet completed or failed are "held"; renew()
+    # keeps their leases from running out while they wait in the debouncer and
+    # the track queues, so they are not claimed and answered twice.
+    def __init__(self, conn, lease_seconds: int = 600, max_attempts: int = 3):
+        self.conn = conn
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._held: set[int] = set()
+        self._held_lock = threading.Lock()
+        self._renewed_at = time.monotonic()
+
+    def _write(self, fn: Callable[[Any], Any]) -> Any:
+        if isinstance(self.conn, ConnectionPool):
+            return self.conn.write(fn)
+        with self._lock:
+            result = fn(self.conn)
+            self.conn.commit()
+        return result
+
+    def enqueue(self, update: TelegramUpdate) -> bool:
+        now = int(time.time())
+
+        def store(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO inbox (update_id, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, 'pending', ?, ?)",
+                (update.update_id, json.dumps(asdict(update)), now, now),
+            )
+            # The getUpdates offset is committed with the row, so a restart
+            # resumes after the last stored update instead of refetching.
+            conn.execute(
+                "INSERT INTO settings (key, value) VALUES ('telegram_offset', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value "
+                "WHERE CAST(excluded.value AS INTEGER) > CAST(settings.value AS INTEGER)",
+                (str(update.update_id + 1),),
+            )
+            return cursor
+
+        return self._write(store).rowcount == 1
+
+    def offset(self) -> Optional[int]:
+        with self._lock:
+            row = reader(self.conn).execute(
+                "SELECT value FROM settings WHERE key = 'telegram_offset'"
+            ).fetchone()
+        return int(row["value"]) if row else None
+
+    def recover(self) -> int:
+        # Called at startup: nothing can still be running, so every lease is stale.
+        now = int(time.time())
+        cursor = self._write(
+            lambda conn: conn.execute(
+                "UPDATE inbox SET status = 'pending', lease_until = 0, updated_at = ? "
+                "WHERE status = 'processing'",
+                (now,),
+            )
+        )
+        return cursor.rowcount
+
+    def claim(self, limit: int = 10) -> list[InboxItem]:
+        now = int(time.time())
+
+        def take(conn) -> list[InboxItem]:
+            conn.execute(
+                "UPDATE inbox SET status = 'dead', last_error = 'lease expired', updated_at = ? "
+                "WHERE status = 'processing' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT id, payload, attempts FROM inbox "
+                "WHERE status IN ('pending', 'processing') AND lease_until <= ? "
+                "ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            items = []
+            for row in rows:
+                conn.execute(
+                    "UPDATE inbox SET status = 'processing', attempts = attempts + 1, "
+                    "lease_until = ?, updated_at = ? WHERE id = ?",
+                    (now + self.lease_seconds, now, row["id"]),
+                )
+                items.append(
+                    InboxItem(
+                        id=row["id"],
+                        update=TelegramUpdate(**json.loads(row["payload"])),
+                        attempts=row["attempts"] + 1,
+                    )
+                )
+            return items
+
+        items = self._write(take)
+        with self._held_lock:
+            self._held.update(item.id for item in items)
+        return items
+
+    def renew(self) -> int:
+        # Called from the claiming loop; writes at most every half lease.
+        with self._held_lock:
+            now = time.monotonic()
+            if now - self._renewed_at < self.lease_seconds / 2:
+                return 0
+            self._renewed_at = now
+            held = list(self._held)
+        if not held:
+            return 0
+        lease_until = int(time.time()) + self.lease_seconds
+        self._write(
+            lambda conn: conn.executemany(
+                "UPDATE inbox SET lease_until = ? WHERE id = ? AND status = 'processing'",
+                [(lease_until, item_id) for item_id in held],
+            )
+        )
+        return len(held)
+
+    def _release(self, item_ids: list[int]) -> None:
+        with self._held_lock:
+            self._held.difference_update(item_ids)
+
+    def complete(self, item_ids: Iterable[int]) -> None:
+        now = int(time.time())
+        item_ids = list(item_ids)
+        params = [(now, item_id) for item_id in item_ids]
+        self._write(
+            lambda conn: conn.executemany(
+                "UPDATE inbox SET status = 'done', updated_at = ? WHERE id = ?",
+                params,
+            )
+        )
+        self._release(item_ids)
+
+    def fail(self, item_ids: Iterable[int], error: str) -> list[int]:
+        # Returns the ids that used up their attempts and were dead-lettered;
+        # the rest are retried after a backoff.
+        now = int(time.time())
+        item_ids = list(item_ids)
+
+        def mark(conn) -> list[int]:
+            dead = []
+            for item_id in item_ids:
+                row = conn.execute(
+                    "SELECT attempts FROM inbox WHERE id = ?",
+                    (item_id,),
+                ).fetchone()
+                if not row:
+                    continue
+                if row["attempts"] >= self.max_attempts:
+                    status, not_before = "dead", 0
+                    dead.append(item_id)
+                else:
+                    status, not_before = "pending", now + 2 ** row["attempts"]
+                conn.execute(
+                    "UPDATE inbox SET status = ?, lease_until = ?, last_error = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (status, not_before, error, now, item_id),
+                )
+            return dead
+
+        dead = self._write(mark)
+        self._release(item_ids)
+        return dead
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = reader(self.conn).execute(
+                "SELECT status, COUNT(*) AS n FROM inbox GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def purge_done(self, older_than_seconds: int = 86400) -> int:
+        cutoff = int(time.time()) - older_than_seconds
+        cursor = self._write(
+            lambda conn: conn.execute(
+                "DELETE FROM inbox WHERE status = 'done' AND updated_at < ?",
+                (cutoff,),
+            )
+        )
+        return cursor.rowcount
+
+
+class InboxWorker:
+    # Claims inbox rows on its own thread and passes each to `handler`. A handler
+    # that raises fails the row; otherwise the handler owns completing it.
+    def __init__(
+        self,
+        inbox: Inbox,
+        handler: Callable[[InboxItem], None],
+        idle_seconds: float = 1.0,
+        on_error: Callable[[Exception], None] | None = None,
+    ):
+        self.inbox = inbox
+        self.handler = handler
+        self.idle_seconds = idle_seconds
+        self.on_error = on_error
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="clawless-inbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                self.inbox.renew()
+                items = self.inbox.claim()
+            except Exception as exc:  # noqa: BLE001
+                items = []
+                if self.on_error:
+                    self.on_error(exc)
+            for item in items:
+                try:
+                    self.handler(item)
+                except Exception as exc:  # noqa: BLE001
+                    self.inbox.fail([item.id], str(exc))
+                    if self.on_error:
+                        self.on_error(exc)
+            if not items:
+                self._wake.wait(self.idle_seconds)
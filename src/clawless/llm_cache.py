@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generator, Optional
+
+from clawless.agent import Agent, LLMClient, LLMResponse, Message
+from clawless.db import ConnectionPool, reader
+from clawless.tools.base import Tool
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    shared: int = 0  # callers that waited on an identical in-flight request
+    bypassed: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    content: str
+    expires_at: float
+    latency: float
+
+
+class _Flight:
+    # An in-flight request. Followers on threads wait on `done`; followers on
+    # an event loop await wait(), which resolves without holding a thread.
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: Optional[LLMResponse] = None
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._futures: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def finish(self) -> None:
+        with self._lock:
+            self.done.set()
+            futures, self._futures = self._futures, []
+        for loop, future in futures:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # The follower's loop is closed.
+                pass
+
+    async def wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                return
+            self._futures.append((loop, future))
+        await future
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def cache_key(model: str, messages: list[Message], tools: Optional[list[Tool]] = None) -> str:
+    payload = {
+        "model": model,
+        "tools": sorted(tool.name for tool in tools or []),
+        "messages": [[msg.role, " ".join(msg.content.split())] for msg in messages],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CachingLLMClient(LLMClient):
+    # Only plain text answers to tool-free requests are cached: a request that
+    # carries tool results or a response that asks for tools always goes to the
+    # model, so tool side effects are never skipped or replayed. `conn` (a
+    # connection or a ConnectionPool) adds a SQLite tier behind the memory one.
+    def __init__(
+        self,
+        inner: LLMClient,
+        model: str,
+        conn=None,
+        ttl_seconds: float = 3600,
+        max_entries: int = 256,
+    ):
+        self.inner = inner
+        self.model = model
+        self.conn = conn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.supports_native_tools = inner.supports_native_tools
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+    def invoke(self, messages: list[Message]) -> str:
+        return self.complete(messages).content
+
+    def complete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        if self._bypass(messages):
+            with self._lock:
+                self.stats.bypassed += 1
+            return self.inner.complete(messages, tools)
+        key = cache_key(self.model, messages, tools)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats.misses += 1
+            else:
+                self.stats.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+        started = time.monotonic()
+        try:
+            flight.response = self.inner.complete(messages, tools)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.response is not None and self._cacheable(flight.response):
+                    self._store(key, flight.response.content, time.monotonic() - started)
+            flight.finish()
+        return flight.response
+
+    async def acomplete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        if self._bypass(messages):
+            with self._lock:
+                self.stats.bypassed += 1
+            return await self.inner.acomplete(messages, tools)
+        key = cache_key(self.model, messages, tools)
+        now = time.time()
+        with self._lock:
+            entry = self._from_memory(key, now)
+        loaded = False
+        if entry is None and self.conn is not None:
+            # Only the SQLite read leaves the event loop.
+            entry = await asyncio.to_thread(self._load, key, now)
+            loaded = entry is not None
+        with self._lock:
+            if loaded:
+                self._remember(key, entry)
+            elif entry is None:
+                entry = self._from_memory(key, now)
+            if entry is not None:
+                return self._hit(entry)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats.misses += 1
+            else:
+                self.stats.shared += 1
+        if not leader:
+            await flight.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+        started = time.monotonic()
+        try:
+            flight.response = await self.inner.acomplete(messages, tools)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.response is not None and self._cacheable(flight.response):
+                    self._store(key, flight.response.content, time.monotonic() - started)
+            flight.finish()
+        return flight.response
+
+    def stream_complete(
+        self,
+        messages: list[Message],
+        tools: Optional[list[Tool]] = None,
+    ) -> Generator[str, None, LLMResponse]:
+        if self._bypass(messages):
+            with self._lock:
+                self.stats.bypassed += 1
+            response = yield from self.inner.stream_complete(messages, tools)
+            return response
+        key = cache_key(self.model, messages, tools)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is None:
+                self.stats.misses += 1
+        if cached is not None:
+            if cached.content:
+                yield cached.content
+            return cached
+        started = time.monotonic()
+        response = yield from self.inner.stream_complete(messages, tools)
+        if self._cacheable(response):
+            with self._lock:
+                self._store(key, response.content, time.monotonic() - started)
+        return response
+
+    def _bypass(self, messages: list[Message]) -> bool:
+        return any(msg.role == "tool" or msg.tool_calls for msg in messages)
+
+    @staticmethod
+    def _cacheable(response: LLMResponse) -> bool:
+        return not response.tool_calls and not Agent._parse_tool_calls(response.content)
+
+    # _lookup, _from_memory, _hit and _store run under self._lock.
+    def _lookup(self, key: str) -> Optional[LLMResponse]:
+        now = time.time()
+        entry = self._from_memory(key, now)
+        if entry is None:
+            entry = self._load(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            return None
+        return self._hit(entry)
+
+    def _from_memory(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._memory.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._memory[key]
+            entry = None
+        if entry is not None:
+            self._memory.move_to_end(key)
+        return entry
+
+    def _hit(self, entry: _Entry) -> LLMResponse:
+        self.stats.hits += 1
+        self.stats.saved_seconds += entry.latency
+        return LLMResponse(entry.content)
+
+    def _store(self, key: str, content: str, latency: float) -> None:
+        entry = _Entry(content, time.time() + self.ttl_seconds, latency)
+        self._remember(key, entry)
+        self._save(key, entry)
+
+    def _remember(self, key: str, entry: _Entry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> Optional[_Entry]:
+        if self.conn is None:
+            return None
+        with self._db_lock:
+            row = reader(self.conn).execute(
+                "SELECT response, expires_at, latency FROM llm_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        if row["expires_at"] <= now:
+            self._write(lambda conn: conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,)))
+            return None
+        self._write(
+            lambda conn: conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (int(now), key))
+        )
+        return _Entry(row["response"], row["expires_at"], row["latency"])
+
+    def _save(self, key: str, entry: _Entry) -> None:
+        if self.conn is None:
+            return
+        now = int(time.time())
+
+        def save(conn) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, expires_at, latency, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, entry.content, entry.expires_at, entry.latency, now),
+            )
+            # The SQLite tier is bounded the same way as memory: least recently
+            # used rows beyond max_entries are dropped along with expired ones.
+            conn.execute(
+                "DELETE FROM llm_cache WHERE expires_at <= ? OR key NOT IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT ?)",
+                (now, self.max_entries),
+            )
+
+        self._write(save)
+
+    def _write(self, fn) -> None:
+        # With a ConnectionPool the write is queued on its DBWriter and not
+        # waited for: callers hold self._lock, and the memory tier already
+        # has the entry.
+        if isinstance(self.conn, ConnectionPool):
+            self.conn.write(fn, wait=False)
+            return
+        with self._db_lock:
+            fn(self.conn)
+            self.conn.commit()
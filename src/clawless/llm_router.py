@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Generator, Optional
+
+from clawless.agent import LLMClient, LLMResponse, Message
+from clawless.ratelimit import ERROR, RATE_LIMITED, AdaptiveLimiter
+from clawless.tools.base import Tool
+
+
+@dataclass
+class EndpointStats:
+    ewma_latency: Optional[float] = None
+    error_rate: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    # When ewma_latency last got a sample.
+    measured_at: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=100))
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 10:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    client: LLMClient
+    stats: EndpointStats = field(default_factory=EndpointStats)
+
+
+class RoutingLLMClient(LLMClient):
+    # Sends each request to the first healthy endpoint and fails over down the
+    # list on errors. Healthy endpoints are ordered by EWMA latency; one within
+    # `latency_slack` times the fastest counts as a tie and keeps its
+    # configured place, so noise does not reorder them. A latency older than
+    # `latency_ttl_seconds` is ignored, which lets a demoted endpoint be tried
+    # again. One that fails `failure_threshold` times in a row is skipped for
+    # `cooldown_seconds`. With `hedge`, a second request goes
+    # to the next endpoint if the first has not answered within its p95
+    # latency, and whichever finishes first wins. Without it, requests run
+    # on the caller's thread (or task), so nothing here caps concurrency.
+    def __init__(
+        self,
+        endpoints: list[tuple[str, LLMClient]],
+        hedge: bool = False,
+        hedge_min_seconds: float = 1.0,
+        alpha: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        latency_slack: float = 1.5,
+        latency_ttl_seconds: float = 60.0,
+    ):
+        if not endpoints:
+            raise ValueError("RoutingLLMClient needs at least one endpoint")
+        self.endpoints = [Endpoint(name, client) for name, client in endpoints]
+        self.hedge = hedge
+        self.hedge_min_seconds = hedge_min_seconds
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_slack = latency_slack
+        self.latency_ttl_seconds = latency_ttl_seconds
+        self.supports_native_tools = all(e.client.supports_native_tools for e in self.endpoints)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if hedge:
+            # Losing hedged requests keep running to completion, so the pool
+            # is sized for two requests per endpoint.
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(4, 2 * len(self.endpoints)),
+                thread_name_prefix="clawless-llm",
+            )
+
+    def invoke(self, messages: list[Message]) -> str:
+        return self.complete(messages).content
+
+    def complete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        last_error: Optional[BaseException] = None
+        if self._executor is None:
+            for endpoint in self._order():
+                try:
+                    return self._call(endpoint, messages, tools)
+                except Exception as exc:  # noqa: BLE001
+                    last_error = exc
+            raise last_error if last_error else RuntimeError("No LLM endpoint available")
+
+        executor = self._executor
+        remaining = self._order()
+        pending: dict[Future, Endpoint] = {}
+
+        def launch() -> None:
+            endpoint = remaining.pop(0)
+            future = executor.submit(self._call, endpoint, messages, tools)
+            pending[future] = endpoint
+
+        launch()
+        hedged = not self.hedge
+        while pending:
+            timeout = None
+            if not hedged and remaining:
+                timeout = self.hedge_delay(next(iter(pending.values())))
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                launch()
+                continue
+            for future in done:
+                pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    return future.result()
+                last_error = error
+            if not pending and remaining:
+                launch()
+        raise last_error if last_error else RuntimeError("No LLM endpoint available")
+
+    async def acomplete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        # Same routing as complete() on the event loop. A losing hedged
+        # request is cancelled rather than left running.
+        remaining = self._order()
+        pending: dict[asyncio.Task, Endpoint] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            endpoint = remaining.pop(0)
+            task = asyncio.ensure_future(self._acall(endpoint, messages, tools))
+            pending[task] = endpoint
+
+        launch()
+        hedged = not self.hedge
+        try:
+            while pending:
+                timeout = None
+                if not hedged and remaining:
+                    timeout = self.hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    last_error = error
+                if not pending and remaining:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error if last_error else RuntimeError("No LLM endpoint available")
+
+    def stream_complete(
+        self,
+        messages: list[Message],
+        tools: Optional[list[Tool]] = None,
+    ) -> Generator[str, None, LLMResponse]:
+        # Streams are not hedged; failover only happens before the first chunk.
+        last_error: Optional[BaseException] = None
+        for endpoint in self._order():
+            started = time.monotonic()
+            stream = endpoint.client.stream_complete(messages, tools)
+            try:
+                first = next(stream)
+            except StopIteration as stop:
+                self._record(endpoint, time.monotonic() - started, None)
+                return stop.value
+            except Exception as exc:  # noqa: BLE001
+                self._record(endpoint, time.monotonic() - started, exc)
+                last_error = exc
+                continue
+            self._record(endpoint, time.monotonic() - started, None)
+            yield first
+            response = yield from stream
+            return response
+        raise last_error if last_error else RuntimeError("No LLM endpoint available")
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        p95 = endpoint.stats.p95()
+        if p95 is None:
+            return 4 * self.hedge_min_seconds
+        return max(self.hedge_min_seconds, p95)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                e.name: {
+                    "ewma_latency": e.stats.ewma_latency or 0.0,
+                    "error_rate": e.stats.error_rate,
+                    "requests": e.stats.requests,
+                    "failures": e.stats.failures,
+                }
+                for e in self.endpoints
+            }
+
+    def _order(self) -> list[Endpoint]:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.stats.cooldown_until <= now]
+            latency = {
+                e.name: e.stats.ewma_latency
+                for e in healthy
+                if e.stats.ewma_latency is not None and now - e.stats.measured_at <= self.latency_ttl_seconds
+            }
+            fastest = min(latency.values(), default=0.0)
+
+            def rank(endpoint: Endpoint) -> tuple[bool, float]:
+                # Endpoints failing more often than not drop behind the others;
+                # sorted() is stable, so ties keep the configured order.
+                ewma = latency.get(endpoint.name)
+                slow = ewma is not None and ewma > fastest * self.latency_slack
+                return (endpoint.stats.error_rate > 0.5, ewma if slow else 0.0)
+
+            healthy.sort(key=rank)
+            cooling = sorted(
+                (e for e in self.endpoints if e.stats.cooldown_until > now),
+                key=lambda e: e.stats.cooldown_until,
+            )
+        # Cooling endpoints stay at the back so a request still has somewhere
+        # to go when every endpoint is failing.
+        return healthy + cooling
+
+    def _call(self, endpoint: Endpoint, messages: list[Message], tools: Optional[list[Tool]]) -> LLMResponse:
+        started = time.monotonic()
+        try:
+            response = endpoint.client.complete(messages, tools)
+        except Exception as exc:  # noqa: BLE001
+            self._record(endpoint, time.monotonic() - started, exc)
+            raise
+        self._record(endpoint, time.monotonic() - started, None)
+        return response
+
+    async def _acall(self, endpoint: Endpoint, messages: list[Message], tools: Optional[list[Tool]]) -> LLMResponse:
+        started = time.monotonic()
+        try:
+            response = await endpoint.client.acomplete(messages, tools)
+        except Exception as exc:  # noqa: BLE001
+            self._record(endpoint, time.monotonic() - started, exc)
+            raise
+        self._record(endpoint, time.monotonic() - started, None)
+        return response
+
+    def _record(self, endpoint: Endpoint, latency: float, error: Optional[BaseException]) -> None:
+        stats = endpoint.stats
+        with self._lock:
+            stats.requests += 1
+            stats.error_rate += self.alpha * ((1.0 if error else 0.0) - stats.error_rate)
+            if error is not None:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= self.failure_threshold:
+                    stats.cooldown_until = time.monotonic() + self.cooldown_seconds
+                return
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+            stats.latencies.append(latency)
+            stats.measured_at = time.monotonic()
+            if stats.ewma_latency is None:
+                stats.ewma_latency = latency
+            else:
+                stats.ewma_latency += self.alpha * (latency - stats.ewma_latency)
+
+
+class LLMBusyError(RuntimeError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM provider is rate limiting requests; retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def rate_limit_delay(exc: BaseException) -> Optional[float]:
+    # Returns the Retry-After delay for a provider 429, or None for any other
+    # error. Works with openai/httpx/requests style exceptions.
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429 and "RateLimit" not in type(exc).__name__:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    value = getattr(exc, "retry_after", None) or headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class RateLimitedLLMClient(LLMClient):
+    # Runs every call through a shared AdaptiveLimiter at this client's
+    # priority and retries provider 429s after their Retry-After delay.
+    def __init__(
+        self,
+        inner: LLMClient,
+        limiter: AdaptiveLimiter,
+        priority: int = 0,
+        max_retries: int = 3,
+        reply_tokens: int = 1024,
+    ):
+        self.inner = inner
+        self.limiter = limiter
+        self.priority = priority
+        self.max_retries = max_retries
+        self.reply_tokens = reply_tokens
+        self.supports_native_tools = inner.supports_native_tools
+
+    def invoke(self, messages: list[Message]) -> str:
+        return self.complete(messages).content
+
+    def complete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        estimate = self._estimate(messages)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(self.priority, estimate)
+            try:
+                response = self.inner.complete(messages, tools)
+            except Exception as exc:  # noqa: BLE001
+                delay = rate_limit_delay(exc)
+                self.limiter.release(RATE_LIMITED if delay is not None else ERROR, delay or 0.0)
+                if delay is None:
+                    raise
+                if attempt == self.max_retries:
+                    raise LLMBusyError(delay) from exc
+                continue
+            self.limiter.release()
+            self._settle(estimate, response)
+            return response
+        raise AssertionError("unreachable")
+
+    async def acomplete(self, messages: list[Message], tools: Optional[list[Tool]] = None) -> LLMResponse:
+        # Same as complete(), but waits for the limiter and for Retry-After
+        # pauses on the event loop instead of holding a worker thread.
+        estimate = self._estimate(messages)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(self.priority, estimate)
+            try:
+                response = await self.inner.acomplete(messages, tools)
+            except asyncio.CancelledError:
+                self.limiter.release(ERROR)
+                raise
+            except Exception as exc:  # noqa: BLE001
+                delay = rate_limit_delay(exc)
+                self.limiter.release(RATE_LIMITED if delay is not None else ERROR, delay or 0.0)
+                if delay is None:
+                    raise
+                if attempt == self.max_retries:
+                    raise LLMBusyError(delay) from exc
+                continue
+            self.limiter.release()
+            self._settle(estimate, response)
+            return response
+        raise AssertionError("unreachable")
+
+    def stream_complete(
+        self,
+        messages: list[Message],
+        tools: Optional[list[Tool]] = None,
+    ) -> Generator[str, None, LLMResponse]:
+        # Only a 429 before the first chunk is retried.
+        estimate = self._estimate(messages)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(self.priority, estimate)
+            stream = self.inner.stream_complete(messages, tools)
+            try:
+                first = next(stream)
+            except StopIteration as stop:
+                self.limiter.release()
+                return stop.value
+            except Exception as exc:  # noqa: BLE001
+                delay = rate_limit_delay(exc)
+                self.limiter.release(RATE_LIMITED if delay is not None else ERROR, delay or 0.0)
+                if delay is None:
+                    raise
+                if attempt == self.max_retries:
+                    raise LLMBusyError(delay) from exc
+                continue
+            try:
+                yield first
+                response = yield from stream
+            except BaseException:
+                self.limiter.release(ERROR)
+                raise
+            self.limiter.release()
+            self._settle(estimate, response)
+            return response
+        raise AssertionError("unreachable")
+
+    def _estimate(self, messages: list[Message]) -> int:
+        return sum(len(message.content) for message in messages) // 4 + self.reply_tokens
+
+    def _settle(self, estimate: int, response: LLMResponse) -> None:
+        # Replaces the up-front estimate with what the provider reported.
+        if self.limiter.tokens is None or response is None or response.usage is None:
+            return
+        actual = response.usage.input_tokens + response.usage.output_tokens
+        self.limiter.tokens.adjust(actual - estimate)
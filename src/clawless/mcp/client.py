@@ -29,24 +29,29 @@ class MCPClient:
             headers["Authorization"] = f"Bearer {self.server.bearer_token}"
         return headers
 
-    def _rpc(self, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
-        payload = {
+    def _payload(self, method: str, params: dict[str, Any] | None = None) -> str:
+        return json.dumps({
             "jsonrpc": "2.0",
             "id": next(self._ids),
             "method": method,
             "params": params or {},
-        }
+        })
+
+    @staticmethod
+    def _result(data: dict[str, Any]) -> dict[str, Any]:
+        if "error" in data:
+            raise RuntimeError(data["error"])
+        return data.get("result", {})
+
+    def _rpc(self, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         resp = requests.post(
             self.server.url,
             headers=self._headers(),
-            data=json.dumps(payload),
+            data=self._payload(method, params),
             timeout=self.timeout,
         )
         resp.raise_for_status()
-        data = resp.json()
-        if "error" in data:
-            raise RuntimeError(data["error"])
-        return data.get("result", {})
+        return self._result(resp.json())
 
     def list_tools(self) -> list[dict[str, Any]]:
         result = self._rpc(self.server.list_method)
@@ -56,3 +61,40 @@ class MCPClient:
     def call_tool(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
         result = self._rpc(self.server.call_method, {"name": name, "arguments": arguments})
         return result
+
+
+class AsyncMCPClient(MCPClient):
+    def __init__(self, server: MCPServer, timeout: int = 30):
+        super().__init__(server, timeout)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import httpx
+            except ImportError as exc:  # noqa: BLE001
+                raise RuntimeError("httpx is required for the async runtime") from exc
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def _arpc(self, method: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        resp = await self.client.post(
+            self.server.url,
+            headers=self._headers(),
+            content=self._payload(method, params),
+        )
+        resp.raise_for_status()
+        return self._result(resp.json())
+
+    async def alist_tools(self) -> list[dict[str, Any]]:
+        result = await self._arpc(self.server.list_method)
+        return result.get("tools") or result.get("result") or []
+
+    async def acall_tool(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        return await self._arpc(self.server.call_method, {"name": name, "arguments": arguments})
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+from clawless.tracing import Span
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in sorted(values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum, count.
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(_labels(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                labels = _format_labels(key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+
+class Gauge:
+    # Read at scrape time from `read`, which returns a number or a mapping of
+    # label dicts to numbers, e.g. {(("status", "pending"),): 3}.
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Any]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def samples(self) -> list[str]:
+        value = self.read()
+        if isinstance(value, dict):
+            items = sorted(value.items())
+            return [f"{self.name}{_format_labels(tuple(key))} {_format_value(v)}" for key, v in items]
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Any]) -> Gauge:
+        return self._add(Gauge(name, help_text, read))
+
+    def get(self, name: str) -> Any:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:  # noqa: BLE001
+                # A failing gauge must not break the whole scrape.
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric: Any) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+
+class SpanMetrics:
+    # Turns finished spans into metrics. Runs as a tracer listener, on the
+    # tracer's thread, so the hot path only pays for the span itself.
+    def __init__(self, registry: MetricsRegistry):
+        self.turn = registry.histogram("clawless_turn_seconds", "Chat turn latency.")
+        self.phase = registry.histogram("clawless_turn_phase_seconds", "Latency of each phase of a turn.")
+        self.llm_seconds = registry.histogram("clawless_llm_seconds", "LLM call latency.")
+        self.llm_calls = registry.counter("clawless_llm_calls_total", "LLM calls.")
+        self.llm_errors = registry.counter("clawless_llm_errors_total", "LLM calls that raised.")
+        self.llm_tokens = registry.counter("clawless_llm_tokens_total", "Tokens reported by the provider.")
+        self.tool_seconds = registry.histogram("clawless_tool_seconds", "Tool handler latency.")
+        self.tool_errors = registry.counter("clawless_tool_errors_total", "Tool calls that failed.")
+        self.telegram_seconds = registry.histogram("clawless_telegram_seconds", "Telegram call latency.")
+        self.telegram_errors = registry.counter("clawless_telegram_errors_total", "Failed Telegram calls.")
+        self.track_seconds = registry.histogram(
+            "clawless_track_call_seconds",
+            "TrackManager call latency, cache hits included.",
+        )
+        self.db_commit_seconds = registry.histogram(
+            "clawless_sqlite_commit_seconds",
+            "Time the DBWriter holds the write transaction, by kind (group or transaction).",
+        )
+        self.db_commit_writes = registry.histogram(
+            "clawless_sqlite_commit_writes",
+            "Queued writes applied per group commit.",
+            buckets=BATCH_BUCKETS,
+        )
+        self.db_write_seconds = registry.histogram(
+            "clawless_sqlite_write_seconds",
+            "Time from queueing a write to its commit.",
+        )
+        self.job_seconds = registry.histogram("clawless_scheduler_job_seconds", "Scheduled job duration.")
+
+    def __call__(self, span: Span) -> None:
+        name = span.name
+        seconds = span.duration
+        if name == "turn":
+            self.turn.observe(seconds)
+        elif name.startswith("llm."):
+            self.llm_seconds.observe(seconds)
+            self.llm_calls.inc()
+            if span.error:
+                self.llm_errors.inc()
+            for kind in ("input", "output", "cached"):
+                tokens = span.attributes.get(f"{kind}_tokens")
+                if tokens:
+                    self.llm_tokens.inc(tokens, kind=kind)
+        elif name == "tool":
+            tool = span.attributes.get("tool", "")
+            self.tool_seconds.observe(seconds, tool=tool)
+            if span.error or "error" in span.attributes:
+                self.tool_errors.inc(tool=tool)
+        elif name.startswith("telegram."):
+            operation = name.split(".", 1)[1]
+            self.telegram_seconds.observe(seconds, op=operation)
+            if span.error:
+                self.telegram_errors.inc(op=operation)
+        elif name.startswith("tracks."):
+            self.track_seconds.observe(seconds, op=name.split(".", 1)[1])
+        elif name == "db.commit":
+            self.db_commit_seconds.observe(seconds, kind="group")
+            self.db_commit_writes.observe(span.attributes.get("writes", 0))
+        elif name == "db.transaction":
+            self.db_commit_seconds.observe(seconds, kind="transaction")
+        elif name == "db.write":
+            self.db_write_seconds.observe(seconds)
+        elif name in {"job", "heartbeat", "summary"}:
+            self.job_seconds.observe(seconds, job=name)
+        # Phases are the direct children of an update or turn span.
+        if span.parent_name in {"update", "turn"}:
+            self.phase.observe(seconds, phase=name)
+
+
+class MetricsServer:
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        host: str = "127.0.0.1",
+        port: int = 9464,
+        path: str = "/metrics",
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            return (self.host, self.port)
+        host, port = self._server.server_address[:2]
+        return (str(host), int(port))
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="clawless-metrics",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?", 1)[0] != server.path:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = server.registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return None
+
+        return Handler
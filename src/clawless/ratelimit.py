@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+# Outcomes reported to AdaptiveLimiter.release().
+SUCCESS = "success"
+RATE_LIMITED = "rate_limited"
+ERROR = "error"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    # Takes the tokens and returns 0.0, or returns the seconds until they
+    # would be available without taking anything.
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            if self.rate <= 0:
+                return float("inf")
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        # Drain the bucket so nothing is granted for roughly `seconds`.
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def adjust(self, tokens: float) -> None:
+        # Charges (or, when negative, refunds) tokens without waiting; the
+        # balance may go negative, which delays later callers.
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - tokens)
+
+
+class AdaptiveLimiter:
+    # AIMD concurrency limit plus optional request and token buckets. Waiters
+    # are served strictly by priority (lower first), then arrival order. A
+    # rate-limit signal halves the limit and pauses everyone for retry_after;
+    # each success raises the limit by 1/limit, about one slot per window.
+    # Other errors (timeouts, 5xx) leave the limit alone, so an outage never
+    # raises it. Threads wait in acquire() and coroutines in aacquire(); both
+    # share one queue, and a coroutine waits without holding a thread.
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        decrease_factor: float = 0.5,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.max_concurrency)
+        self.requests = None
+        if requests_per_minute > 0:
+            self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute)
+        self.tokens = None
+        if tokens_per_minute > 0:
+            self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int]] = []
+        # Event loop and wake-up event of each waiting coroutine, by entry.
+        self._async_waiters: dict[tuple[int, int], tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: int = 0, tokens: float = 0) -> None:
+        if self.tokens is not None:
+            tokens = min(tokens, self.tokens.capacity)
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    wait = self._wait_time(entry, tokens)
+                    if wait == 0.0:
+                        break
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._leave(entry)
+            self.in_flight += 1
+
+    async def aacquire(self, priority: int = 0, tokens: float = 0) -> None:
+        if self.tokens is not None:
+            tokens = min(tokens, self.tokens.capacity)
+        entry = (priority, next(self._seq))
+        wake = asyncio.Event()
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            self._async_waiters[entry] = (asyncio.get_running_loop(), wake)
+        try:
+            while True:
+                with self._cond:
+                    wake.clear()
+                    wait = self._wait_time(entry, tokens)
+                    if wait == 0.0:
+                        self.in_flight += 1
+                        return
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                del self._async_waiters[entry]
+                self._leave(entry)
+
+    def release(self, outcome: str = SUCCESS, retry_after: float = 0.0) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == RATE_LIMITED:
+                self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif outcome == SUCCESS:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._notify()
+
+    def _wait_time(self, entry: tuple[int, int], tokens: float) -> float | None:
+        # Runs under self._cond. Returns 0.0 once `entry` may run, having taken
+        # its budget; otherwise the seconds to wait, or None to wait for a
+        # release. A Retry-After pause is waited out in full.
+        wait = self._paused_until - time.monotonic()
+        if wait > 0:
+            return wait
+        if self._waiters[0] != entry or self.in_flight >= int(self.limit):
+            return None
+        wait = self._take_budget(tokens)
+        return wait if wait > 0 else 0.0
+
+    def _leave(self, entry: tuple[int, int]) -> None:
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+        self._notify()
+
+    def _notify(self) -> None:
+        self._cond.notify_all()
+        for loop, wake in self._async_waiters.values():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                # The waiter's loop is closed; its coroutine never resumes.
+                pass
+
+    def _take_budget(self, tokens: float) -> float:
+        # Runs under self._cond. Takes from both buckets or from neither.
+        wait = self.tokens.try_acquire(tokens) if self.tokens is not None and tokens > 0 else 0.0
+        if wait > 0:
+            return wait
+        if self.requests is not None:
+            request_wait = self.requests.try_acquire()
+            if request_wait > 0:
+                if self.tokens is not None and tokens > 0:
+                    self.tokens.adjust(-tokens)
+                return request_wait
+        return 0.0
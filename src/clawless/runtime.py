@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+Task = Callable[[], None]
+AsyncTask = Callable[[], Awaitable[None]]
+
+
+def _start_timer(delay: float, callback: Callable[..., None], *args: Any) -> threading.Timer:
+    timer = threading.Timer(delay, callback, args=args)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class TurnDebouncer:
+    # Collects items per key and hands them over in one batch once `window`
+    # seconds pass without a new item for that key. `call_later` must return a
+    # handle with cancel(); the asyncio runtime passes loop.call_later.
+    def __init__(
+        self,
+        window: float,
+        on_fire: Callable[[Hashable, list[Any]], None],
+        call_later: Callable[..., Any] = _start_timer,
+    ):
+        self.window = max(0.0, float(window))
+        self.on_fire = on_fire
+        self.call_later = call_later
+        self._lock = threading.Lock()
+        self._pending: dict[Hashable, list[Any]] = {}
+        self._timers: dict[Hashable, Any] = {}
+
+    def add(self, key: Hashable, item: Any) -> None:
+        if self.window <= 0:
+            self.on_fire(key, [item])
+            return
+        with self._lock:
+            self._pending.setdefault(key, []).append(item)
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._timers[key] = self.call_later(self.window, self._fire, key)
+
+    def flush(self) -> None:
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._fire(key)
+
+    def _fire(self, key: Hashable) -> None:
+        with self._lock:
+            items = self._pending.pop(key, [])
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+        if items:
+            self.on_fire(key, items)
+
+
+class TrackWorkerPool:
+    # Tasks sharing a key run one at a time in FIFO order; different keys run
+    # in parallel on up to `workers` threads.
+    def __init__(self, workers: int = 4, on_error: Callable[[Exception], None] | None = None):
+        self.workers = max(1, int(workers))
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._queues: dict[Hashable, deque[Task]] = {}
+        self._ready: deque[Hashable] = deque()
+        self._scheduled: set[Hashable] = set()
+        self._active = 0
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"clawless-turn-{index}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key: Hashable, task: Task) -> None:
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("Worker pool is shut down")
+            self._queues.setdefault(key, deque()).append(task)
+            if key not in self._scheduled:
+                self._scheduled.add(key)
+                self._ready.append(key)
+                self._cond.notify()
+
+    def pending(self, key: Hashable | None = None) -> int:
+        with self._cond:
+            if key is not None:
+                return len(self._queues.get(key, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+    def join(self, timeout: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._queues and self._active == 0,
+                timeout=timeout,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._stopping)
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                task = self._queues[key].popleft()
+                self._active += 1
+            try:
+                task()
+            except Exception as exc:  # noqa: BLE001
+                if self.on_error:
+                    self.on_error(exc)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    if self._queues[key]:
+                        self._ready.append(key)
+                    else:
+                        del self._queues[key]
+                        self._scheduled.discard(key)
+                    self._cond.notify_all()
+
+
+class AsyncTrackDispatcher:
+    # asyncio counterpart of TrackWorkerPool: one drain task per busy key, with
+    # a semaphore bounding the number of turns in flight across all keys.
+    def __init__(self, concurrency: int = 100, on_error: Callable[[Exception], None] | None = None):
+        self.concurrency = max(1, int(concurrency))
+        self.on_error = on_error
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._queues: dict[Hashable, deque[AsyncTask]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, key: Hashable, task: AsyncTask) -> None:
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(task)
+            return
+        self._queues[key] = deque([task])
+        drain = asyncio.get_running_loop().create_task(self._drain(key))
+        self._tasks.add(drain)
+        drain.add_done_callback(self._tasks.discard)
+
+    def pending(self, key: Hashable | None = None) -> int:
+        if key is not None:
+            return len(self._queues.get(key, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def join(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    async def _drain(self, key: Hashable) -> None:
+        queue = self._queues[key]
+        try:
+            while queue:
+                task = queue.popleft()
+                async with self._semaphore:
+                    try:
+                        await task()
+                    except Exception as exc:  # noqa: BLE001
+                        if self.on_error:
+                            self.on_error(exc)
+        finally:
+            del self._queues[key]
@@ -4,8 +4,7 @@ import json
 from dataclasses import dataclass
 from typing import Callable
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from clawless.db import reader
 
 
 @dataclass
@@ -18,8 +17,13 @@ class ScheduledJob:
 
 class SchedulerService:
     def __init__(self, conn, on_job: Callable[[dict], None]):
+        # A ConnectionPool, so jobs firing on APScheduler's worker threads
+        # each read on their own connection.
         self.conn = conn
         self.on_job = on_job
+        # APScheduler is slow to import; serve() builds this off the startup path.
+        from apscheduler.schedulers.background import BackgroundScheduler
+
         self.scheduler = BackgroundScheduler()
 
     def start(self) -> None:
@@ -29,7 +33,7 @@ class SchedulerService:
         self.scheduler.shutdown(wait=False)
 
     def load_jobs(self) -> list[ScheduledJob]:
-        rows = self.conn.execute(
+        rows = reader(self.conn).execute(
             "SELECT id, cron_spec, payload, enabled FROM jobs"
         ).fetchall()
         return [
@@ -43,6 +47,8 @@ class SchedulerService:
         ]
 
     def schedule_jobs(self) -> None:
+        from apscheduler.triggers.cron import CronTrigger
+
         for job in self.load_jobs():
             if not job.enabled:
                 continue
@@ -56,7 +62,7 @@ class SchedulerService:
             )
 
     def _run_job(self, job_id: int) -> None:
-        row = self.conn.execute(
+        row = reader(self.conn).execute(
             "SELECT payload FROM jobs WHERE id = ?",
             (job_id,),
         ).fetchone()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from clawless.tools.base import Tool, ToolRegistry
+
+
+class StartupTimer:
+    # Records how long each startup phase took, including phases that finish
+    # on background threads after the bot is already polling.
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.phases: list[tuple[str, float, bool]] = []
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            # Anything recorded after ready() did not delay the first message.
+            self.phases.append((name, seconds, self.ready_at is not None))
+
+    def ready(self) -> float:
+        self.ready_at = time.monotonic()
+        return self.ready_at - self.started
+
+    def report(self) -> str:
+        with self._lock:
+            phases = list(self.phases)
+        total = (self.ready_at or time.monotonic()) - self.started
+        parts = [f"startup ready={total:.3f}s"]
+        for name, seconds, late in phases:
+            parts.append(f"{name}={seconds:.3f}s{' (background)' if late else ''}")
+        return " ".join(parts)
+
+
+class ProviderLoader:
+    # Loads tool providers concurrently, one thread each. `wait` blocks for at
+    # most `timeout` seconds; providers still loading after that register
+    # themselves when they are ready, and the agent picks them up through the
+    # registry version on its next turn.
+    def __init__(
+        self,
+        registry: ToolRegistry,
+        timer: Optional[StartupTimer] = None,
+        on_ready: Optional[Callable[[str, int, float], None]] = None,
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+    ):
+        self.registry = registry
+        self.timer = timer
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self._threads: list[threading.Thread] = []
+
+    def start(self, name: str, load: Callable[[], list[Tool]]) -> None:
+        thread = threading.Thread(
+            target=self._run,
+            args=(name, load),
+            name=f"clawless-load-{name}",
+            daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def wait(self, timeout: float) -> list[str]:
+        # Returns the names of providers that are still loading.
+        deadline = time.monotonic() + max(0.0, timeout)
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return [t.name.removeprefix("clawless-load-") for t in self._threads if t.is_alive()]
+
+    def _run(self, name: str, load: Callable[[], list[Tool]]) -> None:
+        started = time.monotonic()
+        try:
+            tools = load()
+        except Exception as exc:  # noqa: BLE001
+            if self.on_error:
+                self.on_error(name, exc)
+            return
+        self.registry.register_many(tools)
+        seconds = time.monotonic() - started
+        if self.timer:
+            self.timer.record(name, seconds)
+        if self.on_ready:
+            self.on_ready(name, len(tools), seconds)
@@ -7,7 +7,7 @@ from pathlib import Path
 import streamlit as st
 
 from clawless.config import AppConfig, ConfigManager, coerce_config_roots, ensure_paths
-from clawless.db import connect, init_db
+from clawless.db import ConnectionPool, connect, init_db
 from clawless.tracks import TrackManager
 
 DEFAULT_CONFIG_ROOT = Path.home() / ".clawless"
@@ -21,6 +21,16 @@ def _load_config() -> tuple[ConfigManager, AppConfig]:
     return manager, config
 
 
+@st.cache_resource
+def _pool(db_path: str) -> ConnectionPool:
+    # One pool per database for the whole server; each script run reads on
+    # its own thread's connection and writes go through the shared writer.
+    conn = connect(Path(db_path))
+    init_db(conn)
+    conn.close()
+    return ConnectionPool(Path(db_path))
+
+
 def main() -> None:
     st.set_page_config(page_title="Clawless", layout="wide")
     manager, config = _load_config()
@@ -66,9 +76,7 @@ def main() -> None:
         st.subheader("Tracks")
         if config.paths.internal_root:
             db_path = Path(config.paths.internal_root) / "clawless.db"
-            conn = connect(db_path)
-            init_db(conn)
-            tracks = TrackManager(conn)
+            tracks = TrackManager(_pool(str(db_path)))
             items = tracks.list_tracks()
             if not items:
                 st.info("No tracks yet.")
@@ -85,9 +93,8 @@ def main() -> None:
     with tabs[2]:
         st.subheader("Jobs")
         db_path = Path(config.paths.internal_root) / "clawless.db"
-        conn = connect(db_path)
-        init_db(conn)
-        rows = conn.execute("SELECT id, cron_spec, payload, enabled FROM jobs").fetchall()
+        pool = _pool(str(db_path))
+        rows = pool.reader().execute("SELECT id, cron_spec, payload, enabled FROM jobs").fetchall()
         if not rows:
             st.info("No jobs scheduled.")
         else:
@@ -103,11 +110,12 @@ def main() -> None:
             submit = st.form_submit_button("Add Job")
             if submit:
                 payload = json.dumps({"prompt": prompt})
-                conn.execute(
-                    "INSERT INTO jobs (cron_spec, payload, enabled) VALUES (?, ?, 1)",
-                    (cron_spec, payload),
+                pool.write(
+                    lambda conn: conn.execute(
+                        "INSERT INTO jobs (cron_spec, payload, enabled) VALUES (?, ?, 1)",
+                        (cron_spec, payload),
+                    )
                 )
-                conn.commit()
                 st.success("Job added.")
 
     with tabs[3]:
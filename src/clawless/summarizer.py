@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional
+
+from clawless.agent import LLMClient, Message
+from clawless.context import ContextBuilder
+from clawless.tracks import TrackManager
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a user and an assistant. "
+    "Merge the new messages into the current summary. Keep facts, decisions, open tasks, "
+    "names and user preferences; drop small talk. Reply with the updated summary only, "
+    "in at most {max_words} words."
+)
+MAX_MESSAGE_CHARS = 2000
+
+
+class TrackSummarizer:
+    # Folds messages that no longer fit the context window into
+    # tracks.summary, `batch_size` at a time, and records the last folded
+    # message id so every run only reads what is new. The window is the one
+    # `context` builds for a turn; `overhead` maps a track summary to the rest
+    # of the request (see Agent.prompt_overhead).
+    def __init__(
+        self,
+        llm: LLMClient,
+        tracks: TrackManager,
+        context: Optional[ContextBuilder] = None,
+        overhead: Optional[Callable[[str], str]] = None,
+        batch_size: int = 50,
+        idle_seconds: int = 120,
+        max_words: int = 300,
+    ):
+        self.llm = llm
+        self.tracks = tracks
+        self.context = context or ContextBuilder()
+        self.overhead = overhead or (lambda summary: summary)
+        self.batch_size = max(1, batch_size)
+        self.idle_seconds = idle_seconds
+        self.max_words = max_words
+
+    def run_once(self) -> int:
+        # Tracks active within `idle_seconds` are skipped so summaries are
+        # written while a conversation is quiet.
+        cutoff = int(time.time()) - self.idle_seconds
+        folded = 0
+        for track in self.tracks.list_tracks():
+            if track.last_active > cutoff:
+                continue
+            folded += self.summarize_track(track.id)
+        return folded
+
+    def summarize_track(self, track_id: int) -> int:
+        folded = 0
+        while True:
+            track = self.tracks.get_by_id(track_id)
+            if track is None:
+                return folded
+            start = self.context.window_start(
+                self.tracks, track_id, self.overhead(track.summary), track.summary_upto
+            )
+            if start is None:
+                return folded
+            rows = self.tracks.unsummarized_messages(track_id, start, self.batch_size)
+            if not rows:
+                return folded
+            summary = self.llm.invoke(self._build_request(track.summary, rows)).strip()
+            self.tracks.update_summary(track_id, summary, upto=rows[-1]["id"])
+            folded += len(rows)
+            if len(rows) < self.batch_size:
+                return folded
+
+    def _build_request(self, summary: str, rows: list[dict]) -> list[Message]:
+        lines = []
+        for row in rows:
+            content = row["content"]
+            if len(content) > MAX_MESSAGE_CHARS:
+                content = content[:MAX_MESSAGE_CHARS] + " [...]"
+            lines.append(f"{row['role']}: {content}")
+        body = f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n" + "\n".join(lines)
+        return [
+            Message("system", SUMMARY_PROMPT.format(max_words=self.max_words)),
+            Message("user", body),
+        ]
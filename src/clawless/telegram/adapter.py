@@ -5,6 +5,36 @@ from dataclasses import dataclass
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_MAX_MESSAGE_CHARS = 4096
+
+
+class TelegramRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Telegram rate limit, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_MESSAGE_CHARS) -> list[str]:
+    chunks: list[str] = []
+    remaining = text
+    while len(remaining) > limit:
+        window = remaining[:limit]
+        cut = window.rfind("\n\n")
+        if cut <= 0:
+            cut = window.rfind("\n")
+        if cut <= 0:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = limit
+        chunks.append(remaining[:cut].rstrip())
+        remaining = remaining[cut:].lstrip("\n")
+        if remaining.startswith(" "):
+            remaining = remaining[1:]
+    if remaining or not chunks:
+        chunks.append(remaining)
+    return chunks
 
 
 @dataclass
@@ -23,14 +53,61 @@ class TelegramAdapter:
         self.timeout = timeout
         self.base_url = f"https://api.telegram.org/bot{token}"
         self.offset = None
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
 
     def poll(self) -> list[TelegramUpdate]:
+        resp = self.session.get(
+            f"{self.base_url}/getUpdates",
+            params=self._poll_params(),
+            timeout=self.timeout + 5,
+        )
+        resp.raise_for_status()
+        return self._handle_updates(resp.json())
+
+    def send_message(self, chat_id: int, text: str) -> int | None:
+        message_id = None
+        for chunk in split_message(text):
+            result = self._call("sendMessage", {"chat_id": chat_id, "text": chunk})
+            message_id = result.get("message_id") if isinstance(result, dict) else None
+        return message_id
+
+    def edit_message_text(self, chat_id: int, message_id: int, text: str) -> None:
+        self._call("editMessageText", {"chat_id": chat_id, "message_id": message_id, "text": text})
+
+    def set_webhook(self, url: str, secret_token: str = "") -> None:
+        data: dict[str, Any] = {"url": url}
+        if secret_token:
+            data["secret_token"] = secret_token
+        self._call("setWebhook", data)
+
+    def delete_webhook(self) -> None:
+        self._call("deleteWebhook", {})
+
+    def _call(self, method: str, data: dict[str, Any]) -> Any:
+        resp = self.session.post(f"{self.base_url}/{method}", data=data, timeout=self.timeout)
+        self._check_rate_limit(resp.status_code, resp)
+        resp.raise_for_status()
+        return resp.json().get("result")
+
+    @staticmethod
+    def _check_rate_limit(status_code: int, resp) -> None:
+        if status_code != 429:
+            return
+        retry_after = 1.0
+        try:
+            retry_after = float(resp.json().get("parameters", {}).get("retry_after", retry_after))
+        except (ValueError, AttributeError):
+            pass
+        raise TelegramRateLimited(retry_after)
+
+    def _poll_params(self) -> dict[str, Any]:
         params: dict[str, Any] = {"timeout": self.timeout}
         if self.offset is not None:
             params["offset"] = self.offset
-        resp = requests.get(f"{self.base_url}/getUpdates", params=params, timeout=self.timeout + 5)
-        resp.raise_for_status()
-        data = resp.json()
+        return params
+
+    def _handle_updates(self, data: dict[str, Any]) -> list[TelegramUpdate]:
         if not data.get("ok"):
             return []
         updates = []
@@ -41,14 +118,6 @@ class TelegramAdapter:
                 self.offset = update.update_id + 1
         return updates
 
-    def send_message(self, chat_id: int, text: str) -> None:
-        resp = requests.post(
-            f"{self.base_url}/sendMessage",
-            data={"chat_id": chat_id, "text": text},
-            timeout=self.timeout,
-        )
-        resp.raise_for_status()
-
     def _parse_update(self, item: dict[str, Any]) -> TelegramUpdate | None:
         message = item.get("message")
         if not message:
@@ -66,3 +135,29 @@ class TelegramAdapter:
             chat_id=int(message.get("chat", {}).get("id")),
             text=str(text),
         )
+
+
+class AsyncTelegramAdapter(TelegramAdapter):
+    def __init__(self, token: str, owner_user_id: int, timeout: int = 30):
+        super().__init__(token, owner_user_id, timeout)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import httpx
+            except ImportError as exc:  # noqa: BLE001
+                raise RuntimeError("httpx is required for the async runtime") from exc
+            self._client = httpx.AsyncClient(timeout=self.timeout + 5)
+        return self._client
+
+    async def apoll(self) -> list[TelegramUpdate]:
+        resp = await self.client.get(f"{self.base_url}/getUpdates", params=self._poll_params())
+        resp.raise_for_status()
+        return self._handle_updates(resp.json())
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
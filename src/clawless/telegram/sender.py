@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from clawless import tracing
+from clawless.ratelimit import TokenBucket
+from clawless.telegram.adapter import (
+    TELEGRAM_MAX_MESSAGE_CHARS,
+    TelegramAdapter,
+    TelegramRateLimited,
+    split_message,
+)
+
+# Telegram allows roughly 30 messages/second per bot and 1 message/second per chat.
+DEFAULT_RATE_PER_SECOND = 30.0
+DEFAULT_CHAT_RATE_PER_SECOND = 1.0
+EMPTY_REPLY_TEXT = "(The model returned an empty reply.)"
+FAILED_REPLY_TEXT = "(This reply was interrupted.)"
+
+
+@dataclass
+class OutboundMessage:
+    chat_id: int
+    text: str
+    # Span of the turn that queued the message, so delivery shows up in its trace.
+    parent: Optional[tracing.Span] = None
+
+
+class TelegramSender:
+    def __init__(
+        self,
+        adapter: TelegramAdapter,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        chat_rate_per_second: float = DEFAULT_CHAT_RATE_PER_SECOND,
+        max_attempts: int = 5,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.adapter = adapter
+        self.global_bucket = TokenBucket(rate_per_second)
+        self.chat_rate_per_second = chat_rate_per_second
+        self.max_attempts = max_attempts
+        self.on_error = on_error
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._queue: queue.Queue[OutboundMessage | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="clawless-telegram-sender", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def send(self, chat_id: int, text: str) -> None:
+        parent = tracing.current()
+        for chunk in split_message(text):
+            self._queue.put(OutboundMessage(chat_id, chunk, parent))
+
+    def send_now(self, chat_id: int, text: str) -> int | None:
+        with tracing.span("telegram.send", chat_id=chat_id, bytes=len(text.encode("utf-8"))):
+            return self._with_limits(chat_id, lambda: self.adapter.send_message(chat_id, text))
+
+    def edit_now(self, chat_id: int, message_id: int, text: str, attempts: int | None = None) -> None:
+        with tracing.span("telegram.edit", chat_id=chat_id, bytes=len(text.encode("utf-8"))):
+            self._with_limits(
+                chat_id,
+                lambda: self.adapter.edit_message_text(chat_id, message_id, text),
+                attempts,
+            )
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: self._queue.unfinished_tasks == 0,
+                timeout=timeout,
+            )
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._deliver(item)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, item: OutboundMessage) -> None:
+        try:
+            with tracing.span(
+                "telegram.send",
+                parent=item.parent,
+                root=item.parent is None,
+                chat_id=item.chat_id,
+                bytes=len(item.text.encode("utf-8")),
+                queued=True,
+            ):
+                self._with_limits(item.chat_id, lambda: self.adapter.send_message(item.chat_id, item.text))
+        except Exception as exc:  # noqa: BLE001
+            if self.on_error:
+                self.on_error(exc)
+
+    def _with_limits(self, chat_id: int, call: Callable[[], Any], attempts: int | None = None) -> Any:
+        max_attempts = attempts or self.max_attempts
+        failures = 0
+        while True:
+            self._chat_bucket(chat_id).acquire()
+            self.global_bucket.acquire()
+            try:
+                return call()
+            except TelegramRateLimited as exc:
+                # A 429 throttles the whole bot, so hold every send until it clears.
+                # It still uses up an attempt, or a chat that keeps hitting it
+                # would retry forever.
+                self.global_bucket.pause(exc.retry_after)
+                failures += 1
+                if failures >= max_attempts:
+                    raise
+            except Exception:  # noqa: BLE001
+                failures += 1
+                if failures >= max_attempts:
+                    raise
+                time.sleep(min(30.0, 0.5 * 2 ** failures))
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate_per_second))
+        return bucket
+
+
+class StreamingReply:
+    # Posts a placeholder, then edits it as text streams in, at most once per
+    # `min_interval` seconds. finish() writes the final text and sends anything
+    # past Telegram's length limit as follow-up messages. The placeholder never
+    # stays behind: an empty reply becomes `empty_text`, and abort() replaces
+    # it (or the partial text) with `failed_text` when the stream fails.
+    def __init__(
+        self,
+        sender: TelegramSender,
+        chat_id: int,
+        min_interval: float = 1.0,
+        placeholder: str = "…",
+        empty_text: str = EMPTY_REPLY_TEXT,
+        failed_text: str = FAILED_REPLY_TEXT,
+    ):
+        self.sender = sender
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self.placeholder = placeholder
+        self.empty_text = empty_text
+        self.failed_text = failed_text
+        self.text = ""
+        self.message_id: int | None = None
+        self._shown = ""
+        self._last_edit = 0.0
+
+    def start(self) -> None:
+        self.message_id = self.sender.send_now(self.chat_id, self.placeholder)
+        self._shown = self.placeholder
+        self._last_edit = time.monotonic()
+
+    def append(self, chunk: str) -> None:
+        self.text += chunk
+        if time.monotonic() - self._last_edit >= self.min_interval:
+            try:
+                self._edit(self.text[:TELEGRAM_MAX_MESSAGE_CHARS], attempts=1)
+            except Exception:  # noqa: BLE001
+                # Intermediate edits are best effort; finish() retries properly.
+                pass
+
+    def consume(self, chunks: Iterable[str]) -> str:
+        # start(), append() for every chunk, then finish().
+        self.start()
+        try:
+            for chunk in chunks:
+                self.append(chunk)
+        except BaseException:
+            self.abort()
+            raise
+        return self.finish()
+
+    def finish(self) -> str:
+        chunks = split_message(self.text) if self.text.strip() else []
+        if not chunks:
+            self._edit(self.empty_text)
+            return self.text
+        if self.message_id is None:
+            self.sender.send(self.chat_id, self.text)
+            return self.text
+        self._edit(chunks[0])
+        for chunk in chunks[1:]:
+            self.sender.send(self.chat_id, chunk)
+        return self.text
+
+    def abort(self) -> None:
+        try:
+            self._edit(self.failed_text, attempts=1)
+        except Exception:  # noqa: BLE001
+            # Best effort; the stream's own error is the one that matters.
+            pass
+
+    def _edit(self, text: str, attempts: int | None = None) -> None:
+        self._last_edit = time.monotonic()
+        if not text.strip() or text == self._shown or self.message_id is None:
+            return
+        self.sender.edit_now(self.chat_id, self.message_id, text, attempts)
+        self._shown = text
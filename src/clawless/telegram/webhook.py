@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+from clawless.telegram.adapter import TelegramAdapter, TelegramUpdate
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    # With an `inbox` (clawless.inbox.Inbox) each update is stored there before
+    # Telegram gets its 200, so an acknowledged update survives a crash; poll()
+    # then only reports what has already been stored. `on_reject` is called
+    # with a reason for every request that is refused or dropped.
+    def __init__(
+        self,
+        adapter: TelegramAdapter,
+        host: str = "0.0.0.0",
+        port: int = 8443,
+        path: str = "/telegram",
+        secret_token: str = "",
+        inbox=None,
+        on_reject: Optional[Callable[[str], None]] = None,
+    ):
+        self.adapter = adapter
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.inbox = inbox
+        self.on_reject = on_reject
+        self.updates: queue.Queue[TelegramUpdate] = queue.Queue()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            return (self.host, self.port)
+        host, port = self._server.server_address[:2]
+        return (str(host), int(port))
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="clawless-telegram-webhook",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+    def poll(self, timeout: float = 1.0) -> list[TelegramUpdate]:
+        try:
+            first = self.updates.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        updates = [first]
+        while True:
+            try:
+                updates.append(self.updates.get_nowait())
+            except queue.Empty:
+                return updates
+
+    def handle_payload(self, payload: dict[str, Any]) -> bool:
+        try:
+            update = self.adapter._parse_update(payload)
+        except (TypeError, ValueError, AttributeError) as exc:
+            # Malformed update, e.g. "message" is not an object or an id is
+            # missing. Dropped like a filtered one.
+            self.reject(f"malformed update_id={payload.get('update_id')} error={exc!r}")
+            return False
+        if update is None:
+            return False
+        if self.inbox is not None:
+            self.inbox.enqueue(update)
+        self.updates.put(update)
+        return True
+
+    def reject(self, reason: str) -> None:
+        if self.on_reject:
+            self.on_reject(reason)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802
+                if self.path != server.path:
+                    self._reply(404)
+                    return
+                if server.secret_token and self.headers.get(SECRET_HEADER) != server.secret_token:
+                    server.reject(f"bad secret from {self.client_address[0]}")
+                    self._reply(403)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError as exc:
+                    server.reject(f"invalid json error={exc}")
+                    self._reply(400)
+                    return
+                if isinstance(payload, dict):
+                    try:
+                        server.handle_payload(payload)
+                    except Exception as exc:  # noqa: BLE001
+                        # Not stored, so let Telegram deliver it again.
+                        server.reject(f"store failed error={exc!r}")
+                        self._reply(500)
+                        return
+                else:
+                    server.reject(f"payload is {type(payload).__name__}, not an object")
+                # Anything but 2xx makes Telegram redeliver, so filtered updates
+                # are acknowledged too.
+                self._reply(200)
+
+            def _reply(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return None
+
+        return Handler
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import re
+import threading
 from dataclasses import dataclass
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable, Optional
 
 
 @dataclass
@@ -10,17 +12,71 @@ class Tool:
     description: str
     input_schema: dict[str, Any]
     handler: Callable[[dict[str, Any]], dict[str, Any]]
+    async_handler: Optional[Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]] = None
+
+
+FUNCTION_NAME_PATTERN = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def function_name(tool_name: str) -> str:
+    # Provider function names allow only [A-Za-z0-9_-]{1,64}; MCP tools use ":".
+    return FUNCTION_NAME_PATTERN.sub("__", tool_name)[:64]
+
+
+def json_schema(input_schema: dict[str, Any]) -> dict[str, Any]:
+    if "type" in input_schema or "properties" in input_schema:
+        return input_schema
+    # Built-in tools describe arguments as {"name": "description"}.
+    return {
+        "type": "object",
+        "properties": {
+            name: {"type": "string", "description": str(description)}
+            for name, description in input_schema.items()
+        },
+    }
+
+
+def to_function_spec(tool: Tool) -> dict[str, Any]:
+    return {
+        "type": "function",
+        "function": {
+            "name": function_name(tool.name),
+            "description": tool.description,
+            "parameters": json_schema(tool.input_schema),
+        },
+    }
 
 
 class ToolRegistry:
     def __init__(self) -> None:
         self._tools: dict[str, Tool] = {}
+        # Bumped on every register so callers can memoize anything derived from
+        # the tool set.
+        self.version = 0
+        self._sorted: tuple[int, list[Tool]] = (0, [])
+        # Providers that finish loading after startup register from their own
+        # threads while turns are running.
+        self._lock = threading.Lock()
 
     def register(self, tool: Tool) -> None:
-        self._tools[tool.name] = tool
+        self.register_many([tool])
+
+    def register_many(self, tools: list[Tool]) -> None:
+        if not tools:
+            return
+        with self._lock:
+            for tool in tools:
+                self._tools[tool.name] = tool
+            self.version += 1
 
     def list_tools(self) -> list[Tool]:
-        return sorted(self._tools.values(), key=lambda t: t.name)
+        version, tools = self._sorted
+        if version != self.version:
+            with self._lock:
+                version = self.version
+                tools = sorted(self._tools.values(), key=lambda t: t.name)
+            self._sorted = (version, tools)
+        return list(tools)
 
     def get(self, name: str) -> Tool | None:
         return self._tools.get(name)
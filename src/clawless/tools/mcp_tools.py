@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any
 
-from clawless.mcp.client import MCPClient, MCPServer
+from clawless.mcp.client import AsyncMCPClient, MCPClient, MCPServer
 from clawless.tools.base import Tool, ToolRegistry
 
 
@@ -33,16 +33,20 @@ class MCPToolLoader:
             )
         return specs
 
-    def register(self, registry: ToolRegistry) -> None:
-        for spec in self.list_tool_specs():
-            registry.register(
-                Tool(
-                    name=f"mcp:{self.client.server.name}:{spec.name}",
-                    description=spec.description or f"MCP tool {spec.name}",
-                    input_schema=spec.input_schema,
-                    handler=self._make_handler(spec.name),
-                )
+    def load_tools(self) -> list[Tool]:
+        return [
+            Tool(
+                name=f"mcp:{self.client.server.name}:{spec.name}",
+                description=spec.description or f"MCP tool {spec.name}",
+                input_schema=spec.input_schema,
+                handler=self._make_handler(spec.name),
+                async_handler=self._make_async_handler(spec.name),
             )
+            for spec in self.list_tool_specs()
+        ]
+
+    def register(self, registry: ToolRegistry) -> None:
+        registry.register_many(self.load_tools())
 
     def _make_handler(self, name: str):
         def _handler(args: dict[str, Any]) -> dict[str, Any]:
@@ -50,6 +54,17 @@ class MCPToolLoader:
 
         return _handler
 
+    def _make_async_handler(self, name: str):
+        if not isinstance(self.client, AsyncMCPClient):
+            return None
+        client = self.client
+
+        async def _handler(args: dict[str, Any]) -> dict[str, Any]:
+            return await client.acall_tool(name, args)
+
+        return _handler
+
 
-def create_loader(server: MCPServer) -> MCPToolLoader:
-    return MCPToolLoader(MCPClient(server))
+def create_loader(server: MCPServer, use_async: bool = False) -> MCPToolLoader:
+    client = AsyncMCPClient(server) if use_async else MCPClient(server)
+    return MCPToolLoader(client)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import secrets
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from clawless.tools.base import Tool, ToolRegistry
+
+READ_TOOL_NAME = "read_tool_result"
+
+
+class ToolResultStore:
+    # Keeps oversized tool results out of the prompt. A result whose JSON is
+    # longer than `max_chars` is stored under a handle and replaced with a
+    # preview; the model pages through the rest with read_tool_result.
+    def __init__(
+        self,
+        max_chars: int = 4000,
+        page_chars: int = 4000,
+        directory: Optional[Path] = None,
+        max_handles: int = 64,
+    ):
+        self.max_chars = max(1, max_chars)
+        self.page_chars = max(1, page_chars)
+        self.directory = Path(directory) if directory else None
+        self.max_handles = max(1, max_handles)
+        self._handles: OrderedDict[str, Optional[str]] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Handles do not survive a restart, so neither do their files.
+            for stale in self.directory.glob("*.json"):
+                stale.unlink(missing_ok=True)
+
+    def register(self, registry: ToolRegistry) -> None:
+        registry.register(
+            Tool(
+                name=READ_TOOL_NAME,
+                description="Read more of a large tool result by handle, starting at offset.",
+                input_schema={
+                    "handle": "handle from a truncated tool result",
+                    "offset": "character offset to start from",
+                },
+                handler=self.read,
+            )
+        )
+
+    def cap(self, outcome: dict[str, Any]) -> dict[str, Any]:
+        # `outcome` is {"tool": ..., "result": ...} as built by Agent.
+        if "result" not in outcome or outcome.get("tool") == READ_TOOL_NAME:
+            return outcome
+        text = json.dumps(outcome["result"])
+        if len(text) <= self.max_chars:
+            return outcome
+        handle = self._save(text)
+        return {
+            "tool": outcome["tool"],
+            "truncated": True,
+            "handle": handle,
+            "total_chars": len(text),
+            "preview": text[: self.max_chars],
+            "next_offset": self.max_chars,
+            "note": f"Result truncated. Call {READ_TOOL_NAME} with this handle and next_offset for more.",
+        }
+
+    def read(self, args: dict[str, Any]) -> dict[str, Any]:
+        handle = str(args.get("handle", ""))
+        text = self._load(handle)
+        if text is None:
+            raise KeyError(f"Unknown or expired tool result handle: {handle}")
+        offset = max(0, int(args.get("offset", 0) or 0))
+        end = min(len(text), offset + self.page_chars)
+        return {
+            "handle": handle,
+            "offset": offset,
+            "content": text[offset:end],
+            "next_offset": end if end < len(text) else None,
+            "total_chars": len(text),
+        }
+
+    def _save(self, text: str) -> str:
+        handle = secrets.token_hex(8)
+        if self.directory:
+            (self.directory / f"{handle}.json").write_text(text, encoding="utf-8")
+        with self._lock:
+            # With a directory only the handle is kept in memory.
+            self._handles[handle] = None if self.directory else text
+            while len(self._handles) > self.max_handles:
+                old, _ = self._handles.popitem(last=False)
+                self._delete_file(old)
+        return handle
+
+    def _load(self, handle: str) -> Optional[str]:
+        with self._lock:
+            if handle not in self._handles:
+                return None
+            self._handles.move_to_end(handle)
+            text = self._handles[handle]
+        if text is None and self.directory:
+            path = self.directory / f"{handle}.json"
+            text = path.read_text(encoding="utf-8") if path.exists() else None
+        return text
+
+    def _delete_file(self, handle: str) -> None:
+        if self.directory:
+            (self.directory / f"{handle}.json").unlink(missing_ok=True)
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Protocol, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0
+    duration: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    started: float = field(default=0.0, repr=False)
+    parent_name: Optional[str] = field(default=None, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan(Span):
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+# Handed out when tracing is off so call sites never need to check.
+NOOP_SPAN = _NoopSpan("", "", "")
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class Tracer:
+    # Finished spans are queued and exported in batches on a background thread,
+    # so a span costs the caller two clock reads and a queue put. Listeners see
+    # every span on that thread as soon as it is dequeued.
+    def __init__(
+        self,
+        exporters: list[SpanExporter],
+        batch_size: int = 256,
+        flush_seconds: float = 1.0,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        listeners: Optional[list[Callable[[Span], None]]] = None,
+    ):
+        self.exporters = exporters
+        self.listeners = list(listeners or [])
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.on_error = on_error
+        self._queue: queue.Queue[Span | None] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="clawless-tracer", daemon=True)
+        self._thread.start()
+
+    def start(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_id=parent.span_id if parent else None,
+            start=time.time(),
+            attributes=attributes,
+            started=time.perf_counter(),
+            parent_name=parent.name if parent else None,
+        )
+
+    def finish(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.duration = time.perf_counter() - span.started
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self._queue.put(span)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: self._queue.unfinished_tasks == 0,
+                timeout=timeout,
+            )
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+        for exporter in self.exporters:
+            exporter.close()
+
+    def _run(self) -> None:
+        while True:
+            batch: list[Span] = []
+            item = self._queue.get()
+            stop = item is None
+            if item is not None:
+                self._notify(item)
+                batch.append(item)
+            deadline = time.monotonic() + self.flush_seconds
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    self._notify(item)
+                    batch.append(item)
+            if batch and self.exporters:
+                self._export(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _notify(self, finished: Span) -> None:
+        for listener in self.listeners:
+            try:
+                listener(finished)
+            except Exception as exc:  # noqa: BLE001
+                if self.on_error:
+                    self.on_error(exc)
+
+    def _export(self, batch: list[Span]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as exc:  # noqa: BLE001
+                if self.on_error:
+                    self.on_error(exc)
+
+
+class JSONLExporter:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.path.open("a", encoding="utf-8")
+
+    def export(self, spans: list[Span]) -> None:
+        for span in spans:
+            self._handle.write(json.dumps(span.to_dict(), default=str) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class OTLPExporter:
+    # OTLP/HTTP with the JSON encoding, e.g. http://localhost:4318/v1/traces on
+    # an OpenTelemetry collector.
+    def __init__(self, endpoint: str, service_name: str = "clawless-bot", timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: list[Span]) -> None:
+        body = json.dumps(self.payload(spans)).encode("utf-8")
+        request = urllib.request.Request(
+            self.endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    def close(self) -> None:
+        pass
+
+    def payload(self, spans: list[Span]) -> dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "clawless"}, "spans": [_otlp_span(s) for s in spans]}],
+                }
+            ]
+        }
+
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    start = int(span.start * 1e9)
+    data: dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(start),
+        "endTimeUnixNano": str(start + int(span.duration * 1e9)),
+        "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+    }
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+    if span.error:
+        data["status"] = {"code": 2, "message": span.error}
+    return data
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_tracer: Optional[Tracer] = None
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("clawless_span", default=None)
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, root: bool = False, **attributes: Any) -> Iterator[Span]:
+    # Nests under the current span unless `parent` is given or `root` starts a
+    # new trace. The span is current for the body of the with-block.
+    tracer = _tracer
+    if tracer is None:
+        yield NOOP_SPAN
+        return
+    if parent is None and not root:
+        parent = _current.get()
+    active = tracer.start(name, parent, **attributes)
+    token = _current.set(active)
+    try:
+        yield active
+    except BaseException as exc:
+        tracer.finish(active, exc)
+        raise
+    else:
+        tracer.finish(active)
+    finally:
+        _current.reset(token)
+
+
+def start_span(name: str, **attributes: Any) -> Span:
+    # For work that spans generator yields: the span records time but is not
+    # made current, so code run between yields does not nest under it.
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start(name, _current.get(), **attributes)
+
+
+def end_span(active: Span, error: Optional[BaseException] = None) -> None:
+    tracer = _tracer
+    if tracer is not None and active is not NOOP_SPAN:
+        tracer.finish(active, error)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    # Carries the current span into a thread pool; call once per submit.
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
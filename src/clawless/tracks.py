@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import threading
 import time
-from dataclasses import dataclass
-from typing import Iterable
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Iterable, Iterator
+
+from clawless.agent import Message
+from clawless.db import ConnectionPool, DBWriter, reader
+from clawless.history import RecentHistory
+from clawless.tracing import traced
 
 
 @dataclass
@@ -11,113 +18,477 @@ class Track:
     name: str
     summary: str
     last_active: int
+    # Highest message id already folded into `summary`.
+    summary_upto: int = 0
+
+
+TRACK_COLUMNS = "id, name, summary, last_active, summary_upto"
+MAX_ID = 9223372036854775807
+
+
+def _track(row) -> Track:
+    return Track(row["id"], row["name"], row["summary"], row["last_active"], row["summary_upto"])
+
+
+def _bump_rev(conn) -> int:
+    # Every change to tracks (or the active track) bumps this counter in the
+    # same commit, which is how other processes' changes reach TrackCache.
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES ('tracks_rev', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    return int(conn.execute("SELECT value FROM settings WHERE key = 'tracks_rev'").fetchone()[0])
+
+
+class TrackCache:
+    # Tracks by id and by name plus the active track id, valid while the
+    # tracks_rev counter still equals `rev`. The counter is re-read at most
+    # every `check_seconds`; this process's own writes are applied directly.
+    # Cached Track objects are replaced, never mutated.
+    def __init__(self, check_seconds: float = 0.0):
+        self.check_seconds = check_seconds
+        self.rev: int | None = None
+        self.checked = 0.0
+        self.by_id: dict[int, Track] = {}
+        self.by_name: dict[str, Track] = {}
+        self.active_id: int | None = None
+        self.has_active = False
+        self.lock = threading.Lock()
+
+    def sync(self, read_rev: Callable[[], int]) -> int:
+        with self.lock:
+            if self.rev is not None and time.monotonic() - self.checked < self.check_seconds:
+                return self.rev
+        rev = read_rev()
+        with self.lock:
+            if rev != self.rev:
+                self._clear()
+                self.rev = rev
+            self.checked = time.monotonic()
+        return rev
+
+    def put(self, track: Track, rev: int) -> None:
+        # Dropped if a write landed since `rev` was read, as the row may predate it.
+        with self.lock:
+            if rev == self.rev:
+                self.store(track)
+
+    def set_active(self, track_id: int | None, rev: int) -> None:
+        with self.lock:
+            if rev == self.rev:
+                self.active_id = track_id
+                self.has_active = True
+
+    def apply(self, rev: int, update: Callable[[TrackCache], None]) -> None:
+        # `rev` is what our write bumped the counter to. Anything but the next
+        # value means another writer got in between, so start over.
+        with self.lock:
+            if self.rev is not None and rev == self.rev + 1:
+                update(self)
+                self.rev = rev
+            else:
+                self._clear()
+                self.rev = None
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self._clear()
+            self.rev = None
+
+    def drop(self, track_id: int) -> None:
+        track = self.by_id.pop(track_id, None)
+        if track is not None:
+            self.by_name.pop(track.name, None)
+
+    def store(self, track: Track) -> None:
+        self.drop(track.id)
+        self.by_id[track.id] = track
+        self.by_name[track.name] = track
+
+    def _clear(self) -> None:
+        self.by_id.clear()
+        self.by_name.clear()
+        self.active_id = None
+        self.has_active = False
 
 
 class TrackManager:
-    def __init__(self, conn):
+    # `conn` is a plain connection or a ConnectionPool. With a DBWriter (a
+    # pool brings its own), writes go through it (group-committed, or inside
+    # transaction() as one commit) and `conn` is only read from. Without one,
+    # each write commits on `conn` unless a transaction() is open.
+    # Track lookups are served from a TrackCache; `cache_seconds` is how long
+    # another process's changes may go unnoticed (0 checks on every lookup).
+    # With `history`, recent_history() serves warm tracks from memory.
+    def __init__(
+        self,
+        conn,
+        writer: DBWriter | None = None,
+        cache_seconds: float = 0.0,
+        history: RecentHistory | None = None,
+    ):
         self.conn = conn
+        if writer is None and isinstance(conn, ConnectionPool):
+            writer = conn.writer
+        self.writer = writer
+        self.cache = TrackCache(cache_seconds)
+        self.history = history
+        self._local = threading.local()
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # Everything written in the block lands in one commit, or not at all.
+        # Cache and history updates from the block wait for that commit.
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.pending = []
+        self._local.depth = depth + 1
+        try:
+            if self.writer is not None:
+                with self.writer.transaction():
+                    yield
+            else:
+                yield
+        except BaseException:
+            if depth == 0:
+                if self.writer is None:
+                    self.conn.rollback()
+                self.cache.invalidate()
+            raise
+        else:
+            if depth == 0:
+                if self.writer is None:
+                    self.conn.commit()
+                for apply in self._local.pending:
+                    apply()
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self._local.pending = []
+
+    def _write(self, fn) -> Any:
+        if self.writer is not None:
+            return self.writer.write(fn)
+        result = fn(self.conn)
+        if not getattr(self._local, "depth", 0):
+            self.conn.commit()
+        return result
+
+    def _reader(self):
+        # Reads inside a transaction must see its uncommitted writes.
+        if self.writer is not None and self.writer.in_transaction():
+            return self.writer.conn
+        return reader(self.conn)
+
+    def _uncommitted(self) -> bool:
+        # True while this thread's reads may see writes that are not
+        # committed yet, so in-memory state must be bypassed.
+        return bool(getattr(self._local, "pending", None)) or self._foreign_transaction()
+
+    def _cache_rev(self) -> int | None:
+        # The cache generation to read under, or None to bypass the cache.
+        if self._uncommitted():
+            return None
+        return self.cache.sync(self._read_rev)
+
+    def _read_rev(self) -> int:
+        row = self._reader().execute("SELECT value FROM settings WHERE key = 'tracks_rev'").fetchone()
+        return int(row["value"]) if row else 0
+
+    def _foreign_transaction(self) -> bool:
+        # A writer transaction opened outside transaction(), whose outcome
+        # this manager never learns.
+        return self.writer is not None and self.writer.in_transaction() and not getattr(self._local, "depth", 0)
+
+    def _after_commit(self, apply: Callable[[], None], discard: Callable[[], None]) -> None:
+        # Runs `apply` once the write just made is committed, or `discard`
+        # when it belongs to a transaction whose outcome we never see.
+        if getattr(self._local, "depth", 0):
+            self._local.pending.append(apply)
+        elif self._foreign_transaction():
+            discard()
+        else:
+            apply()
+
+    def _changed(self, rev: int, update: Callable[[TrackCache], None]) -> None:
+        self._after_commit(lambda: self.cache.apply(rev, update), self.cache.invalidate)
+
+    @traced("tracks.get_or_create")
     def get_or_create(self, name: str) -> Track:
         track = self.get_by_name(name)
         if track:
             return track
-        now = int(time.time())
-        cursor = self.conn.execute(
-            "INSERT INTO tracks (name, summary, last_active) VALUES (?, '', ?)",
-            (name, now),
-        )
-        self.conn.commit()
-        return Track(cursor.lastrowid, name, "", now)
 
+        def create(conn) -> tuple[Track, int]:
+            # Another thread may have created it since the read above.
+            conn.execute(
+                "INSERT OR IGNORE INTO tracks (name, summary, last_active) VALUES (?, '', ?)",
+                (name, int(time.time())),
+            )
+            row = conn.execute(f"SELECT {TRACK_COLUMNS} FROM tracks WHERE name = ?", (name,)).fetchone()
+            return _track(row), _bump_rev(conn)
+
+        track, rev = self._write(create)
+        self._changed(rev, lambda cache: cache.store(track))
+        return track
+
+    @traced("tracks.get_by_name")
     def get_by_name(self, name: str) -> Track | None:
-        row = self.conn.execute(
-            "SELECT id, name, summary, last_active FROM tracks WHERE name = ?",
+        rev = self._cache_rev()
+        if rev is not None:
+            track = self.cache.by_name.get(name)
+            if track is not None:
+                return track
+        row = self._reader().execute(
+            f"SELECT {TRACK_COLUMNS} FROM tracks WHERE name = ?",
             (name,),
         ).fetchone()
         if not row:
             return None
-        return Track(row["id"], row["name"], row["summary"], row["last_active"])
+        track = _track(row)
+        if rev is not None:
+            self.cache.put(track, rev)
+        return track
 
+    @traced("tracks.list_tracks")
     def list_tracks(self) -> list[Track]:
-        rows = self.conn.execute(
-            "SELECT id, name, summary, last_active FROM tracks ORDER BY name"
+        rows = self._reader().execute(
+            f"SELECT {TRACK_COLUMNS} FROM tracks ORDER BY name"
         ).fetchall()
-        return [Track(r["id"], r["name"], r["summary"], r["last_active"]) for r in rows]
+        return [_track(r) for r in rows]
 
+    @traced("tracks.mark_active")
     def mark_active(self, track_id: int) -> None:
         now = int(time.time())
-        self.conn.execute(
-            "UPDATE tracks SET last_active = ? WHERE id = ?",
-            (now, track_id),
-        )
-        self.conn.execute(
-            "INSERT OR REPLACE INTO settings (key, value) VALUES ('last_track_id', ?)",
-            (str(track_id),),
-        )
-        self.conn.commit()
 
+        def mark(conn) -> int:
+            conn.execute(
+                "UPDATE tracks SET last_active = ? WHERE id = ?",
+                (now, track_id),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('last_track_id', ?)",
+                (str(track_id),),
+            )
+            return _bump_rev(conn)
+
+        def update(cache: TrackCache) -> None:
+            track = cache.by_id.get(track_id)
+            if track is not None:
+                cache.store(replace(track, last_active=now))
+            cache.active_id = track_id
+            cache.has_active = True
+
+        self._changed(self._write(mark), update)
+
+    @traced("tracks.get_last_active")
     def get_last_active(self) -> Track | None:
-        row = self.conn.execute(
-            "SELECT value FROM settings WHERE key = 'last_track_id'"
-        ).fetchone()
-        if not row:
-            return None
-        try:
-            track_id = int(row["value"])
-        except (TypeError, ValueError):
+        rev = self._cache_rev()
+        if rev is not None and self.cache.has_active:
+            track_id = self.cache.active_id
+        else:
+            row = self._reader().execute(
+                "SELECT value FROM settings WHERE key = 'last_track_id'"
+            ).fetchone()
+            try:
+                track_id = int(row["value"]) if row else None
+            except (TypeError, ValueError):
+                track_id = None
+            if rev is not None:
+                self.cache.set_active(track_id, rev)
+        if track_id is None:
             return None
         return self.get_by_id(track_id)
 
+    @traced("tracks.get_by_id")
     def get_by_id(self, track_id: int) -> Track | None:
-        row = self.conn.execute(
-            "SELECT id, name, summary, last_active FROM tracks WHERE id = ?",
+        rev = self._cache_rev()
+        if rev is not None:
+            track = self.cache.by_id.get(track_id)
+            if track is not None:
+                return track
+        row = self._reader().execute(
+            f"SELECT {TRACK_COLUMNS} FROM tracks WHERE id = ?",
             (track_id,),
         ).fetchone()
         if not row:
             return None
-        return Track(row["id"], row["name"], row["summary"], row["last_active"])
+        track = _track(row)
+        if rev is not None:
+            self.cache.put(track, rev)
+        return track
 
-    def update_summary(self, track_id: int, summary: str) -> None:
-        self.conn.execute(
-            "UPDATE tracks SET summary = ? WHERE id = ?",
-            (summary, track_id),
-        )
-        self.conn.commit()
+    def _update_track(self, track_id: int, sql: str, params: tuple, **changes: Any) -> None:
+        def write(conn) -> int:
+            conn.execute(sql, params)
+            return _bump_rev(conn)
 
+        def update(cache: TrackCache) -> None:
+            track = cache.by_id.get(track_id)
+            if track is not None:
+                cache.store(replace(track, **changes))
+
+        self._changed(self._write(write), update)
+
+    @traced("tracks.update_summary")
+    def update_summary(self, track_id: int, summary: str, upto: int | None = None) -> None:
+        if upto is None:
+            self._update_track(
+                track_id,
+                "UPDATE tracks SET summary = ? WHERE id = ?",
+                (summary, track_id),
+                summary=summary,
+            )
+        else:
+            self._update_track(
+                track_id,
+                "UPDATE tracks SET summary = ?, summary_upto = ? WHERE id = ?",
+                (summary, upto, track_id),
+                summary=summary,
+                summary_upto=upto,
+            )
+
+    @traced("tracks.rename")
     def rename(self, track_id: int, new_name: str) -> None:
-        self.conn.execute(
+        self._update_track(
+            track_id,
             "UPDATE tracks SET name = ? WHERE id = ?",
             (new_name, track_id),
+            name=new_name,
         )
-        self.conn.commit()
 
+    @traced("tracks.archive")
     def archive(self, track_id: int) -> None:
-        self.conn.execute(
-            "DELETE FROM tracks WHERE id = ?",
-            (track_id,),
-        )
-        self.conn.execute(
-            "DELETE FROM messages WHERE track_id = ?",
-            (track_id,),
-        )
-        self.conn.execute(
-            "DELETE FROM memories WHERE track_id = ?",
-            (track_id,),
-        )
-        self.conn.commit()
+        def delete(conn) -> None:
+            conn.execute(
+                "DELETE FROM tracks WHERE id = ?",
+                (track_id,),
+            )
+            conn.execute(
+                "DELETE FROM messages WHERE track_id = ?",
+                (track_id,),
+            )
+            conn.execute(
+                "DELETE FROM memories WHERE track_id = ?",
+                (track_id,),
+            )
+            return _bump_rev(conn)
+
+        self._changed(self._write(delete), lambda cache: cache.drop(track_id))
+        if self.history is not None:
+            self.history.drop(track_id)
 
-    def append_message(self, track_id: int, role: str, content: str) -> None:
+    @traced("tracks.append_message")
+    def append_message(self, track_id: int, role: str, content: str) -> int:
         now = int(time.time())
-        self.conn.execute(
-            "INSERT INTO messages (track_id, role, content, ts) VALUES (?, ?, ?, ?)",
-            (track_id, role, content, now),
+        message_id = self._write(
+            lambda conn: conn.execute(
+                "INSERT INTO messages (track_id, role, content, ts) VALUES (?, ?, ?, ?)",
+                (track_id, role, content, now),
+            ).lastrowid
         )
-        self.conn.commit()
+        history = self.history
+        if history is not None:
+            self._after_commit(
+                lambda: history.append(track_id, message_id, Message(role, content)),
+                lambda: history.drop(track_id),
+            )
+        return message_id
 
-    def recent_messages(self, track_id: int, limit: int = 20) -> list[dict[str, str]]:
-        rows = self.conn.execute(
-            "SELECT role, content FROM messages WHERE track_id = ? ORDER BY id DESC LIMIT ?",
-            (track_id, limit),
-        ).fetchall()
-        items = [{"role": r["role"], "content": r["content"]} for r in rows]
+    @traced("tracks.set_last_chat_id")
+    def set_last_chat_id(self, chat_id: int, wait: bool = True) -> None:
+        # With a writer and wait=False the update is queued for the next group
+        # commit instead of being waited on.
+        def store(conn) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('last_chat_id', ?)",
+                (str(chat_id),),
+            )
+
+        if self.writer is not None and not wait:
+            self.writer.write(store, wait=False)
+            return
+        self._write(store)
+
+    @traced("tracks.get_last_chat_id")
+    def get_last_chat_id(self) -> int | None:
+        row = self._reader().execute("SELECT value FROM settings WHERE key = 'last_chat_id'").fetchone()
+        if not row:
+            return None
+        try:
+            return int(row["value"])
+        except (TypeError, ValueError):
+            return None
+
+    @traced("tracks.recent_messages")
+    def recent_messages(
+        self,
+        track_id: int,
+        limit: int = 20,
+        before_id: int | None = None,
+        after_id: int = 0,
+    ) -> list[dict[str, Any]]:
+        if before_id is None:
+            rows = self._reader().execute(
+                "SELECT id, role, content FROM messages WHERE track_id = ? AND id > ? "
+                "ORDER BY id DESC LIMIT ?",
+                (track_id, after_id, limit),
+            ).fetchall()
+        else:
+            rows = self._reader().execute(
+                "SELECT id, role, content FROM messages WHERE track_id = ? AND id > ? AND id < ? "
+                "ORDER BY id DESC LIMIT ?",
+                (track_id, after_id, before_id, limit),
+            ).fetchall()
+        items = [{"id": r["id"], "role": r["role"], "content": r["content"]} for r in rows]
         return list(reversed(items))
+
+    @traced("tracks.recent_history")
+    def recent_history(
+        self,
+        track_id: int,
+        limit: int = 20,
+        before_id: int | None = None,
+        after_id: int = 0,
+    ) -> list[tuple[int, Message]]:
+        # recent_messages() as (id, Message) pairs. A warm track is answered
+        # from `history` without touching SQLite; a cold one is loaded into it
+        # first.
+        history = self.history
+        if history is None or self._uncommitted():
+            return self._history_rows(track_id, limit, before_id, after_id)
+        window = history.window(track_id, limit, before_id, after_id)
+        if window is not None:
+            return window
+        if before_id is None:
+            mark = history.mark()
+            history.fill(track_id, self._history_rows(track_id, history.per_track), mark)
+            window = history.window(track_id, limit, before_id, after_id)
+            if window is not None:
+                return window
+        return self._history_rows(track_id, limit, before_id, after_id)
+
+    def _history_rows(
+        self,
+        track_id: int,
+        limit: int,
+        before_id: int | None = None,
+        after_id: int = 0,
+    ) -> list[tuple[int, Message]]:
+        rows = self._reader().execute(
+            "SELECT id, role, content FROM messages WHERE track_id = ? AND id > ? AND id < ? "
+            "ORDER BY id DESC LIMIT ?",
+            (track_id, after_id, MAX_ID if before_id is None else before_id, limit),
+        ).fetchall()
+        return [(row["id"], Message(row["role"], row["content"])) for row in reversed(rows)]
+
+    @traced("tracks.unsummarized_messages")
+    def unsummarized_messages(self, track_id: int, before_id: int, limit: int) -> list[dict[str, Any]]:
+        # Oldest messages past the summary high-water mark and below
+        # `before_id`, the start of the live context window.
+        rows = self._reader().execute(
+            "SELECT m.id, m.role, m.content FROM messages m JOIN tracks t ON t.id = m.track_id "
+            "WHERE m.track_id = ? AND m.id > t.summary_upto AND m.id < ? ORDER BY m.id LIMIT ?",
+            (track_id, before_id, limit),
+        ).fetchall()
+        return [{"id": r["id"], "role": r["role"], "content": r["content"]} for r in rows]
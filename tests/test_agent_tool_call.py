@@ -1,4 +1,10 @@
-from clawless.agent import Agent, LLMClient, Message
+import asyncio
+import json
+import threading
+
+import pytest
+
+from clawless.agent import Agent, LangChainLLMClient, LLMClient, LLMResponse, LLMUsage, Message, TurnStats
 from clawless.tools.base import Tool, ToolRegistry
 
 
@@ -26,3 +32,212 @@ def test_agent_tool_call() -> None:
     agent = Agent(DummyLLM(), registry)
     response = agent.run("", [Message("user", "hello")])
     assert response == "final response"
+
+
+def test_agent_arun_uses_async_path() -> None:
+    registry = ToolRegistry()
+    registry.register(
+        Tool(
+            name="echo",
+            description="Echo",
+            input_schema={"text": "string"},
+            handler=lambda args: {"echo": args.get("text")},
+        )
+    )
+    llm = DummyLLM()
+    agent = Agent(llm, registry)
+    response = asyncio.run(agent.arun("", [Message("user", "hello")]))
+    assert response == "final response"
+    assert llm.calls == 2
+
+
+class StreamingLLM(LLMClient):
+    def __init__(self, first_chunks):
+        self.first_chunks = first_chunks
+        self.calls = 0
+
+    def invoke(self, messages):
+        return "".join(self.stream(messages))
+
+    def stream(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            yield from self.first_chunks
+        else:
+            yield from ["final ", "response"]
+
+
+def test_agent_run_stream_hides_tool_call() -> None:
+    registry = ToolRegistry()
+    registry.register(
+        Tool(
+            name="echo",
+            description="Echo",
+            input_schema={"text": "string"},
+            handler=lambda args: {"echo": args.get("text")},
+        )
+    )
+    llm = StreamingLLM(['{"tool": "echo", ', '"args": {"text": "hi"}}'])
+    chunks = list(Agent(llm, registry).run_stream("", [Message("user", "hello")]))
+    assert chunks == ["final ", "response"]
+
+    llm = StreamingLLM(["Plain ", "answer with {braces}"])
+    chunks = list(Agent(llm, registry).run_stream("", [Message("user", "hello")]))
+    assert "".join(chunks) == "Plain answer with {braces}"
+    assert chunks[:2] == ["Plain ", "answer with "]
+
+
+class ScriptedLLM(LLMClient):
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def invoke(self, messages):
+        self.requests.append(messages)
+        return self.responses.pop(0)
+
+
+def test_agent_runs_parallel_tool_calls_in_one_step() -> None:
+    barrier = threading.Barrier(3, timeout=5)
+    registry = ToolRegistry()
+
+    def read(args):
+        barrier.wait()
+        return {"path": args["path"]}
+
+    registry.register(Tool(name="read_file", description="Read", input_schema={}, handler=read))
+    calls = [{"tool": "read_file", "args": {"path": f"f{i}.txt"}} for i in range(3)]
+    llm = ScriptedLLM([json.dumps({"tool_calls": calls}), "done"])
+    agent = Agent(llm, registry, max_parallel_tools=3)
+    assert agent.run("", [Message("user", "read three files")]) == "done"
+    followup = llm.requests[1][-1]
+    assert followup.role == "tool"
+    assert [r["result"]["path"] for r in json.loads(followup.content.split(": ", 1)[1])] == [
+        "f0.txt",
+        "f1.txt",
+        "f2.txt",
+    ]
+
+
+def test_agent_stops_at_step_limit() -> None:
+    registry = ToolRegistry()
+    registry.register(Tool(name="echo", description="Echo", input_schema={}, handler=lambda args: args))
+    call = '{"tool": "echo", "args": {}}'
+    llm = ScriptedLLM([call, call, "summary answer"])
+    agent = Agent(llm, registry, max_steps=2)
+    assert agent.run("", [Message("user", "loop")]) == "summary answer"
+    assert len(llm.requests) == 3
+    assert llm.requests[-1][-1].role == "system"
+
+
+class FakeChatModel:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.bound_specs = None
+        self.received = []
+
+    def bind_tools(self, specs):
+        self.bound_specs = specs
+        return self
+
+    def invoke(self, messages):
+        self.received.append(messages)
+        return self.replies.pop(0)
+
+
+def test_agent_native_tool_calls() -> None:
+    messages = pytest.importorskip("langchain_core.messages")
+
+    registry = ToolRegistry()
+    registry.register(
+        Tool(
+            name="mcp:srv:echo",
+            description="Echo",
+            input_schema={"text": "string"},
+            handler=lambda args: {"echo": args.get("text")},
+        )
+    )
+    model = FakeChatModel([
+        messages.AIMessage(
+            content="",
+            tool_calls=[{"name": "mcp__srv__echo", "args": {"text": "hi"}, "id": "c1"}],
+        ),
+        messages.AIMessage(content='Here is JSON: {"tool": "echo"}'),
+    ])
+    llm = LangChainLLMClient.__new__(LangChainLLMClient)
+    llm.model = model
+    llm.cache_prefix = False
+    llm._bound = None
+
+    agent = Agent(llm, registry)
+    assert agent.native_tools
+    response = agent.run("", [Message("user", "hello")])
+    assert response == 'Here is JSON: {"tool": "echo"}'
+    assert model.bound_specs[0]["function"]["name"] == "mcp__srv__echo"
+    assert model.bound_specs[0]["function"]["parameters"]["type"] == "object"
+    followup = model.received[1]
+    assert len(followup) == 4
+    assert isinstance(followup[-1], messages.ToolMessage)
+    assert followup[-1].tool_call_id == "c1"
+
+
+def test_agent_static_prefix_is_shared_and_tracks_registry_version() -> None:
+    registry = ToolRegistry()
+    registry.register(Tool(name="echo", description="Echo", input_schema={}, handler=lambda args: args))
+    llm = ScriptedLLM(["a", "b", "c"])
+    agent = Agent(llm, registry)
+    agent.run("first summary", [Message("user", "hi")])
+    agent.run("", [Message("user", "hi")])
+    first, second = llm.requests
+    assert first[0].content == second[0].content
+    assert "echo" in first[0].content
+    assert first[1].content == "Track summary: first summary"
+    assert second[1].role == "user"
+
+    registry.register(Tool(name="grep", description="Grep", input_schema={}, handler=lambda args: args))
+    agent.run("", [Message("user", "hi")])
+    assert "grep" in llm.requests[2][0].content
+
+
+class UsageLLM(LLMClient):
+    def complete(self, messages, tools=None):
+        return LLMResponse("ok", usage=LLMUsage(input_tokens=100, output_tokens=5, cached_tokens=80))
+
+
+def test_agent_records_turn_usage() -> None:
+    stats = TurnStats()
+    assert Agent(UsageLLM(), ToolRegistry()).run("", [Message("user", "hi")], stats) == "ok"
+    assert (stats.llm_calls, stats.input_tokens, stats.output_tokens) == (1, 100, 5)
+    assert stats.cache_hit_ratio == 0.8
+
+
+def test_langchain_usage_and_cache_breakpoint() -> None:
+    messages = pytest.importorskip("langchain_core.messages")
+
+    formatted = LangChainLLMClient._format_messages(
+        [Message("system", "static"), Message("system", "Track summary: x")],
+        cache_prefix=True,
+    )
+    assert formatted[0].content[0]["cache_control"] == {"type": "ephemeral"}
+    assert formatted[1].content == "Track summary: x"
+    reply = messages.AIMessage(
+        content="hi",
+        usage_metadata={
+            "input_tokens": 10,
+            "output_tokens": 2,
+            "total_tokens": 12,
+            "input_token_details": {"cache_read": 6},
+        },
+    )
+    assert LangChainLLMClient._to_response(reply, {}).usage == LLMUsage(10, 2, 6)
+
+
+def test_agent_sends_tool_followups_to_followup_llm() -> None:
+    registry = ToolRegistry()
+    registry.register(Tool(name="echo", description="Echo", input_schema={}, handler=lambda args: args))
+    main = ScriptedLLM(['{"tool": "echo", "args": {}}'])
+    followup = ScriptedLLM(["cheap answer"])
+    agent = Agent(main, registry, followup_llm=followup)
+    assert agent.run("", [Message("user", "hi")]) == "cheap answer"
+    assert len(main.requests) == 1
+    assert followup.requests[0][-1].role == "tool"
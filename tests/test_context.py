@@ -0,0 +1,76 @@
+from pathlib import Path
+
+from clawless.agent import Message
+from clawless.context import ContextBuilder, TokenCounter
+from clawless.db import connect, init_db
+from clawless.tracks import TrackManager
+
+
+class CharCounter(TokenCounter):
+    # One token per character keeps the arithmetic in these tests obvious.
+    def __init__(self):
+        self._encoding = None
+        self.count = len
+
+
+def test_fit_fills_budget_newest_first() -> None:
+    builder = ContextBuilder(CharCounter())
+    messages = [Message("user", "a" * 20), Message("assistant", "b" * 10), Message("user", "c" * 10)]
+    assert [m.content[0] for m in builder.fit(messages, 30)] == ["b", "c"]
+    assert [m.content[0] for m in builder.fit(messages, 100)] == ["a", "b", "c"]
+
+
+def test_fit_truncates_oversized_newest_message() -> None:
+    builder = ContextBuilder(CharCounter())
+    kept = builder.fit([Message("user", "x" * 5000)], 200)
+    assert len(kept) == 1
+    assert "characters omitted" in kept[0].content
+    assert len(kept[0].content) + 4 <= 200
+
+
+def test_history_budget_reserves_prompt_and_reply() -> None:
+    builder = ContextBuilder(CharCounter(), context_tokens=1000, reply_tokens=200)
+    assert builder.history_budget("s" * 96) == 1000 - 200 - 96 - 4
+
+
+def test_load_pages_through_track_history(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    tracks = TrackManager(conn)
+    track = tracks.get_or_create("work")
+    for index in range(30):
+        tracks.append_message(track.id, "user", f"{index:02d}" + "." * 8)
+    builder = ContextBuilder(CharCounter(), context_tokens=250, reply_tokens=0, page_size=4)
+    messages = builder.load(tracks, track.id, "")
+    # Each message costs 14 tokens; (250 - 4) // 14 = 17 fit.
+    assert len(messages) == 17
+    assert messages[0].content.startswith("13")
+    assert messages[-1].content.startswith("29")
+
+
+def test_token_counter_estimates_without_tokenizer() -> None:
+    counter = TokenCounter(encoding="no-such-encoding")
+    assert not counter.exact
+    assert counter.count("abcdefgh") == 2
+
+
+def test_token_counter_loads_encoding_on_first_count(monkeypatch) -> None:
+    loaded = []
+    monkeypatch.setattr(TokenCounter, "_load_encoding", staticmethod(lambda name: loaded.append(name)))
+    counter = TokenCounter()
+    assert loaded == []
+    assert counter.count("abcd") == 1
+    assert counter.count("abcdefgh") == 2
+    assert loaded == ["o200k_base"]
+
+
+def test_load_fits_pending_messages_first(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    tracks = TrackManager(conn)
+    track = tracks.get_or_create("work")
+    for index in range(5):
+        tracks.append_message(track.id, "user", f"old{index}")
+    builder = ContextBuilder(CharCounter(), context_tokens=4 + 2 * 8 + 9, reply_tokens=0)
+    messages = builder.load(tracks, track.id, "", pending=[Message("user", "new!!")])
+    assert [m.content for m in messages] == ["old3", "old4", "new!!"]
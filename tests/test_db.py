@@ -0,0 +1,114 @@
+import gc
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from clawless.db import MIGRATIONS, ConnectionPool, DBWriter, connect, init_db, migrate
+
+
+def make_writer(tmp_path: Path) -> DBWriter:
+    path = tmp_path / "db.sqlite"
+    init_db(connect(path))
+    return DBWriter(path)
+
+
+def test_connect_uses_wal(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_migrations_run_once_and_index_track_queries(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert migrate(conn) == len(MIGRATIONS)
+    plan = " ".join(
+        row[3]
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id, role, content FROM messages WHERE track_id = ? AND id > ? "
+            "ORDER BY id DESC LIMIT ?",
+            (1, 0, 20),
+        )
+    )
+    assert "idx_messages_track" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_queued_writes_are_group_committed(tmp_path: Path) -> None:
+    writer = make_writer(tmp_path)
+    try:
+        release = threading.Event()
+        writer.write(lambda conn: release.wait(5), wait=False)
+        futures = [
+            writer.write(
+                lambda conn, index=index: conn.execute("INSERT INTO settings VALUES (?, 'v')", (f"k{index}",)),
+                wait=False,
+            )
+            for index in range(50)
+        ]
+        release.set()
+        for future in futures:
+            future.result(5)
+        assert writer.conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0] == 50
+        # At most one commit for the blocker and one for everything behind it.
+        assert writer.commits <= 2
+    finally:
+        writer.close()
+
+
+def test_failed_write_does_not_undo_its_batch(tmp_path: Path) -> None:
+    writer = make_writer(tmp_path)
+    try:
+        release = threading.Event()
+        # Holding the writer busy makes the next three writes share one batch.
+        blocker = writer.write(lambda conn: release.wait(5), wait=False)
+        good = writer.write(lambda conn: conn.execute("INSERT INTO settings VALUES ('a', '1')"), wait=False)
+        bad = writer.write(lambda conn: conn.execute("INSERT INTO missing VALUES (1)"), wait=False)
+        also_good = writer.write(lambda conn: conn.execute("INSERT INTO settings VALUES ('b', '2')"), wait=False)
+        release.set()
+        blocker.result(5)
+        good.result(5)
+        also_good.result(5)
+        with pytest.raises(Exception):
+            bad.result(5)
+        keys = [row[0] for row in writer.conn.execute("SELECT key FROM settings ORDER BY key")]
+        assert keys == ["a", "b"]
+    finally:
+        writer.close()
+
+
+def test_pool_gives_each_thread_its_own_reader(tmp_path: Path) -> None:
+    path = tmp_path / "db.sqlite"
+    init_db(connect(path))
+    pool = ConnectionPool(path)
+    try:
+        pool.write(lambda conn: conn.execute("INSERT INTO settings VALUES ('k', 'v')"))
+        seen = {}
+
+        def read(name: str) -> None:
+            conn = pool.reader()
+            assert pool.reader() is conn
+            seen[name] = (conn, conn.execute("SELECT value FROM settings").fetchone()[0])
+
+        threads = [threading.Thread(target=read, args=(f"t{index}",)) for index in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert {value for _, value in seen.values()} == {"v"}
+        assert len({id(conn) for conn, _ in seen.values()}) == 3
+        # Each thread's reader was closed when the thread exited.
+        gc.collect()
+        assert len(pool._readers) == 0
+        for conn, _ in seen.values():
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        with pytest.raises(Exception):
+            pool.reader().execute("DELETE FROM settings")
+        with pool.transaction():
+            pool.write(lambda conn: conn.execute("DELETE FROM settings"))
+            assert pool.reader() is pool.writer.conn
+    finally:
+        pool.close()
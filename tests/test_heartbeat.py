@@ -27,3 +27,25 @@ def test_heartbeat_includes_checklist(tmp_path: Path) -> None:
 
     run_heartbeat(config, tmp_path, agent_fn)
     assert "Check backlog" in captured["prompt"]
+
+
+def test_heartbeat_escalates_when_not_ok(tmp_path: Path) -> None:
+    config = HeartbeatConfig(enabled=True, interval_minutes=30, active_hours=None)
+    calls = []
+
+    def small(prompt: str) -> str:
+        calls.append("small")
+        return "Maybe check the backlog"
+
+    def large(prompt: str) -> str:
+        calls.append("large")
+        return "HEARTBEAT_OK"
+
+    result = run_heartbeat(config, tmp_path, small, escalate_fn=large)
+    assert calls == ["small", "large"]
+    assert result.escalated and result.suppressed
+
+    calls.clear()
+    result = run_heartbeat(config, tmp_path, large, escalate_fn=small)
+    assert calls == ["large"]
+    assert not result.escalated
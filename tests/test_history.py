@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from clawless.agent import Message
+from clawless.db import connect, init_db
+from clawless.history import RecentHistory
+from clawless.tracks import TrackManager
+
+
+def make_manager(tmp_path: Path, history: RecentHistory):
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    return conn, TrackManager(conn, history=history)
+
+
+def test_warm_track_is_served_without_sqlite(tmp_path: Path) -> None:
+    history = RecentHistory(per_track=3)
+    conn, manager = make_manager(tmp_path, history)
+    track = manager.get_or_create("work")
+    for index in range(4):
+        manager.append_message(track.id, "user", f"m{index}")
+
+    # Cold start reads the newest three; older pages still come from SQLite.
+    first = manager.recent_history(track.id, limit=2)
+    assert [m.content for _, m in first] == ["m2", "m3"]
+    older = manager.recent_history(track.id, limit=5, before_id=first[0][0])
+    assert [m.content for _, m in older] == ["m0", "m1"]
+
+    queries = []
+    conn.set_trace_callback(queries.append)
+    message_id = manager.append_message(track.id, "assistant", "m4")
+    queries.clear()
+    window = manager.recent_history(track.id, limit=3)
+    assert queries == []
+    assert [m.content for _, m in window] == ["m2", "m3", "m4"]
+    assert window[-1][0] == message_id
+    # Same objects every turn, not rebuilt from rows.
+    assert manager.recent_history(track.id, limit=1)[0][1] is window[-1][1]
+    # Messages already in the summary are excluded.
+    assert [m.content for _, m in manager.recent_history(track.id, after_id=window[1][0])] == ["m4"]
+
+
+def test_rolled_back_messages_stay_out_of_the_buffer(tmp_path: Path) -> None:
+    history = RecentHistory()
+    _, manager = make_manager(tmp_path, history)
+    track = manager.get_or_create("work")
+    assert manager.recent_history(track.id) == []
+    try:
+        with manager.transaction():
+            manager.append_message(track.id, "user", "lost")
+            raise RuntimeError("turn failed")
+    except RuntimeError:
+        pass
+    with manager.transaction():
+        manager.append_message(track.id, "user", "kept")
+    assert [m.content for _, m in manager.recent_history(track.id)] == ["kept"]
+
+
+def test_cold_tracks_are_evicted_under_the_ceiling() -> None:
+    history = RecentHistory(per_track=10, max_bytes=2000)
+    for track_id in (1, 2, 3):
+        history.fill(track_id, [(track_id * 10, Message("user", "x" * 400))], history.mark())
+    history.window(1, 5)
+    history.fill(4, [(40, Message("user", "x" * 400))], history.mark())
+    assert history.bytes <= 2000
+    assert history.window(2, 5) is None
+    assert history.window(1, 5) is not None
+    assert history.evictions >= 1
@@ -0,0 +1,100 @@
+from pathlib import Path
+
+from clawless.db import ConnectionPool, connect, init_db
+from clawless.inbox import Inbox
+from clawless.telegram.adapter import TelegramUpdate
+
+
+def _update(update_id: int) -> TelegramUpdate:
+    return TelegramUpdate(update_id=update_id, message_id=update_id, user_id=1, chat_id=2, text=f"m{update_id}")
+
+
+def _inbox(tmp_path: Path, **kwargs) -> Inbox:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    return Inbox(conn, **kwargs)
+
+
+def test_inbox_claims_in_order_and_dedupes(tmp_path: Path) -> None:
+    inbox = _inbox(tmp_path)
+    assert inbox.enqueue(_update(1))
+    assert inbox.enqueue(_update(2))
+    assert not inbox.enqueue(_update(1))
+
+    items = inbox.claim()
+    assert [item.update.text for item in items] == ["m1", "m2"]
+    assert inbox.claim() == []
+
+    inbox.complete([item.id for item in items])
+    assert inbox.counts() == {"done": 2}
+
+
+def test_inbox_retries_then_dead_letters(tmp_path: Path) -> None:
+    inbox = _inbox(tmp_path, max_attempts=2)
+    inbox.enqueue(_update(1))
+    item = inbox.claim()[0]
+    inbox.fail([item.id], "boom")
+    assert inbox.counts() == {"pending": 1}
+
+    inbox.conn.execute("UPDATE inbox SET lease_until = 0")
+    item = inbox.claim()[0]
+    assert item.attempts == 2
+    inbox.fail([item.id], "boom again")
+    assert inbox.counts() == {"dead": 1}
+
+
+def test_inbox_recovers_in_flight_rows_after_restart(tmp_path: Path) -> None:
+    inbox = _inbox(tmp_path)
+    inbox.enqueue(_update(5))
+    assert len(inbox.claim()) == 1
+
+    restarted = Inbox(connect(tmp_path / "db.sqlite"))
+    assert restarted.recover() == 1
+    assert [item.update.update_id for item in restarted.claim()] == [5]
+
+
+def test_inbox_writes_through_pool_writer(tmp_path: Path) -> None:
+    path = tmp_path / "db.sqlite"
+    init_db(connect(path))
+    pool = ConnectionPool(path)
+    try:
+        inbox = Inbox(pool)
+        commits = pool.writer.commits
+        assert inbox.enqueue(_update(1))
+        item = inbox.claim()[0]
+        inbox.complete([item.id])
+        assert pool.writer.commits == commits + 3
+        assert inbox.counts() == {"done": 1}
+    finally:
+        pool.close()
+
+
+def test_inbox_renews_leases_of_held_rows(tmp_path: Path) -> None:
+    inbox = _inbox(tmp_path, lease_seconds=2)
+    inbox.enqueue(_update(1))
+    inbox.enqueue(_update(2))
+    first, second = inbox.claim()
+    inbox.complete([first.id])
+    # Pretend the lease is about to run out while the row waits for its turn.
+    inbox.conn.execute("UPDATE inbox SET lease_until = 0")
+    inbox._renewed_at -= 1
+    assert inbox.renew() == 1
+    assert inbox.claim() == []
+    assert inbox.renew() == 0
+
+
+def test_inbox_reports_dead_lettered_rows(tmp_path: Path) -> None:
+    inbox = _inbox(tmp_path, max_attempts=1)
+    inbox.enqueue(_update(1))
+    item = inbox.claim()[0]
+    assert inbox.fail([item.id], "boom") == [item.id]
+    assert inbox._held == set()
+
+
+def test_inbox_persists_telegram_offset(tmp_path: Path) -> None:
+    inbox = _inbox(tmp_path)
+    assert inbox.offset() is None
+    inbox.enqueue(_update(7))
+    inbox.enqueue(_update(5))
+    restarted = Inbox(connect(tmp_path / "db.sqlite"))
+    assert restarted.offset() == 8
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+from clawless.agent import LLMClient, Message
+from clawless.db import ConnectionPool, connect, init_db
+from clawless.llm_cache import CachingLLMClient
+
+
+class CountingLLM(LLMClient):
+    def __init__(self, reply="answer", delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.reply
+
+
+def test_cache_hits_memory_and_sqlite(tmp_path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    inner = CountingLLM()
+    cache = CachingLLMClient(inner, "test:model", conn)
+    request = [Message("system", "sys"), Message("user", "daily  report")]
+    assert cache.complete(request).content == "answer"
+    assert cache.complete([Message("system", "sys"), Message("user", "daily report")]).content == "answer"
+    assert inner.calls == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    fresh = CachingLLMClient(inner, "test:model", conn)
+    assert fresh.complete(request).content == "answer"
+    assert inner.calls == 1
+    assert CachingLLMClient(inner, "other:model", conn).complete(request).content == "answer"
+    assert inner.calls == 2
+
+
+def test_cache_expires_and_evicts() -> None:
+    inner = CountingLLM()
+    cache = CachingLLMClient(inner, "m", ttl_seconds=0)
+    cache.complete([Message("user", "a")])
+    cache.complete([Message("user", "a")])
+    assert inner.calls == 2
+
+    cache = CachingLLMClient(inner, "m", max_entries=1)
+    cache.complete([Message("user", "a")])
+    cache.complete([Message("user", "b")])
+    cache.complete([Message("user", "a")])
+    assert inner.calls == 5
+
+
+def test_cache_skips_tool_turns() -> None:
+    inner = CountingLLM(reply='{"tool": "write_file", "args": {}}')
+    cache = CachingLLMClient(inner, "m")
+    cache.complete([Message("user", "write it")])
+    cache.complete([Message("user", "write it")])
+    assert inner.calls == 2
+
+    plain = CachingLLMClient(CountingLLM(), "m")
+    plain.complete([Message("user", "x"), Message("tool", "Tool results: []")])
+    assert plain.stats.bypassed == 1
+
+
+def test_cache_single_flight() -> None:
+    inner = CountingLLM(delay=0.2)
+    cache = CachingLLMClient(inner, "m")
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.complete([Message("user", "same")]).content))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["answer"] * 4
+    assert inner.calls == 1
+    assert cache.stats.shared + cache.stats.hits == 3
+
+
+class AsyncCountingLLM(CountingLLM):
+    def invoke(self, messages):
+        raise AssertionError("async callers must not block a thread")
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.reply
+
+
+def test_cache_single_flight_async(tmp_path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    inner = AsyncCountingLLM(delay=0.1)
+    cache = CachingLLMClient(inner, "m", conn)
+
+    async def scenario() -> list[str]:
+        calls = [cache.acomplete([Message("user", "same")]) for _ in range(4)]
+        return [response.content for response in await asyncio.gather(*calls)]
+
+    assert asyncio.run(scenario()) == ["answer"] * 4
+    assert inner.calls == 1
+    assert cache.stats.shared + cache.stats.hits == 3
+    # A fresh client finds the answer in SQLite.
+    fresh = CachingLLMClient(inner, "m", conn)
+    assert asyncio.run(fresh.acomplete([Message("user", "same")])).content == "answer"
+    assert inner.calls == 1
+
+
+def test_cache_persists_through_pool_writer(tmp_path) -> None:
+    path = tmp_path / "db.sqlite"
+    init_db(connect(path))
+    pool = ConnectionPool(path)
+    try:
+        inner = CountingLLM()
+        request = [Message("user", "daily report")]
+        CachingLLMClient(inner, "m", pool).complete(request)
+        # Queued without waiting; the next write on the same writer runs after it.
+        pool.write(lambda conn: None)
+        assert CachingLLMClient(inner, "m", pool).complete(request).content == "answer"
+        assert inner.calls == 1
+    finally:
+        pool.close()
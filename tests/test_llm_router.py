@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from clawless.agent import LLMClient, Message
+from clawless.llm_router import RoutingLLMClient
+from clawless.ratelimit import RATE_LIMITED
+
+
+class StubLLM(LLMClient):
+    def __init__(self, reply, delay=0.0, fail=False):
+        self.reply = reply
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.release = threading.Event()
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.reply} down")
+        return self.reply
+
+
+REQUEST = [Message("user", "hi")]
+
+
+def test_router_fails_over_and_cools_down() -> None:
+    primary = StubLLM("primary", fail=True)
+    backup = StubLLM("backup")
+    router = RoutingLLMClient([("a", primary), ("b", backup)], failure_threshold=2)
+    assert router.complete(REQUEST).content == "backup"
+    assert router.complete(REQUEST).content == "backup"
+    assert primary.calls == 2
+    # Cooling down: the primary is no longer tried first.
+    assert router.complete(REQUEST).content == "backup"
+    assert primary.calls == 2
+    stats = router.snapshot()
+    assert stats["a"]["failures"] == 2
+    assert stats["b"]["requests"] == 3
+
+
+def test_router_raises_when_all_fail() -> None:
+    router = RoutingLLMClient([("a", StubLLM("a", fail=True)), ("b", StubLLM("b", fail=True))])
+    with pytest.raises(ConnectionError):
+        router.complete(REQUEST)
+
+
+def test_router_hedges_slow_primary() -> None:
+    slow = StubLLM("slow", delay=5.0)
+    fast = StubLLM("fast")
+    router = RoutingLLMClient([("a", slow), ("b", fast)], hedge=True, hedge_min_seconds=0.05)
+    started = time.monotonic()
+    assert router.complete(REQUEST).content == "fast"
+    assert time.monotonic() - started < 2.0
+    assert fast.calls == 1
+    slow.release.set()
+
+
+def test_router_without_hedging_calls_inline() -> None:
+    threads = []
+
+    class ThreadLLM(LLMClient):
+        def invoke(self, messages):
+            threads.append(threading.current_thread())
+            return "ok"
+
+    router = RoutingLLMClient([("a", ThreadLLM())])
+    assert router.complete(REQUEST).content == "ok"
+    assert threads == [threading.current_thread()]
+
+
+class AsyncStubLLM(LLMClient):
+    def __init__(self, reply, delay=0.0, fail=False):
+        self.reply = reply
+        self.delay = delay
+        self.fail = fail
+        self.cancelled = False
+
+    def invoke(self, messages):
+        raise AssertionError("async callers must not block a thread")
+
+    async def ainvoke(self, messages):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.reply} down")
+        return self.reply
+
+
+def test_router_acomplete_fails_over_and_hedges() -> None:
+    router = RoutingLLMClient([("a", AsyncStubLLM("a", fail=True)), ("b", AsyncStubLLM("b"))])
+    assert asyncio.run(router.acomplete(REQUEST)).content == "b"
+
+    slow = AsyncStubLLM("slow", delay=5.0)
+    router = RoutingLLMClient([("a", slow), ("b", AsyncStubLLM("fast"))], hedge=True, hedge_min_seconds=0.05)
+    started = time.monotonic()
+    assert asyncio.run(router.acomplete(REQUEST)).content == "fast"
+    assert time.monotonic() - started < 2.0
+    assert slow.cancelled
+
+
+def test_router_hedge_delay_tracks_p95() -> None:
+    router = RoutingLLMClient([("a", StubLLM("a"))], hedge=True, hedge_min_seconds=0.1)
+    endpoint = router.endpoints[0]
+    assert router.hedge_delay(endpoint) == pytest.approx(0.4)
+    for _ in range(20):
+        router._record(endpoint, 0.5, None)
+    assert router.hedge_delay(endpoint) == pytest.approx(0.5)
+    assert endpoint.stats.ewma_latency == pytest.approx(0.5)
+
+
+def test_router_stream_fails_over_before_first_chunk() -> None:
+    router = RoutingLLMClient([("a", StubLLM("a", fail=True)), ("b", StubLLM("streamed"))])
+    assert "".join(router.stream_complete(REQUEST)) == "streamed"
+
+
+def test_site_llms_share_tiers(monkeypatch) -> None:
+    from clawless.agent import LangChainLLMClient
+    from clawless.bot_service import build_site_llms
+    from clawless.config import AppConfig
+
+    monkeypatch.setattr(LangChainLLMClient, "_init_model", lambda self: None)
+    config = AppConfig.from_dict({
+        "llm": {
+            "connection_string": "openai:big",
+            "api_key": "k",
+            "tiers": {"small": {"connection_string": "openai:small"}},
+            "routing": {"heartbeat": "small", "summary": "small"},
+        }
+    })
+    llms = build_site_llms(config, Path("config.json"))
+    assert llms["heartbeat"].inner is llms["summary"].inner
+    assert isinstance(llms["heartbeat"].inner, RoutingLLMClient)
+    assert [e.name for e in llms["heartbeat"].inner.endpoints] == ["small", "default"]
+    assert llms["interactive"].inner is llms["job"].inner
+    assert llms["interactive"].priority < llms["job"].priority < llms["heartbeat"].priority
+
+    config.llm.routing["chat"] = "small"
+    with pytest.raises(RuntimeError):
+        build_site_llms(config, Path("config.json"))
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429")
+        self.status_code = 429
+        self.retry_after = retry_after
+
+
+class ThrottledLLM(LLMClient):
+    def __init__(self, failures):
+        self.failures = failures
+
+    def invoke(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError(0.01)
+        return "ok"
+
+
+def test_rate_limited_client_retries_429() -> None:
+    from clawless.llm_router import LLMBusyError, RateLimitedLLMClient
+    from clawless.ratelimit import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(max_concurrency=4)
+    client = RateLimitedLLMClient(ThrottledLLM(2), limiter, max_retries=3)
+    assert client.complete(REQUEST).content == "ok"
+    assert limiter.limit < 4
+    assert limiter.in_flight == 0
+
+    client = RateLimitedLLMClient(ThrottledLLM(5), limiter, max_retries=1)
+    with pytest.raises(LLMBusyError):
+        client.complete(REQUEST)
+    assert limiter.in_flight == 0
+
+
+def test_rate_limited_client_errors_do_not_raise_limit() -> None:
+    from clawless.llm_router import RateLimitedLLMClient
+    from clawless.ratelimit import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(max_concurrency=8)
+    limiter.acquire()
+    limiter.release(RATE_LIMITED)
+    client = RateLimitedLLMClient(StubLLM("a", fail=True), limiter)
+    for _ in range(20):
+        with pytest.raises(ConnectionError):
+            client.complete(REQUEST)
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+class AsyncOnlyLLM(LLMClient):
+    def __init__(self, failures):
+        self.failures = failures
+
+    def invoke(self, messages):
+        raise AssertionError("async callers must not block a thread")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(0)
+        if self.failures:
+            self.failures -= 1
+            raise RateLimitError(0.01)
+        return "ok"
+
+
+def test_rate_limited_client_acomplete_is_native() -> None:
+    from clawless.llm_router import RateLimitedLLMClient
+    from clawless.ratelimit import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(max_concurrency=4)
+    client = RateLimitedLLMClient(AsyncOnlyLLM(1), limiter, max_retries=2)
+    assert asyncio.run(client.acomplete(REQUEST)).content == "ok"
+    assert limiter.limit < 4
+    assert limiter.in_flight == 0
+
+
+def test_router_demotes_slow_endpoint() -> None:
+    slow = StubLLM("slow")
+    fast = StubLLM("fast")
+    router = RoutingLLMClient([("a", slow), ("b", fast)])
+    router._record(router.endpoints[0], 2.0, None)
+    router._record(router.endpoints[1], 0.1, None)
+    assert router.complete(REQUEST).content == "fast"
+    assert slow.calls == 0
+    # Within the slack, configured order wins again.
+    router.endpoints[0].stats.ewma_latency = 0.12
+    assert router.complete(REQUEST).content == "slow"
@@ -1,8 +1,10 @@
+import asyncio
 import json
 
+import pytest
 import requests
 
-from clawless.mcp.client import MCPClient, MCPServer
+from clawless.mcp.client import AsyncMCPClient, MCPClient, MCPServer
 
 
 class FakeResponse:
@@ -38,3 +40,27 @@ def test_mcp_client_list_and_call(monkeypatch):
 
     result = client.call_tool("ping", {"value": 1})
     assert result["echo"]["name"] == "ping"
+
+
+def test_async_mcp_client_list_and_call():
+    httpx = pytest.importorskip("httpx")
+
+    def handler(request):
+        body = json.loads(request.content)
+        if body["method"] == "tools/list":
+            result = {"tools": [{"name": "ping"}]}
+        else:
+            result = {"echo": body["params"]}
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+    async def scenario():
+        client = AsyncMCPClient(MCPServer(name="local", url="http://example.com", bearer_token=""))
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        tools = await client.alist_tools()
+        result = await client.acall_tool("ping", {"value": 1})
+        await client.aclose()
+        return tools, result
+
+    tools, result = asyncio.run(scenario())
+    assert tools[0]["name"] == "ping"
+    assert result["echo"]["arguments"] == {"value": 1}
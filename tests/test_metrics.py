@@ -0,0 +1,84 @@
+import urllib.request
+
+from clawless import tracing
+from clawless.db import DBWriter, connect, init_db
+from clawless.metrics import MetricsRegistry, MetricsServer, SpanMetrics
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("t_seconds", "Test.", buckets=(0.1, 1.0))
+    histogram.observe(0.05, op="a")
+    histogram.observe(0.5, op="a")
+    histogram.observe(5.0, op="a")
+    text = registry.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{op="a",le="1"} 2' in text
+    assert 't_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="a"} 3' in text
+
+
+def test_span_metrics_from_tracer_listener() -> None:
+    registry = MetricsRegistry()
+    tracer = tracing.Tracer([], flush_seconds=0.01, listeners=[SpanMetrics(registry)])
+    tracing.set_tracer(tracer)
+    try:
+        with tracing.span("turn", root=True):
+            with tracing.span("llm.complete") as llm:
+                llm.set(input_tokens=100, output_tokens=7)
+            with tracing.span("tool", tool="mcp:srv:search") as tool:
+                tool.set(error="timeout")
+            with tracing.span("tracks.append_message"):
+                pass
+        tracer.flush(5)
+    finally:
+        tracing.set_tracer(None)
+        tracer.close()
+
+    assert registry.get("clawless_turn_seconds").count() == 1
+    assert registry.get("clawless_llm_calls_total").value() == 1
+    assert registry.get("clawless_llm_tokens_total").value(kind="input") == 100
+    assert registry.get("clawless_tool_errors_total").value(tool="mcp:srv:search") == 1
+    assert registry.get("clawless_track_call_seconds").count(op="append_message") == 1
+    assert registry.get("clawless_turn_phase_seconds").count(phase="llm.complete") == 1
+
+
+def test_metrics_server_serves_registry() -> None:
+    registry = MetricsRegistry()
+    registry.gauge("queue_depth", "Depth.", lambda: 3)
+    registry.gauge("inbox_items", "Rows.", lambda: {(("status", "pending"),): 2})
+    server = MetricsServer(registry, port=0)
+    server.start()
+    try:
+        host, port = server.address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+            body = resp.read().decode("utf-8")
+    finally:
+        server.stop()
+    assert "queue_depth 3" in body
+    assert 'inbox_items{status="pending"} 2' in body
+
+
+def test_span_metrics_time_db_writer_commits(tmp_path) -> None:
+    path = tmp_path / "db.sqlite"
+    init_db(connect(path))
+    registry = MetricsRegistry()
+    tracer = tracing.Tracer([], flush_seconds=0.01, listeners=[SpanMetrics(registry)])
+    tracing.set_tracer(tracer)
+    writer = DBWriter(path)
+    try:
+        writer.write(lambda conn: conn.execute("INSERT INTO settings VALUES ('a', '1')"))
+        with writer.transaction():
+            writer.write(lambda conn: conn.execute("INSERT INTO settings VALUES ('b', '2')"))
+        tracer.flush(5)
+    finally:
+        writer.close()
+        tracing.set_tracer(None)
+        tracer.close()
+
+    commits = registry.get("clawless_sqlite_commit_seconds")
+    assert commits.count(kind="group") == 1
+    assert commits.count(kind="transaction") == 1
+    assert registry.get("clawless_sqlite_commit_writes").count() == 1
+    assert registry.get("clawless_sqlite_write_seconds").count() == 1
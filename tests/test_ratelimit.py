@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+from clawless.ratelimit import ERROR, RATE_LIMITED, AdaptiveLimiter
+
+
+def test_limiter_aimd() -> None:
+    limiter = AdaptiveLimiter(max_concurrency=8)
+    limiter.acquire()
+    limiter.release(RATE_LIMITED)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 4.25
+    limiter.acquire()
+    limiter.release(ERROR)
+    assert limiter.limit == 4.25
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(RATE_LIMITED)
+    assert limiter.limit == 1
+
+
+def test_limiter_serves_higher_priority_first() -> None:
+    limiter = AdaptiveLimiter(max_concurrency=1)
+    limiter.acquire()
+    order = []
+
+    def worker(priority: int, name: str) -> None:
+        limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    background = threading.Thread(target=worker, args=(2, "heartbeat"))
+    background.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=worker, args=(0, "chat"))
+    interactive.start()
+    time.sleep(0.05)
+    limiter.release()
+    background.join(2)
+    interactive.join(2)
+    assert order == ["chat", "heartbeat"]
+
+
+def test_limiter_pauses_for_retry_after() -> None:
+    limiter = AdaptiveLimiter(max_concurrency=4)
+    limiter.acquire()
+    limiter.release(RATE_LIMITED, retry_after=0.2)
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+    limiter.release()
+
+
+def test_limiter_token_bucket() -> None:
+    limiter = AdaptiveLimiter(max_concurrency=4, tokens_per_minute=6000)
+    limiter.acquire(tokens=6000)
+    limiter.release()
+    started = time.monotonic()
+    limiter.acquire(tokens=10)
+    assert time.monotonic() - started >= 0.05
+    limiter.release()
+
+
+def test_limiter_async_waiters_share_the_queue() -> None:
+    limiter = AdaptiveLimiter(max_concurrency=1)
+    order = []
+
+    async def waiter(priority: int, name: str) -> None:
+        await limiter.aacquire(priority)
+        order.append(name)
+        limiter.release()
+
+    async def scenario() -> None:
+        limiter.acquire()
+        tasks = [asyncio.create_task(waiter(2, "heartbeat")), asyncio.create_task(waiter(0, "chat"))]
+        await asyncio.sleep(0.05)
+        assert order == []
+        # Released from another thread, as a threaded caller would.
+        threading.Thread(target=limiter.release).start()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=2)
+
+    asyncio.run(scenario())
+    assert order == ["chat", "heartbeat"]
+    assert limiter.in_flight == 0
+
+
+def test_limiter_async_pause_and_cancel() -> None:
+    limiter = AdaptiveLimiter(max_concurrency=1)
+
+    async def scenario() -> None:
+        await limiter.aacquire()
+        limiter.release(RATE_LIMITED, retry_after=0.2)
+        started = time.monotonic()
+        await limiter.aacquire()
+        assert time.monotonic() - started >= 0.15
+        blocked = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        blocked.cancel()
+        await asyncio.gather(blocked, return_exceptions=True)
+        limiter.release()
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+    assert limiter._waiters == []
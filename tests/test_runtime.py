@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+from clawless.runtime import AsyncTrackDispatcher, TrackWorkerPool, TurnDebouncer
+
+
+def test_worker_pool_keeps_per_key_order() -> None:
+    pool = TrackWorkerPool(workers=4)
+    pool.start()
+    seen: list[int] = []
+    for i in range(20):
+        pool.submit("work", lambda i=i: seen.append(i))
+    assert pool.join(timeout=5)
+    pool.shutdown()
+    assert seen == list(range(20))
+
+
+def test_worker_pool_runs_keys_in_parallel() -> None:
+    pool = TrackWorkerPool(workers=2)
+    pool.start()
+    release = threading.Event()
+    done: list[str] = []
+
+    def slow() -> None:
+        release.wait(timeout=5)
+        done.append("slow")
+
+    pool.submit(1, slow)
+    pool.submit(2, lambda: done.append("fast"))
+    deadline = time.time() + 5
+    while "fast" not in done and time.time() < deadline:
+        time.sleep(0.01)
+    assert done == ["fast"]
+    release.set()
+    assert pool.join(timeout=5)
+    pool.shutdown()
+    assert done == ["fast", "slow"]
+
+
+def test_worker_pool_reports_errors() -> None:
+    errors: list[Exception] = []
+    pool = TrackWorkerPool(workers=1, on_error=errors.append)
+    pool.start()
+
+    def boom() -> None:
+        raise ValueError("boom")
+
+    pool.submit("a", boom)
+    pool.submit("a", lambda: None)
+    assert pool.join(timeout=5)
+    pool.shutdown()
+    assert [str(e) for e in errors] == ["boom"]
+
+
+def test_async_dispatcher_keeps_per_key_order() -> None:
+    seen: list[tuple[str, int]] = []
+
+    async def scenario() -> None:
+        dispatcher = AsyncTrackDispatcher(concurrency=4)
+
+        def make(key: str, i: int):
+            async def task() -> None:
+                await asyncio.sleep(0.01 if key == "a" else 0)
+                seen.append((key, i))
+
+            return task
+
+        for i in range(5):
+            dispatcher.submit("a", make("a", i))
+            dispatcher.submit("b", make("b", i))
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert [i for key, i in seen if key == "a"] == list(range(5))
+    assert [i for key, i in seen if key == "b"] == list(range(5))
+    assert seen.index(("b", 4)) < seen.index(("a", 0))
+
+
+def test_debouncer_coalesces_bursts_per_key() -> None:
+    fired: list[tuple[str, list[int]]] = []
+    done = threading.Event()
+
+    def on_fire(key, items) -> None:
+        fired.append((key, items))
+        if len(fired) == 2:
+            done.set()
+
+    debouncer = TurnDebouncer(0.05, on_fire)
+    for i in range(3):
+        debouncer.add("a", i)
+    debouncer.add("b", 10)
+    assert done.wait(timeout=5)
+    assert sorted(fired) == [("a", [0, 1, 2]), ("b", [10])]
+
+
+def test_debouncer_without_window_fires_immediately() -> None:
+    fired: list[list[int]] = []
+    debouncer = TurnDebouncer(0, lambda key, items: fired.append(items))
+    debouncer.add("a", 1)
+    debouncer.add("a", 2)
+    assert fired == [[1], [2]]
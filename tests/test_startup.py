@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from clawless.agent import LangChainLLMClient
+from clawless.startup import ProviderLoader, StartupTimer
+from clawless.tools.base import Tool, ToolRegistry
+
+
+def make_tool(name: str) -> Tool:
+    return Tool(name=name, description=name, input_schema={}, handler=lambda args: {})
+
+
+def test_slow_provider_registers_after_wait() -> None:
+    registry = ToolRegistry()
+    release = threading.Event()
+    ready = []
+    timer = StartupTimer()
+    loader = ProviderLoader(registry, timer, on_ready=lambda name, count, seconds: ready.append((name, count)))
+
+    def slow() -> list[Tool]:
+        release.wait(5)
+        return [make_tool("mcp:slow:a"), make_tool("mcp:slow:b")]
+
+    loader.start("mcp:fast", lambda: [make_tool("mcp:fast:a")])
+    loader.start("mcp:slow", slow)
+    assert loader.wait(0.2) == ["mcp:slow"]
+    assert [t.name for t in registry.list_tools()] == ["mcp:fast:a"]
+    timer.ready()
+
+    version = registry.version
+    release.set()
+    assert loader.wait(5) == []
+    assert registry.version == version + 1
+    assert len(registry.list_tools()) == 3
+    assert ("mcp:slow", 2) in ready
+    assert "mcp:slow=" in timer.report() and "(background)" in timer.report()
+
+
+def test_failed_provider_is_reported() -> None:
+    errors = []
+
+    def broken() -> list[Tool]:
+        raise RuntimeError("down")
+
+    loader = ProviderLoader(ToolRegistry(), on_error=lambda name, exc: errors.append((name, str(exc))))
+    loader.start("mcp:broken", broken)
+    loader.wait(5)
+    assert errors == [("mcp:broken", "down")]
+
+
+def test_langchain_model_is_built_lazily() -> None:
+    llm = LangChainLLMClient("openai:gpt-4o-mini", "key")
+    assert llm._model is None
+    with pytest.raises(ValueError):
+        LangChainLLMClient("nope:model", "key")
@@ -0,0 +1,91 @@
+import sqlite3
+from pathlib import Path
+
+from clawless.agent import LLMClient
+from clawless.context import ContextBuilder, TokenCounter
+from clawless.db import connect, init_db
+from clawless.summarizer import TrackSummarizer
+from clawless.tracks import TrackManager
+
+
+class RecordingLLM(LLMClient):
+    def __init__(self):
+        self.requests = []
+
+    def invoke(self, messages):
+        self.requests.append(messages)
+        return f"summary {len(self.requests)}"
+
+
+class CharCounter(TokenCounter):
+    def __init__(self):
+        self._encoding = None
+        self.count = len
+
+
+def make_tracks(tmp_path: Path) -> TrackManager:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    return TrackManager(conn)
+
+
+def test_summarizer_is_incremental(tmp_path: Path) -> None:
+    tracks = make_tracks(tmp_path)
+    track = tracks.get_or_create("work")
+    for index in range(10):
+        tracks.append_message(track.id, "user", f"m{index}")
+    llm = RecordingLLM()
+    # Each message costs 6 tokens and the history budget is 29, so the window
+    # holds the newest four.
+    builder = ContextBuilder(CharCounter(), context_tokens=33, reply_tokens=0)
+    summarizer = TrackSummarizer(llm, tracks, builder, lambda summary: "", batch_size=4, idle_seconds=0)
+
+    assert summarizer.summarize_track(track.id) == 6
+    assert len(llm.requests) == 2
+    updated = tracks.get_by_id(track.id)
+    assert updated.summary == "summary 2"
+    assert "summary 1" in llm.requests[1][1].content
+    assert "m5" in llm.requests[1][1].content
+
+    assert summarizer.summarize_track(track.id) == 0
+    tracks.append_message(track.id, "user", "m10")
+    assert summarizer.summarize_track(track.id) == 1
+    assert "m6" in llm.requests[2][1].content
+
+    history = builder.load(tracks, track.id, "", tracks.get_by_id(track.id).summary_upto)
+    assert [m.content for m in history] == ["m7", "m8", "m9", "m10"]
+
+
+def test_summarizer_skips_active_tracks(tmp_path: Path) -> None:
+    tracks = make_tracks(tmp_path)
+    track = tracks.get_or_create("work")
+    tracks.mark_active(track.id)
+    for index in range(5):
+        tracks.append_message(track.id, "user", f"m{index}")
+    summarizer = TrackSummarizer(RecordingLLM(), tracks, idle_seconds=3600)
+    assert summarizer.run_once() == 0
+
+
+def test_init_db_adds_summary_upto(tmp_path: Path) -> None:
+    path = tmp_path / "old.sqlite"
+    raw = sqlite3.connect(path)
+    raw.execute(
+        "CREATE TABLE tracks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, "
+        "summary TEXT NOT NULL DEFAULT '', last_active INTEGER NOT NULL DEFAULT 0)"
+    )
+    raw.commit()
+    raw.close()
+    conn = connect(path)
+    init_db(conn)
+    assert TrackManager(conn).get_or_create("work").summary_upto == 0
+
+
+def test_summarizer_leaves_a_window_that_fits(tmp_path: Path) -> None:
+    # Thirty short messages fit the default token budget, so nothing is folded.
+    tracks = make_tracks(tmp_path)
+    track = tracks.get_or_create("work")
+    for index in range(30):
+        tracks.append_message(track.id, "user", f"m{index}")
+    llm = RecordingLLM()
+    assert TrackSummarizer(llm, tracks, idle_seconds=0).summarize_track(track.id) == 0
+    assert llm.requests == []
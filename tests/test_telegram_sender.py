@@ -0,0 +1,127 @@
+import pytest
+
+from clawless.ratelimit import TokenBucket
+from clawless.telegram.adapter import TelegramRateLimited, split_message
+from clawless.telegram.sender import EMPTY_REPLY_TEXT, FAILED_REPLY_TEXT, StreamingReply, TelegramSender
+
+
+class FakeAdapter:
+    def __init__(self, fail_first_with=None):
+        self.sent = []
+        self.fail_first_with = fail_first_with
+
+    def send_message(self, chat_id, text):
+        if self.fail_first_with is not None:
+            exc, self.fail_first_with = self.fail_first_with, None
+            raise exc
+        self.sent.append((chat_id, text))
+        return len(self.sent)
+
+
+def test_split_message_prefers_paragraphs() -> None:
+    text = "a" * 30 + "\n\n" + "b" * 30 + "\n\n" + "c" * 30
+    chunks = split_message(text, limit=70)
+    assert chunks == ["a" * 30 + "\n\n" + "b" * 30, "c" * 30]
+    assert split_message("x" * 25, limit=10) == ["x" * 10, "x" * 10, "x" * 5]
+    assert split_message("short") == ["short"]
+
+
+def test_token_bucket_reports_wait() -> None:
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() > 0.0
+
+
+def test_sender_chunks_and_delivers_in_order() -> None:
+    adapter = FakeAdapter()
+    sender = TelegramSender(adapter, rate_per_second=1000, chat_rate_per_second=1000)
+    sender.start()
+    sender.send(1, "first")
+    sender.send(1, "x" * 5000)
+    assert sender.flush(timeout=5)
+    sender.stop()
+    assert [text for _, text in adapter.sent] == ["first", "x" * 4096, "x" * 904]
+
+
+def test_sender_honors_retry_after() -> None:
+    adapter = FakeAdapter(fail_first_with=TelegramRateLimited(0.05))
+    sender = TelegramSender(adapter, rate_per_second=1000, chat_rate_per_second=1000)
+    sender.start()
+    sender.send(7, "hello")
+    assert sender.flush(timeout=5)
+    sender.stop()
+    assert adapter.sent == [(7, "hello")]
+
+
+class ThrottledAdapter:
+    def __init__(self):
+        self.calls = 0
+
+    def send_message(self, chat_id, text):
+        self.calls += 1
+        raise TelegramRateLimited(0.01)
+
+
+def test_sender_gives_up_after_repeated_rate_limits() -> None:
+    errors = []
+    adapter = ThrottledAdapter()
+    sender = TelegramSender(
+        adapter,
+        rate_per_second=1000,
+        chat_rate_per_second=1000,
+        max_attempts=3,
+        on_error=errors.append,
+    )
+    sender.start()
+    sender.send(7, "hello")
+    assert sender.flush(timeout=5)
+    sender.stop()
+    assert adapter.calls == 3
+    assert len(errors) == 1 and isinstance(errors[0], TelegramRateLimited)
+
+
+class EditingAdapter(FakeAdapter):
+    def __init__(self):
+        super().__init__()
+        self.edits = []
+
+    def edit_message_text(self, chat_id, message_id, text):
+        self.edits.append((message_id, text))
+
+
+def test_streaming_reply_throttles_edits() -> None:
+    adapter = EditingAdapter()
+    sender = TelegramSender(adapter, rate_per_second=1000, chat_rate_per_second=1000)
+    sender.start()
+    reply = StreamingReply(sender, chat_id=5, min_interval=60)
+    reply.start()
+    for word in ["one ", "two ", "three"]:
+        reply.append(word)
+    assert adapter.edits == []
+    assert reply.finish() == "one two three"
+    assert sender.flush(timeout=5)
+    sender.stop()
+    assert adapter.sent == [(5, "…")]
+    assert adapter.edits == [(1, "one two three")]
+
+
+def test_streaming_reply_never_leaves_the_placeholder() -> None:
+    adapter = EditingAdapter()
+    sender = TelegramSender(adapter, rate_per_second=1000, chat_rate_per_second=1000)
+    sender.start()
+    assert StreamingReply(sender, chat_id=5).consume(iter([""])) == ""
+
+    def broken():
+        yield "partial "
+        raise ConnectionError("stream dropped")
+
+    reply = StreamingReply(sender, chat_id=5, min_interval=0)
+    with pytest.raises(ConnectionError):
+        reply.consume(broken())
+    sender.stop()
+    assert adapter.edits == [
+        (1, EMPTY_REPLY_TEXT),
+        (2, "partial "),
+        (2, FAILED_REPLY_TEXT),
+    ]
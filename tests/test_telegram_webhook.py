@@ -0,0 +1,88 @@
+import json
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from clawless.db import connect, init_db
+from clawless.inbox import Inbox
+from clawless.telegram.adapter import TelegramAdapter
+from clawless.telegram.webhook import SECRET_HEADER, WebhookServer
+
+
+def _update(update_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "from": {"id": user_id},
+            "chat": {"id": 99},
+            "text": text,
+        },
+    }
+
+
+def _post(server: WebhookServer, payload: dict, secret: str = "s3cret") -> int:
+    host, port = server.address
+    request = urllib.request.Request(
+        f"http://{host}:{port}/telegram",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json", SECRET_HEADER: secret},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=5) as resp:
+        return resp.status
+
+
+def test_webhook_accepts_owner_updates() -> None:
+    adapter = TelegramAdapter("token", owner_user_id=42)
+    server = WebhookServer(adapter, host="127.0.0.1", port=0, secret_token="s3cret")
+    server.start()
+    try:
+        assert _post(server, _update(1, 42, "hello")) == 200
+        assert _post(server, _update(2, 7, "not the owner")) == 200
+        updates = server.poll(timeout=5)
+        assert [(u.update_id, u.text, u.chat_id) for u in updates] == [(1, "hello", 99)]
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            _post(server, _update(3, 42, "forged"), secret="wrong")
+        assert excinfo.value.code == 403
+        assert server.poll(timeout=0.05) == []
+    finally:
+        server.stop()
+
+
+def test_webhook_acknowledges_malformed_updates() -> None:
+    adapter = TelegramAdapter("token", owner_user_id=42)
+    rejected = []
+    server = WebhookServer(adapter, host="127.0.0.1", port=0, on_reject=rejected.append)
+    server.start()
+    try:
+        assert _post(server, {"update_id": 1, "message": "not an object"}) == 200
+        broken = _update(2, 42, "no chat")
+        broken["message"]["chat"] = None
+        assert _post(server, broken) == 200
+        assert _post(server, _update(3, 42, "hello")) == 200
+        assert [u.update_id for u in server.poll(timeout=5)] == [3]
+        assert [reason.split()[1] for reason in rejected] == ["update_id=1", "update_id=2"]
+    finally:
+        server.stop()
+
+
+def test_webhook_stores_updates_before_acknowledging(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    inbox = Inbox(conn)
+    adapter = TelegramAdapter("token", owner_user_id=42)
+    server = WebhookServer(adapter, host="127.0.0.1", port=0, inbox=inbox)
+    server.start()
+    try:
+        assert _post(server, _update(1, 42, "hello")) == 200
+        # Stored by the time Telegram sees the 200, before anything polls.
+        assert [item.update.text for item in inbox.claim()] == ["hello"]
+        conn.execute("DROP TABLE inbox")
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            _post(server, _update(2, 42, "not stored"))
+        assert excinfo.value.code == 500
+    finally:
+        server.stop()
@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from clawless.agent import Agent, LLMClient, Message
+from clawless.tools.base import Tool, ToolRegistry
+from clawless.tools.results import ToolResultStore
+
+
+def test_small_results_pass_through() -> None:
+    store = ToolResultStore(max_chars=100)
+    outcome = {"tool": "echo", "result": {"ok": True}}
+    assert store.cap(outcome) is outcome
+
+
+def test_large_result_is_paged(tmp_path: Path) -> None:
+    store = ToolResultStore(max_chars=50, page_chars=40, directory=tmp_path)
+    capped = store.cap({"tool": "read_file", "result": {"content": "x" * 200}})
+    assert capped["truncated"]
+    assert len(capped["preview"]) == 50
+    full = json.dumps({"content": "x" * 200})
+    assert capped["total_chars"] == len(full)
+
+    text, offset = capped["preview"], capped["next_offset"]
+    while offset is not None:
+        page = store.read({"handle": capped["handle"], "offset": offset})
+        assert len(page["content"]) <= 40
+        text += page["content"]
+        offset = page["next_offset"]
+    assert text == full
+    assert (tmp_path / f"{capped['handle']}.json").exists()
+
+
+def test_old_handles_are_evicted(tmp_path: Path) -> None:
+    store = ToolResultStore(max_chars=1, directory=tmp_path, max_handles=1)
+    first = store.cap({"tool": "t", "result": "aaaa"})["handle"]
+    store.cap({"tool": "t", "result": "bbbb"})
+    with pytest.raises(KeyError):
+        store.read({"handle": first})
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+
+class ScriptedLLM(LLMClient):
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def invoke(self, messages):
+        self.requests.append(messages)
+        return self.responses.pop(0)
+
+
+def test_agent_caps_tool_results() -> None:
+    registry = ToolRegistry()
+    registry.register(Tool(name="dump", description="Dump", input_schema={}, handler=lambda args: "y" * 10_000))
+    store = ToolResultStore(max_chars=100)
+    store.register(registry)
+    llm = ScriptedLLM(['{"tool": "dump", "args": {}}', "done"])
+    assert Agent(llm, registry, result_store=store).run("", [Message("user", "go")]) == "done"
+    followup = llm.requests[1][-1].content
+    assert len(followup) < 1000
+    assert "read_tool_result" in followup
@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from clawless import tracing
+from clawless.agent import Agent, LLMClient, LLMResponse, LLMUsage, Message
+from clawless.db import connect, init_db
+from clawless.tools.base import Tool, ToolRegistry
+from clawless.tracks import TrackManager
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exporter():
+    memory = MemoryExporter()
+    tracer = tracing.Tracer([memory], flush_seconds=0.01)
+    tracing.set_tracer(tracer)
+    yield memory
+    tracing.set_tracer(None)
+    tracer.close()
+
+
+class ToolThenAnswerLLM(LLMClient):
+    supports_native_tools = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, tools=None):
+        self.calls += 1
+        if self.calls == 1:
+            calls = [{"tool": "echo", "args": {"n": n}, "id": f"c{n}"} for n in range(2)]
+            return LLMResponse("", calls, LLMUsage(100, 5))
+        return LLMResponse("done", usage=LLMUsage(120, 3, 100))
+
+
+def test_spans_nest_under_the_turn(tmp_path: Path, exporter: MemoryExporter) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    tracks = TrackManager(conn)
+    registry = ToolRegistry()
+    registry.register(Tool("echo", "Echo", {}, lambda args: args))
+    agent = Agent(ToolThenAnswerLLM(), registry, tool_mode="native")
+
+    with tracing.span("turn", root=True) as turn:
+        track = tracks.get_or_create("work")
+        assert agent.run("", [Message("user", "hi")]) == "done"
+    tracing.get_tracer().flush(5)
+
+    by_name = {}
+    for span in exporter.spans:
+        by_name.setdefault(span.name, []).append(span)
+    assert {s.trace_id for s in exporter.spans} == {turn.trace_id}
+    assert by_name["tracks.get_or_create"][0].parent_id == turn.span_id
+    # get_by_name runs inside get_or_create.
+    assert by_name["tracks.get_by_name"][0].parent_id == by_name["tracks.get_or_create"][0].span_id
+    assert len(by_name["tool"]) == 2
+    assert all(s.parent_id == turn.span_id for s in by_name["tool"])
+    llm_spans = by_name["llm.complete"]
+    assert [s.attributes["input_tokens"] for s in llm_spans] == [100, 120]
+    assert llm_spans[1].attributes["cached_tokens"] == 100
+    assert track.id
+
+
+def test_span_records_errors(exporter: MemoryExporter) -> None:
+    with pytest.raises(ValueError):
+        with tracing.span("boom", root=True):
+            raise ValueError("bad")
+    tracing.get_tracer().flush(5)
+    assert exporter.spans[0].error == "ValueError: bad"
+
+
+def test_span_is_noop_without_tracer() -> None:
+    with tracing.span("anything") as active:
+        active.set(ignored=True)
+    assert active is tracing.NOOP_SPAN
+    assert tracing.current() is None
+
+
+def test_jsonl_and_otlp_export(tmp_path: Path) -> None:
+    path = tmp_path / "logs" / "file1.trace.jsonl"
+    tracer = tracing.Tracer([tracing.JSONLExporter(path)], flush_seconds=0.01)
+    parent = tracer.start("turn", track_id=3)
+    child = tracer.start("telegram.send", parent, bytes=12)
+    tracer.finish(child)
+    tracer.finish(parent)
+    tracer.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["telegram.send", "turn"]
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+    assert lines[0]["attributes"] == {"bytes": 12}
+
+    payload = tracing.OTLPExporter("http://localhost:4318/v1/traces").payload([child])
+    span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["parentSpanId"] == parent.span_id
+    assert len(span["traceId"]) == 32
+    assert span["attributes"] == [{"key": "bytes", "value": {"intValue": "12"}}]
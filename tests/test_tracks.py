@@ -1,6 +1,9 @@
+import threading
 from pathlib import Path
 
-from clawless.db import connect, init_db
+import pytest
+
+from clawless.db import ConnectionPool, DBWriter, connect, init_db
 from clawless.tracks import TrackManager
 
 
@@ -15,3 +18,95 @@ def test_track_create_and_last_active(tmp_path: Path) -> None:
     last = manager.get_last_active()
     assert last is not None
     assert last.name == "work"
+
+
+def test_transaction_commits_once_through_writer(tmp_path: Path) -> None:
+    path = tmp_path / "db.sqlite"
+    conn = connect(path)
+    init_db(conn)
+    writer = DBWriter(path)
+    manager = TrackManager(conn, writer)
+    try:
+        track = manager.get_or_create("work")
+        commits = writer.commits
+        with manager.transaction():
+            manager.append_message(track.id, "user", "hi")
+            manager.append_message(track.id, "assistant", "hello")
+            manager.mark_active(track.id)
+            # Reads inside the transaction see its writes.
+            assert len(manager.recent_messages(track.id)) == 2
+            # Other connections do not until it commits.
+            assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+        assert writer.commits == commits + 1
+        assert [m["content"] for m in manager.recent_messages(track.id)] == ["hi", "hello"]
+    finally:
+        writer.close()
+
+
+def test_transaction_rolls_back_on_error(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    manager = TrackManager(conn)
+    track = manager.get_or_create("work")
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            manager.append_message(track.id, "user", "lost")
+            raise RuntimeError("turn failed")
+    assert manager.recent_messages(track.id) == []
+
+
+def test_manager_on_pool_reads_from_other_threads(tmp_path: Path) -> None:
+    path = tmp_path / "db.sqlite"
+    init_db(connect(path))
+    pool = ConnectionPool(path)
+    manager = TrackManager(pool)
+    try:
+        track = manager.get_or_create("work")
+        manager.append_message(track.id, "user", "hi")
+        seen = []
+        worker = threading.Thread(target=lambda: seen.extend(manager.recent_messages(track.id)))
+        worker.start()
+        worker.join(5)
+        assert [m["content"] for m in seen] == ["hi"]
+        assert manager.writer is pool.writer
+    finally:
+        pool.close()
+
+
+def test_cached_lookups_skip_sqlite_and_see_other_writers(tmp_path: Path) -> None:
+    path = tmp_path / "db.sqlite"
+    conn = connect(path)
+    init_db(conn)
+    manager = TrackManager(conn, cache_seconds=60)
+    track = manager.get_or_create("work")
+    manager.mark_active(track.id)
+    manager.rename(track.id, "job")
+
+    queries = []
+    conn.set_trace_callback(queries.append)
+    assert manager.get_last_active().name == "job"
+    assert manager.get_or_create("job").id == track.id
+    assert queries == []
+    conn.set_trace_callback(None)
+
+    # Another process renames the track; with cache_seconds=0 every lookup
+    # checks tracks_rev and notices.
+    TrackManager(connect(path)).rename(track.id, "elsewhere")
+    assert manager.get_by_id(track.id).name == "job"
+    manager.cache.check_seconds = 0
+    assert manager.get_by_id(track.id).name == "elsewhere"
+    assert manager.get_by_name("job") is None
+
+
+def test_rolled_back_changes_never_reach_the_cache(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "db.sqlite")
+    init_db(conn)
+    manager = TrackManager(conn, cache_seconds=60)
+    track = manager.get_or_create("work")
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            manager.rename(track.id, "renamed")
+            assert manager.get_by_id(track.id).name == "renamed"
+            raise RuntimeError("turn failed")
+    assert manager.get_by_id(track.id).name == "work"
+    assert manager.get_by_name("renamed") is None